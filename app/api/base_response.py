@@ -4,6 +4,7 @@ from aiohttp import web
 from pydantic import BaseModel
 
 from app.api.codes import HttpCode
+from app.tracing import span
 
 
 class BaseResponse(BaseModel):
@@ -34,5 +35,6 @@ class BaseResponse(BaseModel):
         return cls(http_code=HttpCode.internal_error)
 
     def as_web_response(self) -> web.Response:
-        response_data = self.model_dump_json(exclude={'http_code'})
+        with span('encode'):
+            response_data = self.model_dump_json(exclude={'http_code'})
         return web.json_response(text=response_data, status=self.http_code)
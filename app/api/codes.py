@@ -4,6 +4,7 @@ from enum import IntEnum
 class HttpCode(IntEnum):
     ok = 200
     created = 201
+    not_modified = 304
     bad_request = 400
     not_found = 404
     conflict = 409
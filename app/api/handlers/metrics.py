@@ -0,0 +1,68 @@
+from aiohttp import hdrs, web
+
+from app.composition_root import CompositionContainer
+from app.metrics import CONTENT_TYPE, REGISTRY
+
+# Values kept by the pools and the cache, copied into the registry on every scrape
+_POOL_CONNECTIONS = REGISTRY.gauge(
+    'db_pool_connections',
+    'Connections of the pools that serve sessions, by state',
+    label_names=('pool', 'state'),
+)
+_POOL_MAX_SIZE = REGISTRY.gauge('db_pool_max_size', 'Maximum number of connections', label_names=('pool',))
+_POOL_WAITING = REGISTRY.gauge('db_pool_waiting_sessions', 'Sessions waiting for a connection', label_names=('pool',))
+_POOL_ACQUIRE_TIMEOUTS = REGISTRY.counter(
+    'db_pool_acquire_timeouts_total',
+    'Sessions that did not get a connection in time',
+    label_names=('pool',),
+)
+_POOL_AVAILABLE_REPLICAS = REGISTRY.gauge(
+    'db_pool_available_replicas',
+    'Read replicas in rotation',
+    label_names=('pool',),
+)
+
+_CACHE_SIZE = REGISTRY.gauge('exact_match_cache_size', 'Entries in the exact match cache')
+_CACHE_LOOKUPS = REGISTRY.counter(
+    'exact_match_cache_lookups_total',
+    'Lookups in the exact match cache by result',
+    label_names=('result',),
+)
+_CACHE_REMOVALS = REGISTRY.counter(
+    'exact_match_cache_removals_total',
+    'Entries removed from the exact match cache by reason',
+    label_names=('reason',),
+)
+
+_COALESCED_SEARCHES = REGISTRY.counter(
+    'search_coalesced_requests_total',
+    'Searches answered by a query started for an identical concurrent search',
+)
+
+
+def _collect(composition_container: CompositionContainer) -> None:
+    _COALESCED_SEARCHES.labels().set(composition_container.search_tm_service.coalesced_requests)
+
+    for db_session_factory in composition_container.db_session_factories.values():
+        stats = db_session_factory.stats
+        _POOL_CONNECTIONS.labels(stats.name, 'in_use').set(stats.in_use)
+        _POOL_CONNECTIONS.labels(stats.name, 'idle').set(stats.idle)
+        _POOL_MAX_SIZE.labels(stats.name).set(stats.max_size)
+        _POOL_WAITING.labels(stats.name).set(stats.waiting)
+        _POOL_ACQUIRE_TIMEOUTS.labels(stats.name).set(stats.acquire_timeouts)
+        _POOL_AVAILABLE_REPLICAS.labels(stats.name).set(stats.available_replicas)
+
+    if composition_container.exact_match_cache is not None:
+        cache_stats = composition_container.exact_match_cache.stats
+        _CACHE_SIZE.labels().set(cache_stats.size)
+        _CACHE_LOOKUPS.labels('hit').set(cache_stats.hits)
+        _CACHE_LOOKUPS.labels('miss').set(cache_stats.misses)
+        _CACHE_REMOVALS.labels('eviction').set(cache_stats.evictions)
+        _CACHE_REMOVALS.labels('expiration').set(cache_stats.expirations)
+
+
+async def metrics(request: web.Request) -> web.Response:
+    composition_container: CompositionContainer = request.config_dict['composition_container']
+
+    _collect(composition_container)
+    return web.Response(body=REGISTRY.render().encode(), headers={hdrs.CONTENT_TYPE: CONTENT_TYPE})
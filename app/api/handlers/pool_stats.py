@@ -0,0 +1,49 @@
+from aiohttp import web
+from pydantic import BaseModel, Field
+
+from app.api.base_response import BaseResponse
+from app.api.codes import HttpCode
+from app.composition_root import CompositionContainer
+from app.repositories.database_session import PoolStats
+
+
+class PoolStatsItem(BaseModel):
+    name: str
+    size: int
+    max_size: int
+    idle: int
+    in_use: int
+    waiting: int
+    saturation: float
+    acquired: int
+    acquire_timeouts: int
+    acquire_wait_total: float
+    acquire_wait_average: float
+    replicas: int
+    available_replicas: int
+
+    @classmethod
+    def from_stats(cls, stats: PoolStats) -> 'PoolStatsItem':
+        return cls(
+            **stats._asdict(),
+            saturation=stats.saturation,
+            acquire_wait_average=stats.acquire_wait_average,
+        )
+
+
+class PoolStatsHandlerResponse(BaseResponse):
+    result: list[PoolStatsItem] = Field(default_factory=list)
+
+    @classmethod
+    def ok_response(cls, result: list[PoolStatsItem]) -> 'PoolStatsHandlerResponse':
+        return cls(http_code=HttpCode.ok, result=result)
+
+
+async def pool_stats(request: web.Request) -> web.Response:
+    composition_container: CompositionContainer = request.config_dict['composition_container']
+
+    result = [
+        PoolStatsItem.from_stats(db_session_factory.stats)
+        for db_session_factory in composition_container.db_session_factories.values()
+    ]
+    return PoolStatsHandlerResponse.ok_response(result=result).as_web_response()
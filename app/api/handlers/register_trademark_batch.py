@@ -0,0 +1,88 @@
+from enum import Enum
+from typing import Annotated, Any
+
+from aiohttp import web
+from pydantic import BaseModel, Field, ValidationError
+
+from app.api.base_response import BaseResponse
+from app.api.codes import HttpCode
+from app.api.handlers.register_trademark import RegisterTrademarkHandlerRequest
+from app.composition_root import CompositionContainer
+from app.models.trademark import Trademark
+from app.services.register_trademark import RegisterTrademarkServiceRequest, RegisterTrademarkServiceResponse
+from app.services.register_trademark_batch import RegisterTrademarkBatchService, RegisterTrademarkBatchServiceRequest
+
+MAX_BATCH_SIZE = 10000
+
+
+class RegisterTrademarkBatchHandlerRequest(BaseModel):
+    items: Annotated[list[Any], Field(min_length=1, max_length=MAX_BATCH_SIZE)]
+
+
+class RegisterTrademarkBatchItemStatus(str, Enum):  # noqa: WPS600
+    created = 'created'
+    already_registered = 'already_registered'
+    invalid = 'invalid'
+
+
+class RegisterTrademarkBatchItemResult(BaseModel):
+    status: RegisterTrademarkBatchItemStatus
+    result: Trademark | None = None
+
+    @classmethod
+    def from_service_response(cls, response: RegisterTrademarkServiceResponse) -> 'RegisterTrademarkBatchItemResult':
+        if response.is_success():
+            return cls(status=RegisterTrademarkBatchItemStatus.created, result=response.result)
+
+        return cls(status=RegisterTrademarkBatchItemStatus.already_registered)
+
+
+class RegisterTrademarkBatchHandlerResponse(BaseResponse):
+    result: list[RegisterTrademarkBatchItemResult] = Field(default_factory=list)
+
+    @classmethod
+    def ok_response(cls, result: list[RegisterTrademarkBatchItemResult]) -> 'RegisterTrademarkBatchHandlerResponse':
+        return cls(http_code=HttpCode.ok, result=result)
+
+
+def _validate_items(items: list[Any]) -> dict[int, RegisterTrademarkServiceRequest]:
+    """Validate batch items one by one, so an invalid item does not reject the whole batch."""
+    valid_items = {}
+    for position, item in enumerate(items):
+        try:
+            handler_request = RegisterTrademarkHandlerRequest.model_validate(item)
+        except ValidationError:
+            continue
+
+        valid_items[position] = RegisterTrademarkServiceRequest.model_validate(handler_request.model_dump())
+
+    return valid_items
+
+
+async def register_trademark_batch(request: web.Request) -> web.Response:
+    composition_container: CompositionContainer = request.config_dict['composition_container']
+    register_tm_batch_service: RegisterTrademarkBatchService = composition_container.register_tm_batch_service
+
+    request_body = await request.json()
+    try:
+        handler_request = RegisterTrademarkBatchHandlerRequest.model_validate(request_body)
+    except ValidationError:
+        return RegisterTrademarkBatchHandlerResponse.bad_request_response().as_web_response()
+
+    result = [
+        RegisterTrademarkBatchItemResult(status=RegisterTrademarkBatchItemStatus.invalid)
+        for _ in handler_request.items
+    ]
+
+    valid_items = _validate_items(handler_request.items)
+    if valid_items:
+        service_request = RegisterTrademarkBatchServiceRequest(items=list(valid_items.values()))
+        service_response = await register_tm_batch_service.invoke(request=service_request)
+
+        if service_response.is_error():
+            return RegisterTrademarkBatchHandlerResponse.internal_error_response().as_web_response()
+
+        for position, item_response in zip(valid_items.keys(), service_response.result):
+            result[position] = RegisterTrademarkBatchItemResult.from_service_response(item_response)
+
+    return RegisterTrademarkBatchHandlerResponse.ok_response(result=result).as_web_response()
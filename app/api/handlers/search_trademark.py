@@ -1,45 +1,192 @@
-from typing import Annotated
+from contextlib import aclosing
+from typing import Annotated, Any
 
-from aiohttp import web
-from pydantic import BaseModel, Field, StringConstraints, ValidationError
+from aiohttp import hdrs, web
+from pydantic import BaseModel, Field, field_validator, SerializeAsAny, StringConstraints, ValidationError
 
 from app.api.base_response import BaseResponse
 from app.api.codes import HttpCode
+from app.api.serialization import encode_similar_rows
 from app.composition_root import CompositionContainer
-from app.models.trademark import Trademark
-from app.services.search_trademark import SearchTrademarkService, SearchTrademarkServiceRequest
+from app.models.trademark import SearchCursor, SimilarityMode, Trademark
+from app.repositories.trademark import get_expiry_bound
+from app.services.search_trademark import (
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    SearchTrademarkService,
+    SearchTrademarkServiceError,
+    SearchTrademarkServiceRequest,
+    StreamSearchTrademarkServiceRequest,
+)
+from app.tracing import span
 
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+# Matches any entity tag in If-None-Match
+ANY_ETAG = '*'
 
-class SearchTrademarkHandlerRequest(BaseModel):
+
+class BaseSearchTrademarkHandlerRequest(BaseModel):
     title: Annotated[str, StringConstraints(min_length=1)]
     exact_match: bool = True
+    similarity: float = Field(gt=0, lt=1, default=0.5)
+    mode: SimilarityMode = SimilarityMode.similarity
+    cursor: SearchCursor | None = None
+    include_expired: bool = False
+
+    @field_validator('cursor', mode='before')
+    @classmethod
+    def decode_cursor(cls, cursor: Any) -> Any:
+        if isinstance(cursor, str):
+            return SearchCursor.decode(cursor)
+
+        return cursor
+
+
+class SearchTrademarkHandlerRequest(BaseSearchTrademarkHandlerRequest):
+    limit: int = Field(ge=1, le=MAX_SEARCH_LIMIT, default=DEFAULT_SEARCH_LIMIT)
+
+
+class StreamSearchTrademarkHandlerRequest(BaseSearchTrademarkHandlerRequest):
+    limit: int | None = Field(ge=1, default=None)
 
 
 class SearchTrademarkHandlerResponse(BaseResponse):
     http_code: HttpCode
-    result: list[Trademark] = Field(default_factory=list)
+    result: list[SerializeAsAny[Trademark]] = Field(default_factory=list)
+    next_cursor: str | None = None
 
     @classmethod
-    def ok_response(cls, result: list[Trademark]) -> 'SearchTrademarkHandlerResponse':
-        return cls(http_code=HttpCode.ok, result=result)
+    def ok_response(
+            cls,
+            result: list[Trademark],
+            next_cursor: SearchCursor | None = None,
+    ) -> 'SearchTrademarkHandlerResponse':
+        encoded_cursor = next_cursor.encode() if next_cursor is not None else None
+        return cls(http_code=HttpCode.ok, result=result, next_cursor=encoded_cursor)
+
+    @staticmethod
+    def rows_web_response(rows: list[Any], next_cursor: SearchCursor | None = None) -> web.Response:
+        """Build the same response as `ok_response(...).as_web_response()` from raw similar search rows."""
+        encoded_cursor = next_cursor.encode() if next_cursor is not None else None
+        with span('encode'):
+            response_data = encode_similar_rows(rows, next_cursor=encoded_cursor)
+        return web.Response(body=response_data, status=HttpCode.ok, content_type='application/json', charset='utf-8')
 
 
-async def search_trademark(request: web.Request) -> web.Response:
+async def search_trademark(request: web.Request) -> web.StreamResponse:
     composition_container: CompositionContainer = request.config_dict['composition_container']
     search_tm_service: SearchTrademarkService = composition_container.search_tm_service
 
+    if NDJSON_CONTENT_TYPE in request.headers.get(hdrs.ACCEPT, ''):
+        return await _stream_search_trademark(request, search_tm_service=search_tm_service)
+
     try:
         handler_request = SearchTrademarkHandlerRequest.model_validate(request.query)
     except ValidationError:
         return SearchTrademarkHandlerResponse.bad_request_response().as_web_response()
 
     service_request = SearchTrademarkServiceRequest.model_validate(handler_request.model_dump())
+
+    # Read before the search, so that results are never older than the version they are tagged with
+    entity_tag = _get_entity_tag(composition_container, service_request=service_request)
+    if entity_tag is not None and _is_not_modified(request, entity_tag=entity_tag):
+        return _set_validators(web.Response(status=HttpCode.not_modified), entity_tag=entity_tag)
+
     service_response = await search_tm_service.invoke(request=service_request)
+    if service_response.is_error():
+        return SearchTrademarkHandlerResponse.internal_error_response().as_web_response()
+
+    if service_response.rows:
+        response = SearchTrademarkHandlerResponse.rows_web_response(
+            rows=service_response.rows,
+            next_cursor=service_response.next_cursor,
+        )
+    elif service_response.rows is None and service_response.result:
+        response = SearchTrademarkHandlerResponse.ok_response(
+            result=service_response.result,
+            next_cursor=service_response.next_cursor,
+        ).as_web_response()
+    else:
+        response = SearchTrademarkHandlerResponse.not_found_response().as_web_response()
+
+    if entity_tag is not None:
+        _set_validators(response, entity_tag=entity_tag)
+    return response
+
+
+def _get_entity_tag(
+        composition_container: CompositionContainer,
+        service_request: SearchTrademarkServiceRequest,
+) -> str | None:
+    """Tag of the data that validates the search results, None when they cannot be validated.
+
+    It is the version of the catalog, and the earliest expiry date of searched trademarks for searches
+    that skip expired ones: their results change at midnight without the catalog changing.
+    """
+    catalog_version_watcher = composition_container.catalog_version_watcher
+    if catalog_version_watcher is None or catalog_version_watcher.version is None:
+        return None
 
-    if service_response.is_success():
-        if not service_response.result:
+    # The in-process index may not have titles registered by other instances yet
+    if composition_container.search_tm_service.uses_trigram_index(service_request):
+        return None
+
+    if service_request.include_expired:
+        return str(catalog_version_watcher.version)
+    return f'{catalog_version_watcher.version}-{get_expiry_bound(include_expired=False).isoformat()}'
+
+
+def _is_not_modified(request: web.Request, entity_tag: str) -> bool:
+    if_none_match = request.if_none_match
+    if if_none_match is None:
+        return False
+
+    # Weak comparison, as for every conditional GET
+    return any(etag.value in {ANY_ETAG, entity_tag} for etag in if_none_match)
+
+
+def _set_validators(response: web.Response, entity_tag: str) -> web.Response:
+    """Tag the response with its entity tag, clients keep it and revalidate it on every poll."""
+    response.etag = entity_tag
+    response.headers[hdrs.CACHE_CONTROL] = 'no-cache'
+    # Streamed results of the same URL are not tagged
+    response.headers[hdrs.VARY] = hdrs.ACCEPT
+    return response
+
+
+async def _stream_search_trademark(
+        request: web.Request,
+        search_tm_service: SearchTrademarkService,
+) -> web.StreamResponse:
+    """Write search results as newline-delimited JSON while they are read from the database.
+
+    Errors after the first chunk cannot change the response status, the connection is dropped instead.
+    """
+    try:
+        handler_request = StreamSearchTrademarkHandlerRequest.model_validate(request.query)
+    except ValidationError:
+        return SearchTrademarkHandlerResponse.bad_request_response().as_web_response()
+
+    service_request = StreamSearchTrademarkServiceRequest.model_validate(handler_request.model_dump())
+    async with aclosing(search_tm_service.stream(request=service_request)) as chunks:
+        try:
+            first_chunk: list[Trademark] = await anext(chunks, [])
+        except SearchTrademarkServiceError:
+            return SearchTrademarkHandlerResponse.internal_error_response().as_web_response()
+
+        if not first_chunk:
             return SearchTrademarkHandlerResponse.not_found_response().as_web_response()
 
-        return SearchTrademarkHandlerResponse.ok_response(result=service_response.result).as_web_response()
+        response = web.StreamResponse(status=HttpCode.ok, headers={hdrs.CONTENT_TYPE: NDJSON_CONTENT_TYPE})
+        await response.prepare(request)
+
+        await _write_ndjson_chunk(response, first_chunk)
+        async for chunk in chunks:
+            await _write_ndjson_chunk(response, chunk)
+
+    await response.write_eof()
+    return response
+
 
-    return SearchTrademarkHandlerResponse.internal_error_response().as_web_response()
+async def _write_ndjson_chunk(response: web.StreamResponse, chunk: list[Trademark]) -> None:
+    await response.write(''.join(f'{trademark.model_dump_json()}\n' for trademark in chunk).encode())
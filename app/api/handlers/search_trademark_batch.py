@@ -0,0 +1,61 @@
+from typing import Annotated
+
+from aiohttp import web
+from pydantic import BaseModel, Field, SerializeAsAny, StringConstraints, ValidationError
+
+from app.api.base_response import BaseResponse
+from app.api.codes import HttpCode
+from app.composition_root import CompositionContainer
+from app.models.trademark import Trademark
+from app.services.search_trademark import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from app.services.search_trademark_batch import SearchTrademarkBatchService, SearchTrademarkBatchServiceRequest
+
+MAX_SEARCH_BATCH_SIZE = 500
+
+
+class SearchTrademarkBatchHandlerItem(BaseModel):
+    title: Annotated[str, StringConstraints(min_length=1)]
+    exact_match: bool = True
+    similarity: float = Field(gt=0, lt=1, default=0.5)
+    limit: int = Field(ge=1, le=MAX_SEARCH_LIMIT, default=DEFAULT_SEARCH_LIMIT)
+
+
+class SearchTrademarkBatchHandlerRequest(BaseModel):
+    items: Annotated[list[SearchTrademarkBatchHandlerItem], Field(min_length=1, max_length=MAX_SEARCH_BATCH_SIZE)]
+    include_expired: bool = False
+
+
+class SearchTrademarkBatchItemResult(BaseModel):
+    title: str
+    result: list[SerializeAsAny[Trademark]]
+
+
+class SearchTrademarkBatchHandlerResponse(BaseResponse):
+    result: list[SearchTrademarkBatchItemResult] = Field(default_factory=list)
+
+    @classmethod
+    def ok_response(cls, result: list[SearchTrademarkBatchItemResult]) -> 'SearchTrademarkBatchHandlerResponse':
+        return cls(http_code=HttpCode.ok, result=result)
+
+
+async def search_trademark_batch(request: web.Request) -> web.Response:
+    composition_container: CompositionContainer = request.config_dict['composition_container']
+    search_tm_batch_service: SearchTrademarkBatchService = composition_container.search_tm_batch_service
+
+    request_body = await request.json()
+    try:
+        handler_request = SearchTrademarkBatchHandlerRequest.model_validate(request_body)
+    except ValidationError:
+        return SearchTrademarkBatchHandlerResponse.bad_request_response().as_web_response()
+
+    service_request = SearchTrademarkBatchServiceRequest.model_validate(handler_request.model_dump())
+    service_response = await search_tm_batch_service.invoke(request=service_request)
+
+    if service_response.is_error():
+        return SearchTrademarkBatchHandlerResponse.internal_error_response().as_web_response()
+
+    result = [
+        SearchTrademarkBatchItemResult(title=item.title, result=trademarks)
+        for item, trademarks in zip(handler_request.items, service_response.result)
+    ]
+    return SearchTrademarkBatchHandlerResponse.ok_response(result=result).as_web_response()
@@ -0,0 +1,46 @@
+from typing import Annotated
+
+from aiohttp import web
+from pydantic import BaseModel, Field, StringConstraints, ValidationError
+
+from app.api.base_response import BaseResponse
+from app.api.codes import HttpCode
+from app.composition_root import CompositionContainer
+from app.models.trademark import TrademarkSuggestion
+from app.services.suggest_trademark import (
+    DEFAULT_SUGGEST_LIMIT,
+    MAX_SUGGEST_LIMIT,
+    SuggestTrademarkService,
+    SuggestTrademarkServiceRequest,
+)
+
+
+class SuggestTrademarkHandlerRequest(BaseModel):
+    prefix: Annotated[str, StringConstraints(min_length=1)]
+    limit: int = Field(ge=1, le=MAX_SUGGEST_LIMIT, default=DEFAULT_SUGGEST_LIMIT)
+
+
+class SuggestTrademarkHandlerResponse(BaseResponse):
+    result: list[TrademarkSuggestion] = Field(default_factory=list)
+
+    @classmethod
+    def ok_response(cls, result: list[TrademarkSuggestion]) -> 'SuggestTrademarkHandlerResponse':
+        return cls(http_code=HttpCode.ok, result=result)
+
+
+async def suggest_trademark(request: web.Request) -> web.Response:
+    composition_container: CompositionContainer = request.config_dict['composition_container']
+    suggest_tm_service: SuggestTrademarkService = composition_container.suggest_tm_service
+
+    try:
+        handler_request = SuggestTrademarkHandlerRequest.model_validate(request.query)
+    except ValidationError:
+        return SuggestTrademarkHandlerResponse.bad_request_response().as_web_response()
+
+    service_request = SuggestTrademarkServiceRequest.model_validate(handler_request.model_dump())
+    service_response = await suggest_tm_service.invoke(request=service_request)
+
+    if service_response.is_error():
+        return SuggestTrademarkHandlerResponse.internal_error_response().as_web_response()
+
+    return SuggestTrademarkHandlerResponse.ok_response(result=service_response.result).as_web_response()
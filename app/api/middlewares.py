@@ -0,0 +1,82 @@
+import json
+import time
+from logging import Logger
+from uuid import uuid4
+
+from aiohttp import web
+from aiohttp.typedefs import Handler, Middleware
+
+from app.api.codes import HttpCode
+from app.metrics import REGISTRY
+from app.tracing import reset_current_trace, set_current_trace, Trace
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Longer request ids sent by clients are cut
+MAX_REQUEST_ID_LENGTH = 128
+
+_REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds',
+    'Duration of HTTP requests, including writing of streamed responses',
+    label_names=('method', 'route', 'status'),
+)
+
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+    started_at = time.perf_counter()
+    status: int = HttpCode.internal_error
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as http_error:
+        status = http_error.status
+        raise
+    finally:
+        _REQUEST_DURATION.labels(request.method, _get_route(request), str(status)).observe(
+            time.perf_counter() - started_at,
+        )
+
+
+def create_tracing_middleware(logger: Logger, slow_request_threshold: float | None) -> Middleware:
+    """Trace every request, requests that take `slow_request_threshold` seconds or more are logged with their spans.
+
+    The request id is taken from the `X-Request-ID` header or generated, and returned in the same header.
+    """
+
+    @web.middleware
+    async def tracing_middleware(request: web.Request, handler: Handler) -> web.StreamResponse:  # noqa: WPS430
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')[:MAX_REQUEST_ID_LENGTH] or uuid4().hex
+        trace = Trace(request_id)
+        token = set_current_trace(trace)
+        status: int = HttpCode.internal_error
+        try:
+            response = await handler(request)
+            status = response.status
+            # Streamed responses have sent their headers already
+            if not response.prepared:
+                response.headers[REQUEST_ID_HEADER] = request_id
+            return response
+        except web.HTTPException as http_error:
+            status = http_error.status
+            raise
+        finally:
+            reset_current_trace(token)
+            duration = time.perf_counter() - trace.started_at
+            if slow_request_threshold is not None and duration >= slow_request_threshold:
+                log_record = {
+                    'method': request.method,
+                    'route': _get_route(request),
+                    'status': status,
+                    'duration_ms': round(duration * 1000, 3),
+                    **trace.as_log_record(),
+                }
+                logger.warning('Slow request: %s', json.dumps(log_record))
+
+    return tracing_middleware
+
+
+def _get_route(request: web.Request) -> str:
+    # Requests that match no route share one name, so that random paths do not create new metric series
+    resource = request.match_info.route.resource
+    return resource.canonical if resource is not None else 'unmatched'
@@ -0,0 +1,26 @@
+"""JSON encoding of raw search rows that skips building pydantic models.
+
+Validating a model for every row costs several times more than serializing it, so rows are turned
+into plain dicts and passed to the serializer of pydantic-core directly. The output is byte-for-byte
+the same as `model_dump_json()` of the corresponding models: it is the same serializer, and keys
+follow the model field order.
+"""
+from typing import Any, Iterable, Sequence
+
+from pydantic_core import to_json
+
+from app.models.trademark import SimilarTrademark
+
+# `distance` is excluded from the response like in `SimilarTrademark`, excluded fields go last in the model
+# so that they are cut off by `zip()`.
+_SIMILAR_ROW_KEYS = tuple(name for name, field in SimilarTrademark.model_fields.items() if not field.exclude)
+
+
+def similar_rows_as_dicts(rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+    """Map rows with values in the order of `TrademarkRepository.similar_fields` to response items."""
+    return [dict(zip(_SIMILAR_ROW_KEYS, row)) for row in rows]
+
+
+def encode_similar_rows(rows: Iterable[Sequence[Any]], next_cursor: str | None = None) -> bytes:
+    """Encode rows as the body of a search response with `result` and `next_cursor`."""
+    return to_json({'result': similar_rows_as_dicts(rows), 'next_cursor': next_cursor})
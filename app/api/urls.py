@@ -1,9 +1,19 @@
 from aiohttp import web
 
+from app.api.handlers.metrics import metrics
+from app.api.handlers.pool_stats import pool_stats
 from app.api.handlers.register_trademark import register_trademark
+from app.api.handlers.register_trademark_batch import register_trademark_batch
 from app.api.handlers.search_trademark import search_trademark
+from app.api.handlers.search_trademark_batch import search_trademark_batch
+from app.api.handlers.suggest_trademark import suggest_trademark
 
 urls: list[web.RouteDef] = [
     web.get('/trademark', search_trademark),
     web.post('/trademark', register_trademark),
+    web.post('/trademark/batch', register_trademark_batch),
+    web.post('/trademark/search', search_trademark_batch),
+    web.get('/trademark/suggest', suggest_trademark),
+    web.get('/pools', pool_stats),
+    web.get('/metrics', metrics),
 ]
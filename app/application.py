@@ -1,17 +1,33 @@
 import logging
 import sys
 from contextlib import AsyncExitStack
+from functools import partial
+from typing import Sequence
 
+import asyncpg
 from aiohttp import web
-from asyncpg import create_pool, Pool
+from asyncpg import Pool
+from pydantic import PostgresDsn
 
+from app.api.middlewares import create_tracing_middleware, metrics_middleware
 from app.api.urls import urls
+from app.cache import LRUCache
 from app.composition_root import CompositionContainer
-from app.configuration import AppConfig
-from app.repositories.database_session import DatabaseSessionFactory
+from app.configuration import AppConfig, Workload
+from app.models.trademark import Trademark
+from app.repositories.base_repository import BaseRepository
+from app.repositories.database_session import create_connection_pool, DatabaseSessionFactory, ReplicaHealth, ReplicaPool
+from app.repositories.prefix_index import PrefixIndex
 from app.repositories.trademark import TrademarkRepository
+from app.repositories.trigram_index import TrigramIndex
+from app.services.check_replicas import ReplicaHealthChecker
 from app.services.register_trademark import RegisterTrademarkService
+from app.services.register_trademark_batch import RegisterTrademarkBatchService
 from app.services.search_trademark import SearchTrademarkService
+from app.services.search_trademark_batch import SearchTrademarkBatchService
+from app.services.suggest_trademark import SuggestTrademarkService
+from app.services.update_title_index import TitleIndexUpdater
+from app.services.watch_catalog_version import CatalogVersionWatcher
 
 
 async def create_application(config: AppConfig) -> web.Application:
@@ -24,41 +40,179 @@ async def create_application(config: AppConfig) -> web.Application:
     logger = logging.getLogger()
     logger.setLevel(config.logging_level)
 
-    db_connection_pool: Pool = await create_pool(
-        dsn=str(config.postgres_dsn),
-        min_size=0,
-        max_size=10,
-    )
-    exit_stack.push_async_callback(db_connection_pool.close)
+    replicas = [ReplicaHealth(name=_get_dsn_host(dsn)) for dsn in config.postgres_replica_dsns]
+    db_session_factories = {
+        workload: await _create_db_session_factory(
+            config,
+            workload=workload,
+            replicas=replicas if workload.is_read_only else [],
+            exit_stack=exit_stack,
+        )
+        for workload in Workload
+    }
 
-    db_session_factory = DatabaseSessionFactory(
-        connection_pool=db_connection_pool,
-    )
+    if replicas:
+        replica_health_checker = ReplicaHealthChecker(
+            logger=logger,
+            replica_pools=db_session_factories[Workload.search_exact].replica_pools,
+            max_lag=config.replica_max_lag,
+            check_interval=config.replica_check_interval,
+        )
+        await replica_health_checker.start()
+        exit_stack.push_async_callback(replica_health_checker.stop)
 
     trademark_repository = TrademarkRepository()
 
+    exact_match_cache: LRUCache[str, Trademark | None] | None = None
+    if config.exact_match_cache_size > 0:
+        exact_match_cache = LRUCache(max_size=config.exact_match_cache_size, ttl=config.exact_match_cache_ttl)
+
+    trigram_index = None
+    if config.trigram_index_enabled:
+        trigram_index = TrigramIndex()
+        trigram_index_updater = TitleIndexUpdater(
+            logger=logger,
+            db_session_factory=db_session_factories[Workload.search_fuzzy],
+            trademark_repository=trademark_repository,
+            title_index=trigram_index,
+            refresh_interval=config.trigram_index_refresh_interval,
+            name='trigram',
+        )
+        await trigram_index_updater.start()
+        exit_stack.push_async_callback(trigram_index_updater.stop)
+
+    prefix_index = None
+    if config.prefix_index_enabled:
+        prefix_index = PrefixIndex()
+        prefix_index_updater = TitleIndexUpdater(
+            logger=logger,
+            db_session_factory=db_session_factories[Workload.search_exact],
+            trademark_repository=trademark_repository,
+            title_index=prefix_index,
+            refresh_interval=config.prefix_index_refresh_interval,
+            name='prefix',
+            # Suggestions complete titles of all trademarks
+            include_expired=True,
+        )
+        await prefix_index_updater.start()
+        exit_stack.push_async_callback(prefix_index_updater.stop)
+
     search_tm_service = SearchTrademarkService(
         logger=logger,
-        db_session_factory=db_session_factory,
+        db_session_factory=db_session_factories[Workload.search_exact],
+        fuzzy_db_session_factory=db_session_factories[Workload.search_fuzzy],
+        trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+        exact_match_cache=exact_match_cache,
+        raw_rows=config.search_raw_rows,
+    )
+    search_tm_batch_service = SearchTrademarkBatchService(
+        logger=logger,
+        db_session_factory=db_session_factories[Workload.search_exact],
+        fuzzy_db_session_factory=db_session_factories[Workload.search_fuzzy],
+        trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+        exact_match_cache=exact_match_cache,
+    )
+    suggest_tm_service = SuggestTrademarkService(
+        logger=logger,
+        db_session_factory=db_session_factories[Workload.search_exact],
         trademark_repository=trademark_repository,
+        prefix_index=prefix_index,
     )
     register_tm_service = RegisterTrademarkService(
         logger=logger,
-        db_session_factory=db_session_factory,
+        db_session_factory=db_session_factories[Workload.write],
         trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+        prefix_index=prefix_index,
+        exact_match_cache=exact_match_cache,
+        on_title_registered=[search_tm_service.forget_exact_in_flight],
+        batch_max_size=config.register_batch_max_size,
+        batch_max_delay=config.register_batch_max_delay,
+    )
+    register_tm_batch_service = RegisterTrademarkBatchService(
+        logger=logger,
+        db_session_factory=db_session_factories[Workload.write],
+        trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+        prefix_index=prefix_index,
+        exact_match_cache=exact_match_cache,
+        on_title_registered=[search_tm_service.forget_exact_in_flight],
     )
 
+    catalog_version_watcher = None
+    if config.catalog_version_enabled:
+        on_change = [search_tm_service.forget_in_flight]
+        if exact_match_cache is not None:
+            on_change.append(exact_match_cache.clear)
+        catalog_version_watcher = CatalogVersionWatcher(
+            logger=logger,
+            connect=partial(asyncpg.connect, dsn=str(config.postgres_dsn)),
+            reconnect_interval=config.catalog_version_reconnect_interval,
+            # A replica in rotation lags behind the primary by `replica_max_lag` at most when it is checked,
+            # and it may fall further behind for up to `replica_check_interval` until the next check
+            publish_delay=config.replica_max_lag + config.replica_check_interval if replicas else 0,
+            on_change=on_change,
+        )
+        await catalog_version_watcher.start()
+        exit_stack.push_async_callback(catalog_version_watcher.stop)
+
     composition_container = CompositionContainer(
         logger=logger,
-        connection_pool=db_connection_pool,
+        db_session_factories=db_session_factories,
         trademark_repository=trademark_repository,
+        exact_match_cache=exact_match_cache,
+        catalog_version_watcher=catalog_version_watcher,
         search_tm_service=search_tm_service,
+        search_tm_batch_service=search_tm_batch_service,
+        suggest_tm_service=suggest_tm_service,
         register_tm_service=register_tm_service,
+        register_tm_batch_service=register_tm_batch_service,
     )
 
-    application = web.Application()
+    tracing_middleware = create_tracing_middleware(logger, slow_request_threshold=config.slow_request_threshold)
+    application = web.Application(middlewares=[tracing_middleware, metrics_middleware])
     application['composition_container'] = composition_container
     application.add_routes(urls)
     application.on_cleanup.append(_cleanup)
 
     return application
+
+
+def _get_dsn_host(dsn: PostgresDsn) -> str:
+    host = dsn.hosts()[0]
+    return f'{host["host"]}:{host["port"] or 5432}'
+
+
+async def _create_db_session_factory(
+        config: AppConfig,
+        workload: Workload,
+        replicas: Sequence[ReplicaHealth],
+        exit_stack: AsyncExitStack,
+) -> DatabaseSessionFactory:
+    """Create pools of the workload to the primary and to every replica, each one of the workload's size."""
+    pool_config = config.get_pool_config(workload)
+
+    async def _create_pool(dsn: PostgresDsn) -> Pool:  # noqa: WPS430
+        connection_pool = await create_connection_pool(
+            dsn=str(dsn),
+            statements=BaseRepository.collect_statements(),
+            min_size=0,
+            max_size=pool_config.max_size,
+            prepared_statements=config.postgres_prepared_statements,
+            statement_timeout=pool_config.statement_timeout,
+        )
+        exit_stack.push_async_callback(connection_pool.close)
+        return connection_pool
+
+    replica_pools = [
+        ReplicaPool(health=replica, connection_pool=await _create_pool(dsn))
+        for replica, dsn in zip(replicas, config.postgres_replica_dsns)
+    ]
+    return DatabaseSessionFactory(
+        connection_pool=await _create_pool(config.postgres_dsn),
+        acquire_timeout=pool_config.acquire_timeout,
+        name=workload.value,
+        replica_pools=replica_pools,
+    )
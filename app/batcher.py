@@ -0,0 +1,70 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Sequence, TypeVar
+
+ItemT = TypeVar('ItemT')
+ResultT = TypeVar('ResultT')
+
+
+class Batcher(Generic[ItemT, ResultT]):
+    """Groups items submitted concurrently, so that they are handled by one call.
+
+    A batch is handled `max_delay` seconds after its first item was submitted, or as soon as it has
+    `max_size` items. The call returns a result per item, in the order of the items, and every
+    submitter gets the result of its item or the exception of the call, or is cancelled with the call.
+    A batch does not wait for the previous one to be handled, the next items are collected meanwhile.
+    """
+
+    def __init__(
+            self,
+            handle_batch: Callable[[list[ItemT]], Awaitable[Sequence[ResultT]]],
+            max_size: int,
+            max_delay: float,
+    ) -> None:
+        self._handle_batch = handle_batch
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._pending: list[tuple[ItemT, asyncio.Future[ResultT]]] = []
+        self._flush_timer: asyncio.TimerHandle | None = None
+        # Keeps running calls referenced, the event loop does not
+        self._calls: set[asyncio.Task[None]] = set()
+
+    async def submit(self, item: ItemT) -> ResultT:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[ResultT] = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self._max_delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._pending = self._pending, []
+        call = asyncio.create_task(self._run(batch))
+        self._calls.add(call)
+        call.add_done_callback(self._calls.discard)
+
+    async def _run(self, batch: list[tuple[ItemT, asyncio.Future[ResultT]]]) -> None:
+        try:
+            results = await self._handle_batch([item for item, _ in batch])
+        except Exception as any_error:
+            for _, future in batch:
+                # Submitters that were cancelled do not wait for their results
+                if not future.done():
+                    future.set_exception(any_error)
+            return
+        except BaseException:
+            # The call was cancelled (or the process is exiting), submitters must not wait forever
+            for _, future in batch:
+                future.cancel()
+            raise
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
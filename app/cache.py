@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, NamedTuple, TypeVar
+
+KeyT = TypeVar('KeyT', bound=Hashable)
+ValueT = TypeVar('ValueT')
+
+
+class CacheStats(NamedTuple):
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+
+class CacheLookup(NamedTuple, Generic[ValueT]):
+    found: bool
+    value: ValueT | None = None
+
+
+class LRUCache(Generic[KeyT, ValueT]):
+    """Bounded cache with least-recently-used eviction and a time-to-live for every entry.
+
+    Writers call `invalidate` after changing the underlying data. A reader that started a lookup
+    before an invalidation passes the `version` it saw to `set`, and its possibly stale value is dropped.
+    """
+
+    def __init__(
+            self,
+            max_size: int,
+            ttl: float,
+            clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[KeyT, tuple[float, ValueT]] = OrderedDict()
+        self._version = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            size=len(self._entries),
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            expirations=self._expirations,
+        )
+
+    def get(self, key: KeyT) -> CacheLookup[ValueT]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return CacheLookup(found=False)
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self._expirations += 1
+            self._misses += 1
+            return CacheLookup(found=False)
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return CacheLookup(found=True, value=value)
+
+    def set(self, key: KeyT, value: ValueT, version: int | None = None) -> None:
+        if version is not None and version != self._version:
+            return
+
+        self._entries[key] = (self._clock() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, key: KeyT) -> None:
+        self._version += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Invalidate every entry, e.g. after a change of the underlying data by someone else."""
+        self._version += 1
+        self._entries.clear()
@@ -1,18 +1,30 @@
 from logging import Logger
 from typing import NamedTuple
 
-from asyncpg import Pool
-
+from app.cache import LRUCache
+from app.configuration import Workload
+from app.models.trademark import Trademark
+from app.repositories.database_session import DatabaseSessionFactory
 from app.repositories.trademark import TrademarkRepository
 from app.services.register_trademark import RegisterTrademarkService
+from app.services.register_trademark_batch import RegisterTrademarkBatchService
 from app.services.search_trademark import SearchTrademarkService
+from app.services.search_trademark_batch import SearchTrademarkBatchService
+from app.services.suggest_trademark import SuggestTrademarkService
+from app.services.watch_catalog_version import CatalogVersionWatcher
 
 
 class CompositionContainer(NamedTuple):
     logger: Logger
-    connection_pool: Pool
+    db_session_factories: dict[Workload, DatabaseSessionFactory]
 
     trademark_repository: TrademarkRepository
+    exact_match_cache: LRUCache[str, Trademark | None] | None
+    # Validates search results of conditional requests, None when they are not answered
+    catalog_version_watcher: CatalogVersionWatcher | None
 
     register_tm_service: RegisterTrademarkService
+    register_tm_batch_service: RegisterTrademarkBatchService
     search_tm_service: SearchTrademarkService
+    search_tm_batch_service: SearchTrademarkBatchService
+    suggest_tm_service: SuggestTrademarkService
@@ -0,0 +1,198 @@
+"""Counters, gauges and histograms rendered in the Prometheus text exposition format.
+
+Metrics are updated from the event loop thread only, so recording a value is a dict lookup and
+an integer increment, without locks. Each worker process has its own registry.
+"""
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Awaitable, Callable, cast, Generic, Iterable, Sequence, TypeVar
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+SeriesT = TypeVar('SeriesT')
+AsyncFunctionT = TypeVar('AsyncFunctionT', bound=Callable[..., Awaitable[Any]])
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+
+    pairs = ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values))
+    return f'{{{pairs}}}'
+
+
+class _Metric(Generic[SeriesT]):
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._series: dict[tuple[str, ...], SeriesT] = {}
+
+    def labels(self, *label_values: str) -> SeriesT:
+        series = self._series.get(label_values)
+        if series is None:
+            if len(label_values) != len(self.label_names):
+                raise ValueError(f'{self.name} expects labels {self.label_names}, got {label_values}')
+            series = self._series[label_values] = self._create_series()
+
+        return series
+
+    def render(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.type_name}'
+        for label_values, series in self._series.items():
+            yield from self._render_series(label_values, series)
+
+    def _create_series(self) -> SeriesT:
+        raise NotImplementedError
+
+    def _render_series(self, label_values: tuple[str, ...], series: SeriesT) -> Iterable[str]:
+        raise NotImplementedError
+
+
+MetricT = TypeVar('MetricT', bound=_Metric[Any])
+
+
+class Value:
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value: float = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:  # noqa: WPS125
+        self.value = value
+
+
+class _ValueMetric(_Metric[Value]):
+    def _create_series(self) -> Value:
+        return Value()
+
+    def _render_series(self, label_values: tuple[str, ...], series: Value) -> Iterable[str]:
+        yield f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(series.value)}'
+
+
+class Counter(_ValueMetric):
+    """Monotonically growing value, `set` is for totals counted elsewhere and copied at scrape time."""
+
+    type_name = 'counter'
+
+
+class Gauge(_ValueMetric):
+    type_name = 'gauge'
+
+
+class HistogramSeries:
+    __slots__ = ('bounds', 'bucket_counts', 'sum', 'count')
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # The last bucket is +Inf
+        self.bucket_counts = [0] * (len(bounds) + 1)
+        self.sum: float = 0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric[HistogramSeries]):
+    type_name = 'histogram'
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            label_names: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names=label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _create_series(self) -> HistogramSeries:
+        return HistogramSeries(self.buckets)
+
+    def _render_series(self, label_values: tuple[str, ...], series: HistogramSeries) -> Iterable[str]:
+        label_names = (*self.label_names, 'le')
+        cumulative_count = 0
+        for bound, bucket_count in zip((*self.buckets, float('inf')), series.bucket_counts):
+            cumulative_count += bucket_count
+            labels = _format_labels(label_names, (*label_values, _format_value(bound)))
+            yield f'{self.name}_bucket{labels} {cumulative_count}'
+
+        labels = _format_labels(self.label_names, label_values)
+        yield f'{self.name}_sum{labels} {_format_value(series.sum)}'
+        yield f'{self.name}_count{labels} {series.count}'
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric[Any]] = {}
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names=label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names=label_names))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            label_names: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names=label_names, buckets=buckets))
+
+    def render(self) -> str:
+        lines = [line for metric in self._metrics.values() for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric: MetricT) -> MetricT:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def timed(series: HistogramSeries) -> Callable[[AsyncFunctionT], AsyncFunctionT]:
+    """Record the duration of every call of an async function, including failed ones."""
+
+    def decorator(function: AsyncFunctionT) -> AsyncFunctionT:
+        @wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started_at = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                series.observe(time.perf_counter() - started_at)
+
+        return cast(AsyncFunctionT, wrapper)
+
+    return decorator
+
+
+# Registry of the process, metrics are declared next to the code that records them
+REGISTRY = MetricsRegistry()
@@ -1,10 +1,38 @@
+import re
+import unicodedata
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import date
+from enum import StrEnum
 from typing import Annotated
 
 from pydantic import BaseModel, Field, StringConstraints
 
 from app.models.id import generate_id
 
+# Combining Diacritical Marks, what is left of accents after the NFKD decomposition
+_ACCENTS_PATTERN = re.compile('[\u0300-\u036f]')
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a title for exact matching, the same way as `data.normalize_title()` in the database.
+
+    Titles are decomposed (NFKD) and lower-cased with accents dropped, runs of whitespace are collapsed
+    into one space and the ends are trimmed, so "Café  Wave " and "CAFE WAVE" are the same title.
+    """
+    decomposed = unicodedata.normalize('NFKD', title).lower()
+    return ' '.join(_ACCENTS_PATTERN.sub('', decomposed).split())
+
+
+class SimilarityMode(StrEnum):
+    """pg_trgm measure of how similar a title is to the searched one."""
+
+    # Similarity of the whole titles
+    similarity = 'similarity'
+    # Greatest similarity of the searched title to a part of the title, finds a mark inside longer titles
+    word_similarity = 'word_similarity'
+    # Same as `word_similarity`, but the part of the title must consist of whole words
+    strict_word_similarity = 'strict_word_similarity'
+
 
 class Trademark(BaseModel):
     id: str = Field(default_factory=generate_id)
@@ -14,3 +42,28 @@ class Trademark(BaseModel):
     application_date: date
     registration_date: date
     expiry_date: date
+
+
+class SimilarTrademark(Trademark):
+    score: float
+    # Trigram distance (1 - similarity, in single precision) used to order and paginate results
+    distance: float = Field(exclude=True)
+
+
+class TrademarkSuggestion(BaseModel):
+    id: str
+    title: str
+
+
+class SearchCursor(BaseModel):
+    """Position after the last returned item of a similarity search, passed to clients as an opaque string."""
+
+    distance: float
+    id: str
+
+    @classmethod
+    def decode(cls, encoded: str) -> 'SearchCursor':
+        return cls.model_validate_json(urlsafe_b64decode(encoded))
+
+    def encode(self) -> str:
+        return urlsafe_b64encode(self.model_dump_json().encode()).decode()
@@ -1,11 +1,23 @@
 from abc import ABC, abstractmethod
 from functools import cached_property
-from typing import Any
+from typing import Any, ClassVar, Iterable
 
 from pydantic import BaseModel
 
+from app.repositories.database_session import Statement
+
 
 class BaseRepository(ABC):
+    # Catalogue of the repository statements by their short names, built once per class
+    statements: ClassVar[dict[str, Statement]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.statements = {
+            statement.name: statement._replace(name=f'{cls.table_name}.{statement.name}')
+            for statement in cls._declare_statements()
+        }
+
     @property
     @abstractmethod
     def table_name(self) -> str:
@@ -20,15 +32,36 @@ class BaseRepository(ABC):
     def columns(self) -> str:
         return ', '.join(self.fields)
 
+    @classmethod
+    def _declare_statements(cls) -> Iterable[Statement]:
+        return ()
+
+    @classmethod
+    def collect_statements(cls) -> list[Statement]:
+        """Statements of this repository and all its subclasses, to be prepared on new connections."""
+        statements = list(cls.statements.values())
+        for subclass in cls.__subclasses__():
+            statements.extend(subclass.collect_statements())
+
+        return statements
+
     def _get_positions(
             self,
             *,
             start: int = 1,
+    ) -> str:
+        return self._make_positions(len(self.fields), start=start)
+
+    @staticmethod
+    def _make_positions(
+            count: int,
+            *,
+            start: int = 1,
     ) -> str:
         if start < 1:
             raise ValueError('start must be greater than 0')
 
-        end = start + len(self.fields)
+        end = start + count
         return ', '.join(f'${pos}' for pos in range(start, end))
 
     def _get_query_args(
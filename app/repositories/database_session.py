@@ -1,30 +1,270 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Optional
+from functools import partial
+from typing import Any, AsyncGenerator, AsyncIterator, Iterable, Mapping, NamedTuple, Optional, Sequence
 
-from asyncpg import Connection, Pool
+from asyncpg import Connection, create_pool, Pool
+from asyncpg.prepared_stmt import PreparedStatement
+
+from app.metrics import REGISTRY
+from app.tracing import span
+
+_ACQUIRE_WAIT = REGISTRY.histogram(
+    'db_pool_acquire_wait_seconds',
+    'Time sessions waited for a free connection',
+    label_names=('pool',),
+)
+
+
+class Statement(NamedTuple):
+    name: str
+    sql: str
+    # Statements that reference objects created at runtime (e.g. temporary tables) cannot be prepared upfront
+    prepare: bool = True
+
+
+class PreparedStatementsConnection(Connection):  # type: ignore[misc]
+    """Connection that keeps the statements of repository catalogues prepared by name."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: dict[str, PreparedStatement] = {}
+
+
+async def prepare_statements(connection: PreparedStatementsConnection, statements: Iterable[Statement]) -> None:
+    for statement in statements:
+        if statement.prepare:
+            connection.prepared_statements[statement.name] = await connection.prepare(statement.sql)
+
+
+def create_connection_pool(
+        dsn: str,
+        statements: Iterable[Statement],
+        min_size: int,
+        max_size: int,
+        prepared_statements: bool = True,
+        statement_timeout: Optional[float] = None,
+) -> Pool:
+    """Create a pool whose connections prepare the given statements once, right after connecting.
+
+    Without `prepared_statements` (e.g. behind PgBouncer in transaction mode) statements are sent as text
+    and asyncpg's statement cache is disabled, so nothing relies on server-side prepared statements.
+    `statement_timeout` in seconds is set for every connection of the pool.
+    """
+    server_settings = {}
+    if statement_timeout is not None:
+        server_settings['statement_timeout'] = str(int(statement_timeout * 1000))
+
+    if not prepared_statements:
+        return create_pool(
+            dsn=dsn,
+            min_size=min_size,
+            max_size=max_size,
+            statement_cache_size=0,
+            server_settings=server_settings,
+        )
+
+    return create_pool(
+        dsn=dsn,
+        min_size=min_size,
+        max_size=max_size,
+        connection_class=PreparedStatementsConnection,
+        init=partial(prepare_statements, statements=tuple(statements)),
+        server_settings=server_settings,
+    )
 
 
 class DatabaseSession:
     def __init__(self, connection: Connection) -> None:
         self._connection = connection
+        self._prepared_statements: Mapping[str, PreparedStatement] = getattr(connection, 'prepared_statements', {})
+
+    async def execute(self, statement: Statement, *args: Any) -> None:
+        prepared_statement = self._prepared_statements.get(statement.name)
+        with span('db.execute', statement.name):
+            if prepared_statement is None:
+                await self._connection.execute(statement.sql, *args)
+            else:
+                await prepared_statement.fetch(*args)
+
+    async def fetch(self, statement: Statement, *args: Any) -> Any:
+        prepared_statement = self._prepared_statements.get(statement.name)
+        with span('db.fetch', statement.name):
+            if prepared_statement is None:
+                return await self._connection.fetch(statement.sql, *args)
+
+            return await prepared_statement.fetch(*args)
+
+    async def iterate(self, statement: Statement, *args: Any, prefetch: Optional[int] = None) -> AsyncIterator[Any]:
+        """Stream query results through a server-side cursor, must be called inside a transaction."""
+        prepared_statement = self._prepared_statements.get(statement.name)
+        if prepared_statement is None:
+            cursor = self._connection.cursor(statement.sql, *args, prefetch=prefetch)
+        else:
+            cursor = prepared_statement.cursor(*args, prefetch=prefetch)
 
-    async def execute(self, query: str, *args: Any) -> None:
-        await self._connection.execute(query, *args)
+        async for record in cursor:
+            yield record
 
-    async def fetch(self, query: str, *args: Any) -> Any:
-        return await self._connection.fetch(query, *args)
+    async def iterate_chunks(self, statement: Statement, *args: Any, chunk_size: int) -> AsyncIterator[list[Any]]:
+        """Fetch query results through a server-side cursor by chunks, must be called inside a transaction."""
+        prepared_statement = self._prepared_statements.get(statement.name)
+        if prepared_statement is None:
+            cursor = await self._connection.cursor(statement.sql, *args)
+        else:
+            cursor = await prepared_statement.cursor(*args)
+
+        while rows := await cursor.fetch(chunk_size):
+            yield rows
+
+    async def copy_records(
+            self,
+            table_name: str,
+            records: Iterable[Sequence[Any]],
+            columns: Sequence[str],
+    ) -> None:
+        with span('db.copy', table_name):
+            await self._connection.copy_records_to_table(table_name, records=records, columns=columns)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncGenerator[None, None]:
+        async with self._connection.transaction():
+            yield
+
+
+class ReplicaHealth:
+    """Last known state of a read replica, shared by all pools connected to it."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.available = False
+        # Seconds the replica is behind the primary, None until it is checked successfully
+        self.lag: Optional[float] = None
+
+
+class ReplicaPool(NamedTuple):
+    health: ReplicaHealth
+    connection_pool: Pool
+
+
+def _count_busy_connections(replica_pool: ReplicaPool) -> int:
+    connection_pool = replica_pool.connection_pool
+    return connection_pool.get_size() - connection_pool.get_idle_size()  # type: ignore[no-any-return]
+
+
+class PoolStats(NamedTuple):
+    name: str
+    # Connections of the pools that currently serve sessions: available replicas or, without them, the primary
+    size: int
+    max_size: int
+    idle: int
+    in_use: int
+    # Sessions waiting for a free connection
+    waiting: int
+    acquired: int
+    acquire_timeouts: int
+    # Seconds spent waiting for connections by all acquired sessions
+    acquire_wait_total: float
+    replicas: int = 0
+    available_replicas: int = 0
+
+    @property
+    def saturation(self) -> float:
+        return self.in_use / self.max_size if self.max_size else 0
+
+    @property
+    def acquire_wait_average(self) -> float:
+        return self.acquire_wait_total / self.acquired if self.acquired else 0
 
 
 class DatabaseSessionFactory:
+    """Gives out sessions on connections of the primary pool or, when there are any, of read replicas.
+
+    Sessions go to the available replica with the fewest busy connections, replicas with the same number
+    are taken in turns. The primary is used when no replica is available.
+    """
+
     def __init__(
             self,
             connection_pool: Pool,
-            acquire_timeout: Optional[int] = None,
+            acquire_timeout: Optional[float] = None,
+            name: str = 'default',
+            replica_pools: Sequence[ReplicaPool] = (),
     ) -> None:
         self._connection_pool = connection_pool
         self._acquire_timeout = acquire_timeout
+        self._name = name
+        self._replica_pools = tuple(replica_pools)
+        self._next_replica = 0
+
+        self._in_use = 0
+        self._waiting = 0
+        self._acquired = 0
+        self._acquire_timeouts = 0
+        self._acquire_wait_total = 0.0
+        self._acquire_wait = _ACQUIRE_WAIT.labels(name)
+
+    @property
+    def replica_pools(self) -> tuple[ReplicaPool, ...]:
+        return self._replica_pools
+
+    @property
+    def stats(self) -> PoolStats:
+        available_pools = self._get_available_replica_pools()
+        serving_pools = [replica_pool.connection_pool for replica_pool in available_pools] or [self._connection_pool]
+        return PoolStats(
+            name=self._name,
+            size=sum(pool.get_size() for pool in serving_pools),
+            max_size=sum(pool.get_max_size() for pool in serving_pools),
+            idle=sum(pool.get_idle_size() for pool in serving_pools),
+            in_use=self._in_use,
+            waiting=self._waiting,
+            acquired=self._acquired,
+            acquire_timeouts=self._acquire_timeouts,
+            acquire_wait_total=self._acquire_wait_total,
+            replicas=len(self._replica_pools),
+            available_replicas=len(available_pools),
+        )
 
     @asynccontextmanager
     async def create_session(self) -> AsyncGenerator[DatabaseSession, None]:
-        async with self._connection_pool.acquire(timeout=self._acquire_timeout) as connection:
+        connection_pool = self._choose_pool()
+        with span('db.acquire', self._name):
+            connection = await self._acquire(connection_pool)
+        self._in_use += 1
+        try:
             yield DatabaseSession(connection=connection)
+        finally:
+            self._in_use -= 1
+            await connection_pool.release(connection)
+
+    def _get_available_replica_pools(self) -> list[ReplicaPool]:
+        return [replica_pool for replica_pool in self._replica_pools if replica_pool.health.available]
+
+    def _choose_pool(self) -> Pool:
+        available_pools = self._get_available_replica_pools()
+        if not available_pools:
+            return self._connection_pool
+
+        # `min()` returns the first of equally busy pools, so the list is rotated to take them in turns
+        self._next_replica = (self._next_replica + 1) % len(available_pools)
+        rotated_pools = available_pools[self._next_replica:] + available_pools[:self._next_replica]
+        return min(rotated_pools, key=_count_busy_connections).connection_pool
+
+    async def _acquire(self, connection_pool: Pool) -> Connection:
+        started_at = time.monotonic()
+        self._waiting += 1
+        try:
+            connection = await connection_pool.acquire(timeout=self._acquire_timeout)
+        except asyncio.TimeoutError:
+            self._acquire_timeouts += 1
+            raise
+        finally:
+            self._waiting -= 1
+
+        wait_time = time.monotonic() - started_at
+        self._acquired += 1
+        self._acquire_wait_total += wait_time
+        self._acquire_wait.observe(wait_time)
+        return connection
@@ -0,0 +1,71 @@
+"""In-process index for prefix search over normalized titles.
+
+Titles are kept sorted by normalized title in code point order, which is the byte order of UTF-8 and so
+the order of the `text_pattern_ops` index in the database: both return the same suggestions in the same
+order. Registrations made after the index was built go to a small sorted delta until the next rebuild.
+"""
+import asyncio
+from bisect import bisect_left, insort
+from typing import Awaitable, Callable, Iterable, NamedTuple
+
+from app.models.trademark import normalize_title
+
+
+class PrefixMatch(NamedTuple):
+    title_normalized: str
+    id: str
+    title: str
+
+
+def _find_in_sorted(matches: list[PrefixMatch], prefix: str, limit: int) -> list[PrefixMatch]:
+    start = bisect_left(matches, (prefix,))
+    found: list[PrefixMatch] = []
+    for position in range(start, min(start + limit, len(matches))):
+        match = matches[position]
+        if not match.title_normalized.startswith(prefix):
+            break
+        found.append(match)
+
+    return found
+
+
+class PrefixIndex:
+    def __init__(self) -> None:
+        self._segment: list[PrefixMatch] = []
+        self._delta: list[PrefixMatch] = []
+
+    def __len__(self) -> int:
+        return len(self._segment) + len(self._delta)
+
+    async def rebuild(self, load_rows: Callable[[], Awaitable[list[tuple[str, str]]]]) -> None:
+        """Replace the index contents with `(id, title)` rows of a fresh catalog snapshot.
+
+        Titles are normalized and sorted in a worker thread so that the event loop keeps serving requests.
+        Titles added after the snapshot was requested stay in the delta.
+        """
+        delta_before = set(self._delta)
+        rows = await load_rows()
+        segment = await asyncio.get_running_loop().run_in_executor(None, _build_segment, rows)
+
+        self._segment = segment
+        self._delta = [match for match in self._delta if match not in delta_before]
+
+    def add(self, doc_id: str, title: str) -> None:
+        insort(self._delta, PrefixMatch(title_normalized=normalize_title(title), id=doc_id, title=title))
+
+    def find(self, prefix: str, limit: int) -> list[PrefixMatch]:
+        """Return up to `limit` titles whose normalized form starts with the normalized prefix, in index order."""
+        matches = _find_in_sorted(self._segment, prefix, limit=limit)
+        if self._delta:
+            # A title registered after the snapshot was requested may be in both parts
+            delta_matches = _find_in_sorted(self._delta, prefix, limit=limit)
+            matches = sorted(set(matches).union(delta_matches))[:limit]
+
+        return matches
+
+
+def _build_segment(rows: Iterable[tuple[str, str]]) -> list[PrefixMatch]:
+    return sorted(
+        PrefixMatch(title_normalized=normalize_title(title), id=doc_id, title=title)
+        for doc_id, title in rows
+    )
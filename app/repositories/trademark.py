@@ -1,42 +1,455 @@
-from app.models.trademark import Trademark
+from datetime import date
+from typing import Any, AsyncIterator, Iterable, NamedTuple, Sequence
+
+from app.metrics import REGISTRY, timed
+from app.models.trademark import (
+    normalize_title,
+    SearchCursor,
+    SimilarityMode,
+    SimilarTrademark,
+    Trademark,
+    TrademarkSuggestion,
+)
 from app.repositories.base_repository import BaseRepository
-from app.repositories.database_session import DatabaseSession
+from app.repositories.database_session import DatabaseSession, Statement
+from app.tracing import span
+
+_QUERY_DURATION = REGISTRY.histogram(
+    'trademark_repository_query_duration_seconds',
+    'Duration of TrademarkRepository queries',
+    label_names=('method',),
+)
+
+
+# U+10FFFF is a noncharacter, titles are not expected to contain it
+PREFIX_UPPER_BOUND_CHAR = chr(0x10FFFF)
+
+
+class SimilarityOperators(NamedTuple):
+    """pg_trgm functions and operators of a similarity mode, `{query}` stands for the searched title."""
+
+    statement_name: str
+    score: str
+    # Operator served by the trigram indexes, true when the score is at least the threshold setting
+    match: str
+    # `1 - score`, also served by the GiST index as the KNN ordering
+    distance: str
+    threshold_setting: str
+    # Default value of the threshold setting
+    default_threshold: float
+
+
+SIMILARITY_OPERATORS = {
+    SimilarityMode.similarity: SimilarityOperators(
+        statement_name='find_similar',
+        score='similarity(title, {query})',
+        match='title % {query}',
+        distance='title <-> {query}',
+        threshold_setting='pg_trgm.similarity_threshold',
+        default_threshold=0.3,
+    ),
+    SimilarityMode.word_similarity: SimilarityOperators(
+        statement_name='find_word_similar',
+        score='word_similarity({query}, title)',
+        match='{query} <% title',
+        distance='{query} <<-> title',
+        threshold_setting='pg_trgm.word_similarity_threshold',
+        default_threshold=0.6,
+    ),
+    SimilarityMode.strict_word_similarity: SimilarityOperators(
+        statement_name='find_strict_word_similar',
+        score='strict_word_similarity({query}, title)',
+        match='{query} <<% title',
+        distance='{query} <<<-> title',
+        threshold_setting='pg_trgm.strict_word_similarity_threshold',
+        default_threshold=0.5,
+    ),
+}
+
+
+def get_expiry_bound(include_expired: bool) -> date:
+    """Earliest expiry date of searched trademarks: searches skip expired ones unless they include them.
+
+    Statements compare `expiry_date` with it, so that the partitions of past years are pruned.
+    """
+    return date.min if include_expired else date.today()
+
+
+class SimilarQuery(NamedTuple):
+    title: str
+    similarity: float
+    limit: int
 
 
 class TrademarkRepository(BaseRepository):
     table_name = 'data.trademark'
+    staging_table_name = 'trademark_staging'
     fields = tuple(Trademark.model_fields.keys())
+    similar_fields = (*fields, 'score', 'distance')
+    # Database types of `fields`, in the same order
+    field_types = ('text', 'text', 'text', 'text', 'date', 'date', 'date')
+
+    @classmethod
+    def _declare_statements(cls) -> Iterable[Statement]:
+        columns = ', '.join(cls.fields)
+
+        # The catalog is partitioned by `expiry_date` and cannot have a unique index of titles, a row whose title
+        # is registered by another trademark is skipped by the `trademark_claim_title` trigger instead.
+        # Skipped rows are not returned, as with a conflict of ON CONFLICT DO NOTHING.
+        yield Statement('create', f"""
+        INSERT INTO {cls.table_name} ({columns})
+        VALUES ({cls._make_positions(len(cls.fields))})
+        ON CONFLICT DO NOTHING
+        RETURNING id
+        """)
+
+        # Every argument is an array with a value of one field per trademark
+        arrays = ', '.join(
+            f'${position}::{field_type}[]'
+            for position, field_type in enumerate(cls.field_types, start=1)
+        )
+        yield Statement('create_batch', f"""
+        INSERT INTO {cls.table_name} ({columns})
+        SELECT {columns}
+        FROM unnest({arrays}) AS batch ({columns})
+        ON CONFLICT DO NOTHING
+        RETURNING id
+        """)
+
+        yield Statement('create_staging', f"""
+        CREATE TEMPORARY TABLE {cls.staging_table_name} (LIKE {cls.table_name})
+        ON COMMIT DROP
+        """, prepare=False)
+
+        yield Statement('merge_staging', f"""
+        INSERT INTO {cls.table_name} ({columns})
+        SELECT {columns}
+        FROM {cls.staging_table_name}
+        ON CONFLICT DO NOTHING
+        RETURNING id
+        """, prepare=False)
+
+        # Exact searches match normalized titles (see `normalize_title`), normalized in Python by the caller.
+        # Searches take the earliest expiry date to look for as the last argument, see `get_expiry_bound`.
+        yield Statement('find_exact', f"""
+        SELECT {columns}
+        FROM {cls.table_name}
+        WHERE title_normalized = $1 AND expiry_date >= $2
+        """)
+
+        yield Statement('find_exact_many', f"""
+        SELECT {columns}, title_normalized
+        FROM {cls.table_name}
+        WHERE title_normalized = ANY($1::text[]) AND expiry_date >= $2
+        """)
+
+        # Normalized titles are compared byte by byte to use the `text_pattern_ops` index, which includes
+        # the returned columns, with bounds instead of LIKE so that a generic plan of the statement uses it too.
+        yield Statement('find_by_prefix', f"""
+        SELECT id, title
+        FROM {cls.table_name}
+        WHERE title_normalized ~>=~ $1 AND title_normalized ~<~ $2
+        ORDER BY title_normalized USING ~<~
+        LIMIT $3
+        """)
+
+        yield Statement('find_by_ids', f"""
+        SELECT {columns}
+        FROM {cls.table_name}
+        WHERE id = ANY($1::text[]) AND expiry_date >= $2
+        """)
+
+        yield Statement('find_titles', f"""
+        SELECT id, title
+        FROM {cls.table_name}
+        WHERE expiry_date >= $1
+        """)
+
+        # Ordered by the trigram distance to use KNN search over the GiST index,
+        # pages are continued after the (distance, id) of the last returned row.
+        for operators in SIMILARITY_OPERATORS.values():
+            score = operators.score.format(query='$1')
+            distance = operators.distance.format(query='$1')
+            yield Statement(operators.statement_name, f"""
+            SELECT {columns}, {score} AS score, {distance} AS distance
+            FROM {cls.table_name}
+            WHERE {operators.match.format(query='$1')} AND {score} > $2 AND ({distance}, id) > ($3, $4)
+                AND expiry_date >= $6
+            ORDER BY {distance}, id
+            LIMIT $5
+            """)
 
-    async def create(self, trademark: Trademark, session: DatabaseSession) -> None:
-        positions = self._get_positions()
+        # The match operators compare scores with a setting instead of the requested similarity, it is set for
+        # the transaction so that the indexes skip less similar titles and a lower similarity finds them all.
+        yield Statement('set_similarity_threshold', """
+        SELECT set_config($1, $2, true)
+        """)
+
+        # One similar search per element of the arrays, each one ordered and limited like `find_similar`
+        yield Statement('find_similar_many', f"""
+        SELECT query.position, similar.*
+        FROM unnest($1::text[], $2::float8[], $3::int[])
+            WITH ORDINALITY AS query(title, similarity, max_results, position)
+        CROSS JOIN LATERAL (
+            SELECT {columns}, similarity(title, query.title) AS score, title <-> query.title AS distance
+            FROM {cls.table_name}
+            WHERE title % query.title AND similarity(title, query.title) > query.similarity AND expiry_date >= $4
+            ORDER BY title <-> query.title, id
+            LIMIT query.max_results
+        ) AS similar
+        ORDER BY query.position, similar.distance, similar.id
+        """)
+
+    @timed(_QUERY_DURATION.labels('create'))
+    async def create(self, trademark: Trademark, session: DatabaseSession) -> bool:
+        """Insert a trademark unless its title is already registered, returns whether it was inserted."""
         query_args = self._get_query_args(source=trademark)
 
-        sql = f"""
-        INSERT INTO {self.table_name} ({self.columns})
-        VALUES ({positions})
+        rows = await session.fetch(self.statements['create'], *query_args)
+        return bool(rows)
+
+    @timed(_QUERY_DURATION.labels('create_batch'))
+    async def create_batch(self, trademarks: Sequence[Trademark], session: DatabaseSession) -> set[str]:
+        """Insert a few trademarks with one statement, skipping titles that are already registered.
+
+        Cheaper than `create_many` for small batches, which costs several round trips and a temporary table.
+        Titles must be unique within the batch. Returns ids of the trademarks actually created.
         """
+        records = [self._get_query_args(source=trademark) for trademark in trademarks]
+        columns = [list(column) for column in zip(*records)]
+
+        rows = await session.fetch(self.statements['create_batch'], *columns)
+        return {row['id'] for row in rows}
 
-        await session.execute(sql, *query_args)
+    @timed(_QUERY_DURATION.labels('create_many'))
+    async def create_many(self, trademarks: Sequence[Trademark], session: DatabaseSession) -> set[str]:
+        """Insert trademarks in bulk, skipping titles that are already registered.
 
-    async def find_exact(self, title: str, session: DatabaseSession) -> Trademark | None:
-        sql = f"""
-        SELECT *
-        FROM {self.table_name}
-        WHERE title = $1
+        Rows are loaded into a temporary staging table with a binary COPY and merged into the catalog
+        by a single statement, all in one transaction. Returns ids of the trademarks actually created.
         """
+        records = [self._get_query_args(source=trademark) for trademark in trademarks]
+
+        async with session.transaction():
+            await session.execute(self.statements['create_staging'])
+            await session.copy_records(self.staging_table_name, records=records, columns=self.fields)
+            rows = await session.fetch(self.statements['merge_staging'])
 
-        rows = await session.fetch(sql, title)
+        return {row['id'] for row in rows}
+
+    @timed(_QUERY_DURATION.labels('find_exact'))
+    async def find_exact(
+            self,
+            title: str,
+            session: DatabaseSession,
+            include_expired: bool = False,
+    ) -> Trademark | None:
+        """Find the trademark whose title is the same as the given one after normalization."""
+        expiry_bound = get_expiry_bound(include_expired)
+        rows = await session.fetch(self.statements['find_exact'], normalize_title(title), expiry_bound)
         if not rows:
             return None
 
         return Trademark(**rows[0])
 
-    async def find_similar(self, title: str, similarity: float, session: DatabaseSession) -> list[Trademark]:
-        sql = f"""
-        SELECT *
-        FROM {self.table_name}
-        WHERE title % $1 AND similarity(title, $1) > $2
+    async def find_by_ids(
+            self,
+            ids: Sequence[str],
+            session: DatabaseSession,
+            include_expired: bool = False,
+    ) -> list[Trademark]:
+        rows = await self.find_rows_by_ids(ids=ids, session=session, include_expired=include_expired)
+        with span('build_models', 'trademark'):
+            return [Trademark(**record) for record in rows]
+
+    @timed(_QUERY_DURATION.labels('find_exact_many'))
+    async def find_exact_many(
+            self,
+            titles: Sequence[str],
+            session: DatabaseSession,
+            include_expired: bool = False,
+    ) -> dict[str, Trademark]:
+        """Find trademarks with any of the titles in one query, returns them by normalized title."""
+        normalized_titles = list({normalize_title(title) for title in titles})
+        expiry_bound = get_expiry_bound(include_expired)
+        rows = await session.fetch(self.statements['find_exact_many'], normalized_titles, expiry_bound)
+
+        trademarks = {}
+        with span('build_models', 'trademark'):
+            for record in rows:
+                fields = dict(record)
+                title_normalized = fields.pop('title_normalized')
+                trademarks[title_normalized] = Trademark(**fields)
+
+        return trademarks
+
+    @timed(_QUERY_DURATION.labels('find_by_prefix'))
+    async def find_by_prefix(self, prefix: str, limit: int, session: DatabaseSession) -> list[TrademarkSuggestion]:
+        """Return up to `limit` trademarks whose normalized title starts with the normalized prefix, in title order."""
+        # Titles starting with the prefix sort before the prefix followed by the greatest code point
+        upper_bound = f'{prefix}{PREFIX_UPPER_BOUND_CHAR}'
+        rows = await session.fetch(self.statements['find_by_prefix'], prefix, upper_bound, limit)
+        return [TrademarkSuggestion(id=record['id'], title=record['title']) for record in rows]
+
+    @timed(_QUERY_DURATION.labels('find_by_ids'))
+    async def find_rows_by_ids(
+            self,
+            ids: Sequence[str],
+            session: DatabaseSession,
+            include_expired: bool = False,
+    ) -> list[Any]:
+        """Same as `find_by_ids`, but returns raw records with values in the order of `fields`."""
+        expiry_bound = get_expiry_bound(include_expired)
+        return await session.fetch(self.statements['find_by_ids'], ids, expiry_bound)  # type: ignore[no-any-return]
+
+    @timed(_QUERY_DURATION.labels('find_titles'))
+    async def find_titles(
+            self,
+            session: DatabaseSession,
+            prefetch: int = 10000,
+            include_expired: bool = False,
+    ) -> list[tuple[str, str]]:
+        statement = self.statements['find_titles']
+        expiry_bound = get_expiry_bound(include_expired)
+        async with session.transaction():
+            return [
+                (record['id'], record['title'])
+                async for record in session.iterate(statement, expiry_bound, prefetch=prefetch)
+            ]
+
+    async def find_similar(
+            self,
+            title: str,
+            similarity: float,
+            limit: int,
+            session: DatabaseSession,
+            cursor: SearchCursor | None = None,
+            mode: SimilarityMode = SimilarityMode.similarity,
+            include_expired: bool = False,
+    ) -> list[SimilarTrademark]:
+        """Return up to `limit` trademarks similar to the title, the most similar first."""
+        rows = await self.find_similar_rows(
+            title,
+            similarity=similarity,
+            limit=limit,
+            session=session,
+            cursor=cursor,
+            mode=mode,
+            include_expired=include_expired,
+        )
+        with span('build_models', 'similar_trademark'):
+            return [SimilarTrademark(**record) for record in rows]
+
+    @timed(_QUERY_DURATION.labels('find_similar'))
+    async def find_similar_rows(
+            self,
+            title: str,
+            similarity: float,
+            limit: int,
+            session: DatabaseSession,
+            cursor: SearchCursor | None = None,
+            mode: SimilarityMode = SimilarityMode.similarity,
+            include_expired: bool = False,
+    ) -> list[Any]:
+        """Same as `find_similar`, but returns raw records with values in the order of `similar_fields`."""
+        operators = SIMILARITY_OPERATORS[mode]
+        statement = self.statements[operators.statement_name]
+        query_args = self._get_similar_query_args(
+            title,
+            similarity=similarity,
+            limit=limit,
+            cursor=cursor,
+            include_expired=include_expired,
+        )
+        if similarity == operators.default_threshold:
+            return await session.fetch(statement, *query_args)  # type: ignore[no-any-return]
+
+        async with session.transaction():
+            await self._set_similarity_threshold(operators, similarity=similarity, session=session)
+            return await session.fetch(statement, *query_args)  # type: ignore[no-any-return]
+
+    @timed(_QUERY_DURATION.labels('find_similar_many'))
+    async def find_similar_many(
+            self,
+            queries: Sequence[SimilarQuery],
+            session: DatabaseSession,
+            include_expired: bool = False,
+    ) -> list[list[SimilarTrademark]]:
+        """Run many similar searches in one query, returns results in the order of queries."""
+        titles, similarities, limits = zip(*queries) if queries else ((), (), ())
+        query_args = (titles, similarities, limits, get_expiry_bound(include_expired))
+        statement = self.statements['find_similar_many']
+        operators = SIMILARITY_OPERATORS[SimilarityMode.similarity]
+        # One setting serves all searches of the query, so it is set to the lowest of them
+        min_similarity = min(similarities, default=operators.default_threshold)
+        if min_similarity == operators.default_threshold:
+            rows = await session.fetch(statement, *query_args)
+        else:
+            async with session.transaction():
+                await self._set_similarity_threshold(operators, similarity=min_similarity, session=session)
+                rows = await session.fetch(statement, *query_args)
+
+        results: list[list[SimilarTrademark]] = [[] for _ in queries]
+        with span('build_models', 'similar_trademark'):
+            for record in rows:
+                fields = dict(record)
+                # Positions of `WITH ORDINALITY` start with 1
+                position = fields.pop('position')
+                results[position - 1].append(SimilarTrademark(**fields))
+
+        return results
+
+    async def iter_similar(
+            self,
+            title: str,
+            similarity: float,
+            session: DatabaseSession,
+            limit: int | None = None,
+            cursor: SearchCursor | None = None,
+            chunk_size: int = 500,
+            mode: SimilarityMode = SimilarityMode.similarity,
+            include_expired: bool = False,
+    ) -> AsyncIterator[list[SimilarTrademark]]:
+        """Stream trademarks similar to the title by chunks through a server-side cursor."""
+        query_args = self._get_similar_query_args(
+            title,
+            similarity=similarity,
+            limit=limit,
+            cursor=cursor,
+            include_expired=include_expired,
+        )
+
+        operators = SIMILARITY_OPERATORS[mode]
+        statement = self.statements[operators.statement_name]
+        async with session.transaction():
+            if similarity != operators.default_threshold:
+                await self._set_similarity_threshold(operators, similarity=similarity, session=session)
+
+            async for rows in session.iterate_chunks(statement, *query_args, chunk_size=chunk_size):
+                yield [SimilarTrademark(**record) for record in rows]
+
+    async def _set_similarity_threshold(
+            self,
+            operators: SimilarityOperators,
+            similarity: float,
+            session: DatabaseSession,
+    ) -> None:
+        """Make the match operator skip titles less similar than `similarity` until the end of the transaction.
+
+        Results do not change, they are filtered by the requested similarity anyway, but the trigram indexes
+        stop returning candidates that would be rechecked and thrown away.
         """
+        statement = self.statements['set_similarity_threshold']
+        await session.execute(statement, operators.threshold_setting, str(similarity))
 
-        rows = await session.fetch(sql, title, similarity)
-        return [Trademark(**record) for record in rows]
+    @staticmethod
+    def _get_similar_query_args(
+            title: str,
+            similarity: float,
+            limit: int | None,
+            cursor: SearchCursor | None,
+            include_expired: bool,
+    ) -> tuple[Any, ...]:
+        # LIMIT NULL returns all rows
+        after_distance, after_id = (cursor.distance, cursor.id) if cursor is not None else (-1.0, '')
+        return title, similarity, after_distance, after_id, limit, get_expiry_bound(include_expired)
@@ -0,0 +1,172 @@
+"""In-process trigram index that mirrors `pg_trgm` similarity search.
+
+Trigrams are extracted the same way `pg_trgm` does it: the string is split into words of alphanumeric
+characters, every word is lowercased and padded with two spaces in front and one behind, and the set
+of its three-character substrings is taken. Similarity is the number of shared trigrams divided by the
+number of trigrams in the union, computed in single precision like `similarity()`.
+
+The index is stored as CSR-style posting lists: a trigram id points to a range in one flat array of
+document numbers. Registrations made after the index was built go to a small delta that is scanned
+directly until the next rebuild.
+"""
+import asyncio
+from array import array
+from typing import Awaitable, Callable, Iterable, NamedTuple
+
+import numpy as np
+
+TrigramSet = frozenset[str]
+
+
+class SimilarTitle(NamedTuple):
+    id: str
+    score: float
+    # `title <-> query` of pg_trgm
+    distance: float
+
+
+def _iter_words(text: str) -> Iterable[str]:
+    word: list[str] = []
+    for char in text:
+        if char.isalnum():
+            word.append(char)
+        elif word:
+            yield ''.join(word)
+            word = []
+
+    if word:
+        yield ''.join(word)
+
+
+def extract_trigrams(text: str) -> TrigramSet:
+    """Return the trigrams of a string as `pg_trgm.show_trgm()` would."""
+    trigrams: set[str] = set()
+    for word in _iter_words(text):
+        padded = f'  {word.lower()} '
+        trigrams.update(padded[pos:pos + 3] for pos in range(len(padded) - 2))
+
+    return frozenset(trigrams)
+
+
+def similarity(left: TrigramSet, right: TrigramSet) -> float:
+    if not left or not right:
+        return 0
+
+    shared = len(left & right)
+    return float(np.float32(shared) / np.float32(len(left) + len(right) - shared))
+
+
+def _distance(score: float) -> float:
+    return float(np.float32(1) - np.float32(score))
+
+
+class _TrigramSegment:
+    """Immutable part of the index built from a snapshot of the catalog."""
+
+    def __init__(self, rows: Iterable[tuple[str, str]]) -> None:
+        self.trigram_ids: dict[str, int] = {}
+        self.doc_ids: list[str] = []
+
+        doc_sizes = array('i')
+        pair_trigrams = array('i')
+        pair_docs = array('i')
+        for doc_id, title in rows:
+            doc = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+
+            trigrams = extract_trigrams(title)
+            doc_sizes.append(len(trigrams))
+            for trigram in trigrams:
+                pair_trigrams.append(self.trigram_ids.setdefault(trigram, len(self.trigram_ids)))
+                pair_docs.append(doc)
+
+        trigrams_array = np.frombuffer(pair_trigrams, dtype=np.int32)
+        order = np.argsort(trigrams_array, kind='stable')
+
+        self.doc_sizes = np.frombuffer(doc_sizes, dtype=np.int32).copy()
+        self.postings = np.frombuffer(pair_docs, dtype=np.int32)[order]
+        self.offsets = np.zeros(len(self.trigram_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(trigrams_array, minlength=len(self.trigram_ids)), out=self.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def find_similar(self, query_trigrams: TrigramSet, threshold: float) -> list[SimilarTitle]:
+        known_trigrams = [self.trigram_ids[trigram] for trigram in query_trigrams if trigram in self.trigram_ids]
+        if not known_trigrams:
+            return []
+
+        candidates = np.concatenate([
+            self.postings[self.offsets[trigram]:self.offsets[trigram + 1]]
+            for trigram in known_trigrams
+        ])
+        docs, shared = np.unique(candidates, return_counts=True)
+
+        union = self.doc_sizes[docs] + len(query_trigrams) - shared
+        scores = shared.astype(np.float32) / union.astype(np.float32)
+        distances = np.float32(1) - scores
+        scores = scores.astype(np.float64)
+
+        matched = scores > threshold
+        return [
+            SimilarTitle(id=self.doc_ids[doc], score=score, distance=distance)
+            for doc, score, distance in zip(
+                docs[matched].tolist(),
+                scores[matched].tolist(),
+                distances[matched].astype(np.float64).tolist(),
+            )
+        ]
+
+
+class TrigramIndex:
+    """Similarity search over trademark titles that gives the same results as `pg_trgm`."""
+
+    def __init__(self) -> None:
+        self._segment = _TrigramSegment(rows=())
+        self._delta: dict[str, TrigramSet] = {}
+
+    def __len__(self) -> int:
+        return len(self._segment) + len(self._delta)
+
+    async def rebuild(self, load_rows: Callable[[], Awaitable[list[tuple[str, str]]]]) -> None:
+        """Replace the index contents with `(id, title)` rows of a fresh catalog snapshot.
+
+        The segment is built in a worker thread so that the event loop keeps serving requests.
+        Titles added after the snapshot was requested stay in the delta.
+        """
+        delta_before = set(self._delta)
+        rows = await load_rows()
+        segment = await asyncio.get_running_loop().run_in_executor(None, _TrigramSegment, rows)
+
+        self._segment = segment
+        self._delta = {doc_id: trigrams for doc_id, trigrams in self._delta.items() if doc_id not in delta_before}
+
+    def add(self, doc_id: str, title: str) -> None:
+        self._delta[doc_id] = extract_trigrams(title)
+
+    def find_similar(
+            self,
+            title: str,
+            threshold: float,
+            limit: int | None = None,
+            after: tuple[float, str] | None = None,
+    ) -> list[SimilarTitle]:
+        """Return ids of titles similar to the given one ordered by `(distance, id)`, the most similar first.
+
+        `after` continues the search past the `(distance, id)` of the last item of the previous page.
+        """
+        query_trigrams = extract_trigrams(title)
+        if not query_trigrams:
+            return []
+
+        matches = {match.id: match for match in self._segment.find_similar(query_trigrams, threshold=threshold)}
+        for doc_id, trigrams in self._delta.items():
+            score = similarity(query_trigrams, trigrams)
+            if score > threshold:
+                matches[doc_id] = SimilarTitle(id=doc_id, score=score, distance=_distance(score))
+
+        ordered = sorted(matches.values(), key=lambda match: (match.distance, match.id))
+        if after is not None:
+            ordered = [match for match in ordered if (match.distance, match.id) > after]
+
+        return ordered[:limit]
@@ -0,0 +1,118 @@
+"""Running the API in one process or in pre-forked worker processes.
+
+With several workers every worker binds the port with SO_REUSEPORT, and the kernel spreads incoming
+connections between them. The supervisor restarts workers that exit unexpectedly, and on SIGTERM
+or SIGINT passes SIGTERM to the workers, which stop accepting connections and finish in-flight
+requests before exiting.
+"""
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+from types import FrameType
+from typing import Optional
+
+from aiohttp import web
+
+from app.application import create_application
+from app.configuration import AppConfig
+
+# A worker that exits sooner than this after its start is restarted with a delay, to avoid a busy crash loop
+MIN_WORKER_UPTIME = 1
+WORKER_RESTART_DELAY = 1
+
+
+def run_worker(config: AppConfig, reuse_port: bool = False) -> None:
+    web.run_app(
+        create_application(config),
+        port=config.port,
+        reuse_port=reuse_port,
+        shutdown_timeout=config.shutdown_timeout,
+    )
+
+
+def _run_forked_worker(config: AppConfig) -> None:
+    # Signal handlers of the supervisor are inherited through fork, the worker installs its own in `run_app`
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    run_worker(config, reuse_port=True)
+
+
+class _Worker:
+    def __init__(self, number: int, process: multiprocessing.process.BaseProcess) -> None:
+        self.number = number
+        self.process = process
+        self.started_at = time.monotonic()
+
+
+class Supervisor:
+    """Keeps `config.workers` worker processes running until it gets SIGTERM or SIGINT."""
+
+    def __init__(self, config: AppConfig, logger: logging.Logger) -> None:
+        self._config = config
+        self._logger = logger
+        self._context = multiprocessing.get_context('fork')
+        self._workers: dict[int, _Worker] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for number in range(self._config.workers):
+            self._start_worker(number)
+
+        while self._workers:
+            wait([worker.process.sentinel for worker in self._workers.values()])
+            for worker in list(self._workers.values()):
+                if not worker.process.is_alive():
+                    self._on_worker_exit(worker)
+
+        self._logger.info('All workers have stopped')
+
+    def _start_worker(self, number: int) -> None:
+        process = self._context.Process(
+            target=_run_forked_worker,
+            args=(self._config,),
+            name=f'worker-{number}',
+            daemon=False,
+        )
+        process.start()
+        self._workers[number] = _Worker(number=number, process=process)
+        self._logger.info('Worker %s started, pid %s', number, process.pid)
+        # The stop signal may have come while the worker was starting
+        if self._stopping:
+            process.terminate()
+
+    def _on_worker_exit(self, worker: _Worker) -> None:
+        del self._workers[worker.number]
+        worker.process.join()
+        if self._stopping:
+            self._logger.info('Worker %s stopped', worker.number)
+            return
+
+        self._logger.error('Worker %s exited with code %s, restarting', worker.number, worker.process.exitcode)
+        if time.monotonic() - worker.started_at < MIN_WORKER_UPTIME:
+            time.sleep(WORKER_RESTART_DELAY)
+        if not self._stopping:
+            self._start_worker(worker.number)
+
+    def _stop(self, signum: int, frame: Optional[FrameType]) -> None:
+        if self._stopping:
+            return
+
+        self._stopping = True
+        self._logger.info('Got signal %s, stopping workers', signal.Signals(signum).name)
+        for worker in self._workers.values():
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+
+def run_server(config: AppConfig) -> None:
+    if config.workers == 1:
+        run_worker(config)
+        return
+
+    logging.basicConfig(level=config.logging_level)
+    Supervisor(config, logger=logging.getLogger('supervisor')).run()
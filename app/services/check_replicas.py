@@ -0,0 +1,78 @@
+import asyncio
+from logging import Logger
+from typing import Sequence
+
+from app.repositories.database_session import DatabaseSession, ReplicaPool, Statement
+
+# Replay timestamp of an idle primary stops moving, so a replica that has replayed everything it received
+# is not lagging however old its last replayed transaction is. That only holds while it is streaming: a replica
+# whose WAL receiver is down does not know what it is missing, so its lag is unknown (NULL), as it is before
+# the replica has replayed any transaction. The status of the receiver is only visible to superusers and
+# members of `pg_read_all_stats`.
+REPLICATION_LAG_STATEMENT = Statement('replication_lag', """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN NOT EXISTS (SELECT FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END::float8 AS lag
+""", prepare=False)
+
+
+class ReplicaHealthChecker:
+    """Periodically measures replication lag of read replicas and takes lagging or failing ones out of rotation.
+
+    A replica gets sessions again as soon as a check finds it caught up.
+    """
+
+    def __init__(
+            self,
+            logger: Logger,
+            replica_pools: Sequence[ReplicaPool],
+            max_lag: float,
+            check_interval: float,
+    ):
+        self._logger = logger
+        self._replica_pools = replica_pools
+        self._max_lag = max_lag
+        self._check_interval = check_interval
+        self._check_task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        await self.check()
+        self._check_task = asyncio.create_task(self._check_periodically())
+
+    async def stop(self) -> None:
+        if self._check_task is not None:
+            self._check_task.cancel()
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check_replica(replica_pool) for replica_pool in self._replica_pools))
+
+    async def _check_replica(self, replica_pool: ReplicaPool) -> None:
+        health = replica_pool.health
+        try:
+            async with replica_pool.connection_pool.acquire(timeout=self._check_interval) as connection:
+                rows = await DatabaseSession(connection=connection).fetch(REPLICATION_LAG_STATEMENT)
+        except Exception as any_error:
+            if health.available:
+                self._logger.warning('Replica %s is out of rotation, check failed: %s', health.name, any_error)
+            health.available = False
+            return
+
+        lag: float | None = rows[0]['lag']
+        available = lag is not None and lag <= self._max_lag
+        if available != health.available:
+            self._logger.warning(
+                'Replica %s is %s rotation, lag is %s',
+                health.name,
+                'in' if available else 'out of',
+                'unknown, it is not streaming' if lag is None else f'{lag:.1f} s',
+            )
+        health.lag = lag
+        health.available = available
+
+    async def _check_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._check_interval)
+            await self.check()
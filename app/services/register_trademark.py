@@ -1,13 +1,24 @@
 from datetime import date
 from enum import IntEnum
 from logging import Logger
-from typing import Annotated
+from typing import Annotated, Callable, Iterable, Sequence
 
 from pydantic import BaseModel, StringConstraints
 
-from app.models.trademark import Trademark
+from app.batcher import Batcher
+from app.cache import LRUCache
+from app.metrics import REGISTRY
+from app.models.trademark import normalize_title, Trademark
 from app.repositories.database_session import DatabaseSession, DatabaseSessionFactory
-from app.repositories.trademark import TrademarkRepository
+from app.repositories.prefix_index import PrefixIndex
+from app.repositories.trademark import get_expiry_bound, TrademarkRepository
+from app.repositories.trigram_index import TrigramIndex
+
+_BATCH_SIZE = REGISTRY.histogram(
+    'register_batch_size',
+    'Number of registrations committed together by the write batcher',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250),
+)
 
 
 class RegisterTrademarkServiceRequest(BaseModel):
@@ -51,22 +62,68 @@ class RegisterTrademarkServiceResponse(BaseModel):
         return cls(code=RegisterTrademarkServiceResponseCode.error)
 
 
+def first_of_each_title(trademarks: Iterable[Trademark]) -> list[Trademark]:
+    """Trademarks to insert together: the first occurrence of a title wins, later ones are already registered."""
+    unique_trademarks: dict[str, Trademark] = {}
+    for trademark in trademarks:
+        unique_trademarks.setdefault(normalize_title(trademark.title), trademark)
+
+    return list(unique_trademarks.values())
+
+
+def on_trademark_created(
+        trademark: Trademark,
+        trigram_index: TrigramIndex | None,
+        prefix_index: PrefixIndex | None,
+        exact_match_cache: LRUCache[str, Trademark | None] | None,
+        on_title_registered: Sequence[Callable[[str], None]] = (),
+) -> None:
+    """Make a created trademark visible to searches served in process, until their next rebuild or expiry."""
+    # The trigram index serves searches of active trademarks only, like the one rebuilt from the catalog
+    if trigram_index is not None and trademark.expiry_date >= get_expiry_bound(include_expired=False):
+        trigram_index.add(trademark.id, trademark.title)
+    if prefix_index is not None:
+        prefix_index.add(trademark.id, trademark.title)
+    if exact_match_cache is not None:
+        exact_match_cache.invalidate(normalize_title(trademark.title))
+    # E.g. exact searches of the title that started before the registration must not be shared any more
+    for callback in on_title_registered:
+        callback(trademark.title)
+
+
 class RegisterTrademarkService:
     def __init__(
             self,
             logger: Logger,
             db_session_factory: DatabaseSessionFactory,
             trademark_repository: TrademarkRepository,
+            trigram_index: TrigramIndex | None = None,
+            exact_match_cache: LRUCache[str, Trademark | None] | None = None,
+            prefix_index: PrefixIndex | None = None,
+            batch_max_size: int = 0,
+            batch_max_delay: float = 0.005,
+            on_title_registered: Sequence[Callable[[str], None]] = (),
     ):
         self._logger = logger
         self._db_session_factory = db_session_factory
         self._trademark_repository = trademark_repository
+        self._trigram_index = trigram_index
+        self._prefix_index = prefix_index
+        self._exact_match_cache = exact_match_cache
+        self._on_title_registered = on_title_registered
+        # Concurrent registrations are committed together by one statement on one connection,
+        # each one waits for at most `batch_max_delay` seconds for the others
+        self._batcher: Batcher[Trademark, bool] | None = None
+        if batch_max_size > 1:
+            self._batcher = Batcher(self._create_batch, max_size=batch_max_size, max_delay=batch_max_delay)
 
     async def invoke(
             self,
             request: RegisterTrademarkServiceRequest,
     ) -> RegisterTrademarkServiceResponse:
         trademark = Trademark(**request.model_dump())
+        if self._batcher is not None:
+            return await self._register_in_batch(trademark, batcher=self._batcher)
 
         async with self._db_session_factory.create_session() as db_session:
             try:
@@ -80,16 +137,46 @@ class RegisterTrademarkService:
             trademark: Trademark,
             db_session: DatabaseSession,
     ) -> RegisterTrademarkServiceResponse:
-        existing_trademark = await self._trademark_repository.find_exact(
-            title=trademark.title,
+        created = await self._trademark_repository.create(
+            trademark=trademark,
             session=db_session,
         )
-        if existing_trademark is not None:
+        return self._complete_registration(trademark, created=created)
+
+    async def _register_in_batch(
+            self,
+            trademark: Trademark,
+            batcher: Batcher[Trademark, bool],
+    ) -> RegisterTrademarkServiceResponse:
+        try:
+            created = await batcher.submit(trademark)
+        except Exception as any_error:
+            self._logger.exception('RegisterTrademarkService failed with an exception: %s', any_error)
+            return RegisterTrademarkServiceResponse.error_response()
+
+        return self._complete_registration(trademark, created=created)
+
+    async def _create_batch(self, trademarks: list[Trademark]) -> list[bool]:
+        """Insert trademarks in one statement, returns whether each one of them was created."""
+        _BATCH_SIZE.labels().observe(len(trademarks))
+
+        async with self._db_session_factory.create_session() as db_session:
+            created_ids = await self._trademark_repository.create_batch(
+                trademarks=first_of_each_title(trademarks),
+                session=db_session,
+            )
+
+        return [trademark.id in created_ids for trademark in trademarks]
+
+    def _complete_registration(self, trademark: Trademark, created: bool) -> RegisterTrademarkServiceResponse:
+        if not created:
             return RegisterTrademarkServiceResponse.already_registered_response()
 
-        await self._trademark_repository.create(
-            trademark=trademark,
-            session=db_session,
+        on_trademark_created(
+            trademark,
+            trigram_index=self._trigram_index,
+            prefix_index=self._prefix_index,
+            exact_match_cache=self._exact_match_cache,
+            on_title_registered=self._on_title_registered,
         )
-
         return RegisterTrademarkServiceResponse.success_response(result=trademark)
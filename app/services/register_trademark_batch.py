@@ -0,0 +1,104 @@
+from enum import IntEnum
+from logging import Logger
+from typing import Callable, Sequence
+
+from pydantic import BaseModel, Field
+
+from app.cache import LRUCache
+from app.models.trademark import Trademark
+from app.repositories.database_session import DatabaseSessionFactory
+from app.repositories.prefix_index import PrefixIndex
+from app.repositories.trademark import TrademarkRepository
+from app.repositories.trigram_index import TrigramIndex
+from app.services.register_trademark import (
+    first_of_each_title,
+    on_trademark_created,
+    RegisterTrademarkServiceRequest,
+    RegisterTrademarkServiceResponse,
+)
+
+
+class RegisterTrademarkBatchServiceRequest(BaseModel):
+    items: list[RegisterTrademarkServiceRequest]
+
+
+class RegisterTrademarkBatchServiceResponseCode(IntEnum):
+    success = 0
+    error = 1
+
+
+class RegisterTrademarkBatchServiceResponse(BaseModel):
+    code: RegisterTrademarkBatchServiceResponseCode
+    result: list[RegisterTrademarkServiceResponse] = Field(default_factory=list)
+
+    def is_success(self) -> bool:
+        return self.code is RegisterTrademarkBatchServiceResponseCode.success
+
+    def is_error(self) -> bool:
+        return self.code is RegisterTrademarkBatchServiceResponseCode.error
+
+    @classmethod
+    def success_response(
+            cls,
+            result: list[RegisterTrademarkServiceResponse],
+    ) -> 'RegisterTrademarkBatchServiceResponse':
+        return cls(code=RegisterTrademarkBatchServiceResponseCode.success, result=result)
+
+    @classmethod
+    def error_response(cls) -> 'RegisterTrademarkBatchServiceResponse':
+        return cls(code=RegisterTrademarkBatchServiceResponseCode.error)
+
+
+class RegisterTrademarkBatchService:
+    def __init__(
+            self,
+            logger: Logger,
+            db_session_factory: DatabaseSessionFactory,
+            trademark_repository: TrademarkRepository,
+            trigram_index: TrigramIndex | None = None,
+            exact_match_cache: LRUCache[str, Trademark | None] | None = None,
+            prefix_index: PrefixIndex | None = None,
+            on_title_registered: Sequence[Callable[[str], None]] = (),
+    ):
+        self._logger = logger
+        self._db_session_factory = db_session_factory
+        self._trademark_repository = trademark_repository
+        self._trigram_index = trigram_index
+        self._prefix_index = prefix_index
+        self._exact_match_cache = exact_match_cache
+        self._on_title_registered = on_title_registered
+
+    async def invoke(
+            self,
+            request: RegisterTrademarkBatchServiceRequest,
+    ) -> RegisterTrademarkBatchServiceResponse:
+        trademarks = [Trademark(**item.model_dump()) for item in request.items]
+
+        unique_trademarks = first_of_each_title(trademarks)
+        try:
+            async with self._db_session_factory.create_session() as db_session:
+                created_ids = await self._trademark_repository.create_many(
+                    trademarks=unique_trademarks,
+                    session=db_session,
+                )
+        except Exception as any_error:
+            self._logger.exception('RegisterTrademarkBatchService failed with an exception: %s', any_error)
+            return RegisterTrademarkBatchServiceResponse.error_response()
+
+        for trademark in unique_trademarks:
+            if trademark.id in created_ids:
+                on_trademark_created(
+                    trademark,
+                    trigram_index=self._trigram_index,
+                    prefix_index=self._prefix_index,
+                    exact_match_cache=self._exact_match_cache,
+                    on_title_registered=self._on_title_registered,
+                )
+
+        result = [
+            RegisterTrademarkServiceResponse.success_response(result=trademark)
+            if trademark.id in created_ids
+            else RegisterTrademarkServiceResponse.already_registered_response()
+            for trademark in trademarks
+        ]
+        return RegisterTrademarkBatchServiceResponse.success_response(result=result)
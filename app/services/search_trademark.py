@@ -1,18 +1,55 @@
 from enum import IntEnum
+from functools import partial
 from logging import Logger
-from typing import Annotated
+from typing import Annotated, Any, AsyncGenerator, AsyncIterator, Hashable, Sequence
 
-from pydantic import BaseModel, Field, StringConstraints
+from pydantic import BaseModel, Field, SkipValidation, StringConstraints
 
-from app.models.trademark import Trademark
-from app.repositories.database_session import DatabaseSessionFactory
-from app.repositories.trademark import TrademarkRepository
+from app.cache import LRUCache
+from app.metrics import REGISTRY
+from app.models.trademark import normalize_title, SearchCursor, SimilarityMode, SimilarTrademark, Trademark
+from app.repositories.database_session import DatabaseSession, DatabaseSessionFactory
+from app.repositories.trademark import get_expiry_bound, TrademarkRepository
+from app.repositories.trigram_index import SimilarTitle, TrigramIndex
+from app.single_flight import SingleFlight
+from app.tracing import span
 
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 500
+STREAM_CHUNK_SIZE = 500
 
-class SearchTrademarkServiceRequest(BaseModel):
+_SIMILAR_RESULT_SIZE = REGISTRY.histogram(
+    'search_similar_result_size',
+    'Number of trademarks in a page of similar search results',
+    label_names=('source',),
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500),
+)
+
+_ID_POSITION = TrademarkRepository.similar_fields.index('id')
+_DISTANCE_POSITION = TrademarkRepository.similar_fields.index('distance')
+
+
+class BaseSearchTrademarkServiceRequest(BaseModel):
     title: Annotated[str, StringConstraints(min_length=1)]
     exact_match: bool = True
     similarity: float = Field(gt=0, lt=1, default=0.5)
+    mode: SimilarityMode = SimilarityMode.similarity
+    cursor: SearchCursor | None = None
+    # Expired trademarks are only searched on request, their partitions are skipped otherwise
+    include_expired: bool = False
+
+
+class SearchTrademarkServiceRequest(BaseSearchTrademarkServiceRequest):
+    limit: int = Field(ge=1, le=MAX_SEARCH_LIMIT, default=DEFAULT_SEARCH_LIMIT)
+
+
+class StreamSearchTrademarkServiceRequest(BaseSearchTrademarkServiceRequest):
+    # Streamed results are not paginated, all of them are returned by default
+    limit: int | None = Field(ge=1, default=None)
+
+
+class SearchTrademarkServiceError(Exception):
+    pass
 
 
 class SearchTrademarkServiceResponseCode(IntEnum):
@@ -23,6 +60,10 @@ class SearchTrademarkServiceResponseCode(IntEnum):
 class SearchTrademarkServiceResponse(BaseModel):
     code: SearchTrademarkServiceResponseCode
     result: list[Trademark] = Field()
+    # Raw similar search rows with values in the order of `TrademarkRepository.similar_fields`,
+    # set instead of `result` when the service was asked not to build models.
+    rows: SkipValidation[list[Any]] | None = None
+    next_cursor: SearchCursor | None = None
 
     def is_success(self) -> bool:
         return self.code is SearchTrademarkServiceResponseCode.success
@@ -34,55 +75,313 @@ class SearchTrademarkServiceResponse(BaseModel):
     def success_response(cls, result: list[Trademark]) -> 'SearchTrademarkServiceResponse':
         return cls(code=SearchTrademarkServiceResponseCode.success, result=result)
 
+    @classmethod
+    def page_response(cls, result: list[SimilarTrademark], limit: int) -> 'SearchTrademarkServiceResponse':
+        """Build a page from up to `limit + 1` ordered items, the extra one tells that there is a next page."""
+        if len(result) <= limit:
+            return cls(code=SearchTrademarkServiceResponseCode.success, result=result)
+
+        last = result[limit - 1]
+        next_cursor = SearchCursor(distance=last.distance, id=last.id)
+        return cls(code=SearchTrademarkServiceResponseCode.success, result=result[:limit], next_cursor=next_cursor)
+
+    @classmethod
+    def rows_page_response(cls, rows: list[Any], limit: int) -> 'SearchTrademarkServiceResponse':
+        """Same as `page_response`, but for raw similar search rows."""
+        if len(rows) <= limit:
+            return cls(code=SearchTrademarkServiceResponseCode.success, result=[], rows=rows)
+
+        last = rows[limit - 1]
+        next_cursor = SearchCursor(distance=last[_DISTANCE_POSITION], id=last[_ID_POSITION])
+        return cls(
+            code=SearchTrademarkServiceResponseCode.success,
+            result=[],
+            rows=rows[:limit],
+            next_cursor=next_cursor,
+        )
+
     @classmethod
     def error_response(cls) -> 'SearchTrademarkServiceResponse':
         return cls(code=SearchTrademarkServiceResponseCode.error, result=[])
 
 
+def is_active_match(trademark: Trademark | None) -> bool:
+    """Whether an exact match cached for searches of active trademarks still answers them, it may have expired since."""
+    return trademark is None or trademark.expiry_date >= get_expiry_bound(include_expired=False)
+
+
+async def load_matches(
+        trademark_repository: TrademarkRepository,
+        matches_of_searches: Sequence[Sequence[SimilarTitle]],
+        db_session: DatabaseSession,
+) -> list[list[SimilarTrademark]]:
+    """Load trademarks matched by the trigram index for many searches with one query, keeping the order of matches.
+
+    A trademark removed or expired since the index was built is left out, the index serves active trademarks only.
+    """
+    matched_ids = list({match.id for matches in matches_of_searches for match in matches})
+    if not matched_ids:
+        return [[] for _ in matches_of_searches]
+
+    trademarks = await trademark_repository.find_by_ids(ids=matched_ids, session=db_session)
+
+    trademarks_by_id = {trademark.id: trademark for trademark in trademarks}
+    with span('build_models', 'similar_trademark'):
+        return [
+            [
+                SimilarTrademark(**trademarks_by_id[match.id].model_dump(), score=match.score, distance=match.distance)
+                for match in matches
+                if match.id in trademarks_by_id
+            ]
+            for matches in matches_of_searches
+        ]
+
+
 class SearchTrademarkService:
     def __init__(
             self,
             logger: Logger,
             db_session_factory: DatabaseSessionFactory,
             trademark_repository: TrademarkRepository,
+            trigram_index: TrigramIndex | None = None,
+            exact_match_cache: LRUCache[str, Trademark | None] | None = None,
+            raw_rows: bool = False,
+            fuzzy_db_session_factory: DatabaseSessionFactory | None = None,
     ):
         self._logger = logger
         self._db_session_factory = db_session_factory
+        # Similar search runs in its own pool when given, so that it cannot take all connections of exact search
+        self._fuzzy_db_session_factory = fuzzy_db_session_factory or db_session_factory
         self._trademark_repository = trademark_repository
+        self._trigram_index = trigram_index
+        self._exact_match_cache = exact_match_cache
+        # Similar search responses carry raw rows instead of models, see `SearchTrademarkServiceResponse.rows`
+        self._raw_rows = raw_rows
+        self._similar_result_size = _SIMILAR_RESULT_SIZE.labels('database' if trigram_index is None else 'index')
+        # Identical concurrent searches share one query
+        self._single_flight: SingleFlight[Hashable, SearchTrademarkServiceResponse] = SingleFlight()
+
+    @property
+    def coalesced_requests(self) -> int:
+        """Number of searches answered by a query started for an identical concurrent search."""
+        return self._single_flight.coalesced
+
+    def forget_in_flight(self) -> None:
+        """Make searches that come from now on query the catalog instead of sharing queries started before."""
+        self._single_flight.forget_all()
+
+    def forget_exact_in_flight(self, title: str) -> None:
+        """Same as `forget_in_flight` for exact searches of the title, e.g. once it is registered."""
+        title_normalized = normalize_title(title)
+        for include_expired in (False, True):
+            self._single_flight.forget(('exact', title_normalized, include_expired))
+
+    def uses_trigram_index(self, request: BaseSearchTrademarkServiceRequest) -> bool:
+        """Whether the search is answered from the in-process index, which lags behind the catalog until rebuilt."""
+        return not request.exact_match and self._index_serves(request)
+
+    def _index_serves(self, request: BaseSearchTrademarkServiceRequest) -> bool:
+        # The trigram index only computes the similarity of whole titles, and only has trademarks that were active
+        # when it was built
+        if request.include_expired:
+            return False
+
+        return self._trigram_index is not None and request.mode is SimilarityMode.similarity
 
     async def invoke(
             self,
             request: SearchTrademarkServiceRequest,
     ) -> SearchTrademarkServiceResponse:
         if request.exact_match:
-            return await self._find_exact(title=request.title)
+            return await self._find_exact(title=request.title, include_expired=request.include_expired)
+
+        similar_search_key = (
+            'similar',
+            request.title,
+            request.similarity,
+            request.mode,
+            request.include_expired,
+            request.limit,
+            (request.cursor.distance, request.cursor.id) if request.cursor is not None else None,
+        )
+        response = await self._single_flight.run(similar_search_key, partial(self._find_similar, request))
+        if response.is_success():
+            result_size = len(response.rows) if response.rows is not None else len(response.result)
+            self._similar_result_size.observe(result_size)
+
+        return response
+
+    async def stream(
+            self,
+            request: StreamSearchTrademarkServiceRequest,
+    ) -> AsyncGenerator[list[Trademark], None]:
+        """Yield search results by chunks as they are read from the database.
+
+        Raises SearchTrademarkServiceError if results cannot be read, possibly after some chunks were yielded.
+        """
+        if request.exact_match:
+            response = await self._find_exact(title=request.title, include_expired=request.include_expired)
+            if response.is_error():
+                raise SearchTrademarkServiceError('Exact search failed')
 
-        return await self._find_similar(title=request.title, similarity=request.similarity)
+            yield response.result
+            return
 
-    async def _find_exact(self, title: str) -> SearchTrademarkServiceResponse:
+        try:
+            async with self._fuzzy_db_session_factory.create_session() as db_session:
+                async for chunk in self._stream_similar(request, db_session=db_session):
+                    yield chunk
+        except Exception as db_error:
+            self._logger.error('Database error: %s', db_error)
+            raise SearchTrademarkServiceError('Similar search failed') from db_error
+
+    async def _stream_similar(
+            self,
+            request: StreamSearchTrademarkServiceRequest,
+            db_session: DatabaseSession,
+    ) -> AsyncIterator[list[Trademark]]:
+        if self._trigram_index is None or not self._index_serves(request):
+            async for chunk in self._trademark_repository.iter_similar(
+                title=request.title,
+                similarity=request.similarity,
+                limit=request.limit,
+                cursor=request.cursor,
+                chunk_size=STREAM_CHUNK_SIZE,
+                mode=request.mode,
+                include_expired=request.include_expired,
+                session=db_session,
+            ):
+                yield list(chunk)
+            return
+
+        after = (request.cursor.distance, request.cursor.id) if request.cursor is not None else None
+        matches = self._trigram_index.find_similar(
+            request.title,
+            threshold=request.similarity,
+            limit=request.limit,
+            after=after,
+        )
+        for start in range(0, len(matches), STREAM_CHUNK_SIZE):
+            yield list(await self._load_matches(matches[start:start + STREAM_CHUNK_SIZE], db_session=db_session))
+
+    async def _find_exact(self, title: str, include_expired: bool) -> SearchTrademarkServiceResponse:
+        # Titles that are the same after normalization share the cache entry and the query
+        title_normalized = normalize_title(title)
+        search_key = ('exact', title_normalized, include_expired)
+        find_exact = partial(self._find_exact_uncached, title=title, include_expired=include_expired)
+        # The cache holds active trademarks only
+        if self._exact_match_cache is not None and not include_expired:
+            cached = self._exact_match_cache.get(title_normalized)
+            if cached.found and is_active_match(cached.value):
+                result = [] if cached.value is None else [cached.value]
+                return SearchTrademarkServiceResponse.success_response(result=result)
+
+        return await self._single_flight.run(search_key, find_exact)
+
+    async def _find_exact_uncached(self, title: str, include_expired: bool) -> SearchTrademarkServiceResponse:
+        """Query the catalog and cache the result, the call is shared by identical concurrent searches."""
+        exact_match_cache = None if include_expired else self._exact_match_cache
+        # Read before the query, so that a result that misses a registration made meanwhile is not cached
+        cache_version = exact_match_cache.version if exact_match_cache is not None else None
         try:
             async with self._db_session_factory.create_session() as db_session:
-                trademark = await self._trademark_repository.find_exact(title=title, session=db_session)
+                trademark = await self._trademark_repository.find_exact(
+                    title=title,
+                    include_expired=include_expired,
+                    session=db_session,
+                )
         except Exception as db_error:
             self._logger.error('Database error: %s', db_error)
             return SearchTrademarkServiceResponse.error_response()
 
+        if exact_match_cache is not None:
+            exact_match_cache.set(normalize_title(title), trademark, version=cache_version)
+
         result = []
         if trademark is not None:
             result.append(trademark)
 
         return SearchTrademarkServiceResponse.success_response(result=result)
 
-    async def _find_similar(self, title: str, similarity: float) -> SearchTrademarkServiceResponse:
+    async def _find_similar(self, request: SearchTrademarkServiceRequest) -> SearchTrademarkServiceResponse:
+        if self._trigram_index is not None and self._index_serves(request):
+            return await self._find_similar_in_index(self._trigram_index, request=request)
+
+        find_similar = self._trademark_repository.find_similar
+        if self._raw_rows:
+            find_similar = self._trademark_repository.find_similar_rows
+
         try:
-            async with self._db_session_factory.create_session() as db_session:
-                trademarks = await self._trademark_repository.find_similar(
-                    title=title,
-                    similarity=similarity,
+            async with self._fuzzy_db_session_factory.create_session() as db_session:
+                trademarks = await find_similar(
+                    title=request.title,
+                    similarity=request.similarity,
+                    limit=request.limit + 1,
+                    cursor=request.cursor,
+                    mode=request.mode,
+                    include_expired=request.include_expired,
                     session=db_session,
                 )
         except Exception as db_error:
             self._logger.error('Database error: %s', db_error)
             return SearchTrademarkServiceResponse.error_response()
 
-        return SearchTrademarkServiceResponse.success_response(result=trademarks)
+        if self._raw_rows:
+            return SearchTrademarkServiceResponse.rows_page_response(rows=trademarks, limit=request.limit)
+        return SearchTrademarkServiceResponse.page_response(result=trademarks, limit=request.limit)
+
+    async def _find_similar_in_index(
+            self,
+            trigram_index: TrigramIndex,
+            request: SearchTrademarkServiceRequest,
+    ) -> SearchTrademarkServiceResponse:
+        after = (request.cursor.distance, request.cursor.id) if request.cursor is not None else None
+        matches = trigram_index.find_similar(
+            request.title,
+            threshold=request.similarity,
+            limit=request.limit + 1,
+            after=after,
+        )
+        if not matches:
+            return SearchTrademarkServiceResponse.success_response(result=[])
+
+        try:
+            async with self._fuzzy_db_session_factory.create_session() as db_session:
+                if self._raw_rows:
+                    rows = await self._load_match_rows(matches, db_session=db_session)
+                else:
+                    similar_trademarks = await self._load_matches(matches, db_session=db_session)
+        except Exception as db_error:
+            self._logger.error('Database error: %s', db_error)
+            return SearchTrademarkServiceResponse.error_response()
+
+        if self._raw_rows:
+            return SearchTrademarkServiceResponse.rows_page_response(rows=rows, limit=request.limit)
+        return SearchTrademarkServiceResponse.page_response(result=similar_trademarks, limit=request.limit)
+
+    async def _load_matches(
+            self,
+            matches: Sequence[SimilarTitle],
+            db_session: DatabaseSession,
+    ) -> list[SimilarTrademark]:
+        """Load trademarks matched by the trigram index, keeping the order of matches."""
+        loaded = await load_matches(self._trademark_repository, matches_of_searches=[matches], db_session=db_session)
+        return loaded[0]
+
+    async def _load_match_rows(
+            self,
+            matches: Sequence[SimilarTitle],
+            db_session: DatabaseSession,
+    ) -> list[tuple[Any, ...]]:
+        """Same as `_load_matches`, but builds raw similar search rows."""
+        rows = await self._trademark_repository.find_rows_by_ids(
+            ids=[match.id for match in matches],
+            session=db_session,
+        )
+
+        rows_by_id = {row[_ID_POSITION]: row for row in rows}
+        return [
+            (*rows_by_id[match.id], match.score, match.distance)
+            for match in matches
+            if match.id in rows_by_id
+        ]
@@ -0,0 +1,161 @@
+import asyncio
+from enum import IntEnum
+from logging import Logger
+from typing import Annotated, Collection, Sequence
+
+from pydantic import BaseModel, Field, SerializeAsAny, StringConstraints
+
+from app.cache import LRUCache
+from app.models.trademark import normalize_title, SimilarTrademark, Trademark
+from app.repositories.database_session import DatabaseSessionFactory
+from app.repositories.trademark import SimilarQuery, TrademarkRepository
+from app.repositories.trigram_index import TrigramIndex
+from app.services.search_trademark import DEFAULT_SEARCH_LIMIT, is_active_match, load_matches, MAX_SEARCH_LIMIT
+
+
+class SearchTrademarkBatchItem(BaseModel):
+    title: Annotated[str, StringConstraints(min_length=1)]
+    exact_match: bool = True
+    similarity: float = Field(gt=0, lt=1, default=0.5)
+    limit: int = Field(ge=1, le=MAX_SEARCH_LIMIT, default=DEFAULT_SEARCH_LIMIT)
+
+
+class SearchTrademarkBatchServiceRequest(BaseModel):
+    items: list[SearchTrademarkBatchItem]
+    include_expired: bool = False
+
+
+class SearchTrademarkBatchServiceResponseCode(IntEnum):
+    success = 0
+    error = 1
+
+
+class SearchTrademarkBatchServiceResponse(BaseModel):
+    code: SearchTrademarkBatchServiceResponseCode
+    # Trademarks found for every item of the request, in the same order
+    result: list[list[SerializeAsAny[Trademark]]] = Field(default_factory=list)
+
+    def is_success(self) -> bool:
+        return self.code is SearchTrademarkBatchServiceResponseCode.success
+
+    def is_error(self) -> bool:
+        return self.code is SearchTrademarkBatchServiceResponseCode.error
+
+    @classmethod
+    def success_response(cls, result: list[list[Trademark]]) -> 'SearchTrademarkBatchServiceResponse':
+        return cls(code=SearchTrademarkBatchServiceResponseCode.success, result=result)
+
+    @classmethod
+    def error_response(cls) -> 'SearchTrademarkBatchServiceResponse':
+        return cls(code=SearchTrademarkBatchServiceResponseCode.error)
+
+
+class SearchTrademarkBatchService:
+    """Resolves many searches with one query for all exact matches and one query for all similar searches."""
+
+    def __init__(
+            self,
+            logger: Logger,
+            db_session_factory: DatabaseSessionFactory,
+            trademark_repository: TrademarkRepository,
+            trigram_index: TrigramIndex | None = None,
+            exact_match_cache: LRUCache[str, Trademark | None] | None = None,
+            fuzzy_db_session_factory: DatabaseSessionFactory | None = None,
+    ):
+        self._logger = logger
+        self._db_session_factory = db_session_factory
+        self._fuzzy_db_session_factory = fuzzy_db_session_factory or db_session_factory
+        self._trademark_repository = trademark_repository
+        self._trigram_index = trigram_index
+        self._exact_match_cache = exact_match_cache
+
+    async def invoke(
+            self,
+            request: SearchTrademarkBatchServiceRequest,
+    ) -> SearchTrademarkBatchServiceResponse:
+        exact_titles = {normalize_title(item.title) for item in request.items if item.exact_match}
+        similar_items = [item for item in request.items if not item.exact_match]
+
+        try:
+            exact_matches, similar_results = await asyncio.gather(
+                self._find_exact(exact_titles, include_expired=request.include_expired),
+                self._find_similar(similar_items, include_expired=request.include_expired),
+            )
+        except Exception as db_error:
+            self._logger.error('Database error: %s', db_error)
+            return SearchTrademarkBatchServiceResponse.error_response()
+
+        similar_results_iter = iter(similar_results)
+        result: list[list[Trademark]] = []
+        for item in request.items:
+            if not item.exact_match:
+                result.append(list(next(similar_results_iter)))
+                continue
+
+            trademark = exact_matches[normalize_title(item.title)]
+            result.append([] if trademark is None else [trademark])
+
+        return SearchTrademarkBatchServiceResponse.success_response(result=result)
+
+    async def _find_exact(self, titles: Collection[str], include_expired: bool) -> dict[str, Trademark | None]:
+        """Find trademarks by normalized titles, cached ones first, then the rest with one query."""
+        # The cache holds active trademarks only
+        exact_match_cache = None if include_expired else self._exact_match_cache
+        found: dict[str, Trademark | None] = {}
+        if exact_match_cache is not None:
+            for title in titles:
+                cached = exact_match_cache.get(title)
+                if cached.found and is_active_match(cached.value):
+                    found[title] = cached.value
+
+        missing_titles = [title for title in titles if title not in found]
+        if not missing_titles:
+            return found
+
+        cache_version = exact_match_cache.version if exact_match_cache is not None else None
+        async with self._db_session_factory.create_session() as db_session:
+            trademarks = await self._trademark_repository.find_exact_many(
+                titles=missing_titles,
+                include_expired=include_expired,
+                session=db_session,
+            )
+
+        for title in missing_titles:
+            found[title] = trademarks.get(title)
+            if exact_match_cache is not None:
+                exact_match_cache.set(title, found[title], version=cache_version)
+
+        return found
+
+    async def _find_similar(
+            self,
+            items: Sequence[SearchTrademarkBatchItem],
+            include_expired: bool,
+    ) -> list[list[SimilarTrademark]]:
+        if not items:
+            return []
+
+        # The trigram index holds active trademarks only
+        if self._trigram_index is not None and not include_expired:
+            return await self._find_similar_in_index(self._trigram_index, items=items)
+
+        queries = [SimilarQuery(title=item.title, similarity=item.similarity, limit=item.limit) for item in items]
+        async with self._fuzzy_db_session_factory.create_session() as db_session:
+            return await self._trademark_repository.find_similar_many(
+                queries=queries,
+                include_expired=include_expired,
+                session=db_session,
+            )
+
+    async def _find_similar_in_index(
+            self,
+            trigram_index: TrigramIndex,
+            items: Sequence[SearchTrademarkBatchItem],
+    ) -> list[list[SimilarTrademark]]:
+        """Match titles in the index and load all matched trademarks with one query."""
+        matches = [
+            trigram_index.find_similar(item.title, threshold=item.similarity, limit=item.limit)
+            for item in items
+        ]
+        async with self._fuzzy_db_session_factory.create_session() as db_session:
+            return await load_matches(self._trademark_repository, matches_of_searches=matches, db_session=db_session)
@@ -0,0 +1,93 @@
+from enum import IntEnum
+from logging import Logger
+from typing import Annotated
+
+from pydantic import BaseModel, Field, StringConstraints
+
+from app.models.trademark import normalize_title, TrademarkSuggestion
+from app.repositories.database_session import DatabaseSessionFactory
+from app.repositories.prefix_index import PrefixIndex
+from app.repositories.trademark import TrademarkRepository
+
+DEFAULT_SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 50
+
+
+def normalize_prefix(prefix: str) -> str:
+    """Normalize a prefix like a title, keeping one trailing space so that "wave " does not match "waves"."""
+    normalized = normalize_title(prefix)
+    if normalized and prefix[-1].isspace():
+        return f'{normalized} '
+
+    return normalized
+
+
+class SuggestTrademarkServiceRequest(BaseModel):
+    prefix: Annotated[str, StringConstraints(min_length=1)]
+    limit: int = Field(ge=1, le=MAX_SUGGEST_LIMIT, default=DEFAULT_SUGGEST_LIMIT)
+
+
+class SuggestTrademarkServiceResponseCode(IntEnum):
+    success = 0
+    error = 1
+
+
+class SuggestTrademarkServiceResponse(BaseModel):
+    code: SuggestTrademarkServiceResponseCode
+    result: list[TrademarkSuggestion] = Field(default_factory=list)
+
+    def is_success(self) -> bool:
+        return self.code is SuggestTrademarkServiceResponseCode.success
+
+    def is_error(self) -> bool:
+        return self.code is SuggestTrademarkServiceResponseCode.error
+
+    @classmethod
+    def success_response(cls, result: list[TrademarkSuggestion]) -> 'SuggestTrademarkServiceResponse':
+        return cls(code=SuggestTrademarkServiceResponseCode.success, result=result)
+
+    @classmethod
+    def error_response(cls) -> 'SuggestTrademarkServiceResponse':
+        return cls(code=SuggestTrademarkServiceResponseCode.error)
+
+
+class SuggestTrademarkService:
+    """Suggests titles that start with a prefix, from the in-process prefix index when there is one."""
+
+    def __init__(
+            self,
+            logger: Logger,
+            db_session_factory: DatabaseSessionFactory,
+            trademark_repository: TrademarkRepository,
+            prefix_index: PrefixIndex | None = None,
+    ):
+        self._logger = logger
+        self._db_session_factory = db_session_factory
+        self._trademark_repository = trademark_repository
+        self._prefix_index = prefix_index
+
+    async def invoke(
+            self,
+            request: SuggestTrademarkServiceRequest,
+    ) -> SuggestTrademarkServiceResponse:
+        prefix = normalize_prefix(request.prefix)
+        if not prefix:
+            return SuggestTrademarkServiceResponse.success_response(result=[])
+
+        if self._prefix_index is not None:
+            matches = self._prefix_index.find(prefix, limit=request.limit)
+            result = [TrademarkSuggestion(id=match.id, title=match.title) for match in matches]
+            return SuggestTrademarkServiceResponse.success_response(result=result)
+
+        try:
+            async with self._db_session_factory.create_session() as db_session:
+                result = await self._trademark_repository.find_by_prefix(
+                    prefix=prefix,
+                    limit=request.limit,
+                    session=db_session,
+                )
+        except Exception as db_error:
+            self._logger.error('Database error: %s', db_error)
+            return SuggestTrademarkServiceResponse.error_response()
+
+        return SuggestTrademarkServiceResponse.success_response(result=result)
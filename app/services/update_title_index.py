@@ -0,0 +1,68 @@
+import asyncio
+from logging import Logger
+from typing import Awaitable, Callable, Protocol
+
+from app.repositories.database_session import DatabaseSessionFactory
+from app.repositories.trademark import TrademarkRepository
+
+
+class TitleIndex(Protocol):
+    """In-process index built from `(id, title)` rows of the catalog, e.g. `TrigramIndex` or `PrefixIndex`."""
+
+    def __len__(self) -> int:
+        ...
+
+    async def rebuild(self, load_rows: Callable[[], Awaitable[list[tuple[str, str]]]]) -> None:
+        ...
+
+
+class TitleIndexUpdater:
+    """Builds an in-process title index at startup and periodically rebuilds it from the catalog.
+
+    Periodic rebuilds pick up trademarks registered by other instances of the service. The index has active
+    trademarks only unless `include_expired` is set, so trademarks expired since the last rebuild are dropped.
+    """
+
+    def __init__(
+            self,
+            logger: Logger,
+            db_session_factory: DatabaseSessionFactory,
+            trademark_repository: TrademarkRepository,
+            title_index: TitleIndex,
+            refresh_interval: float,
+            name: str,
+            include_expired: bool = False,
+    ):
+        self._logger = logger
+        self._db_session_factory = db_session_factory
+        self._trademark_repository = trademark_repository
+        self._title_index = title_index
+        self._refresh_interval = refresh_interval
+        self._name = name.capitalize()
+        self._include_expired = include_expired
+        self._refresh_task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        await self._title_index.rebuild(self._load_titles)
+        self._logger.info('%s index is built, %s titles', self._name, len(self._title_index))
+
+        self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+
+    async def _load_titles(self) -> list[tuple[str, str]]:
+        async with self._db_session_factory.create_session() as db_session:
+            return await self._trademark_repository.find_titles(
+                session=db_session,
+                include_expired=self._include_expired,
+            )
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self._title_index.rebuild(self._load_titles)
+            except Exception as any_error:
+                self._logger.exception('%s index rebuild failed with an exception: %s', self._name, any_error)
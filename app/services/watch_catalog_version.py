@@ -0,0 +1,134 @@
+import asyncio
+from logging import Logger
+from typing import Any, Awaitable, Callable, Sequence
+
+from asyncpg import Connection
+
+from app.repositories.database_session import DatabaseSession, Statement
+
+CATALOG_VERSION_CHANNEL = 'catalog_version'
+
+# The row is missing until the catalog changes for the first time
+CATALOG_VERSION_STATEMENT = Statement('catalog_version', """
+SELECT COALESCE(max(version), 0) AS version FROM data.catalog_version
+""", prepare=False)
+
+
+class CatalogVersionWatcher:
+    """Keeps the version of the catalog up to date, so that handlers answer conditional requests without queries.
+
+    Every statement that changes the catalog bumps the version in its transaction and notifies
+    the `catalog_version` channel with the new one on commit. The watcher listens to the channel on
+    a dedicated connection to the primary. Notifications are lost while the connection is, so then
+    the version is unknown until the watcher reconnects and reads it again.
+
+    Searches may go to read replicas, a new version is published `publish_delay` seconds after its
+    notification, by when the replicas in rotation have replayed the change. `on_change` callbacks drop
+    results kept in process (e.g. cached or in flight), they are called on the notification and again
+    on publishing, so that nothing older than the published version is served under it.
+    """
+
+    def __init__(
+            self,
+            logger: Logger,
+            connect: Callable[[], Awaitable[Connection]],
+            reconnect_interval: float,
+            publish_delay: float = 0,
+            on_change: Sequence[Callable[[], None]] = (),
+    ):
+        self._logger = logger
+        self._connect = connect
+        self._reconnect_interval = reconnect_interval
+        self._publish_delay = publish_delay
+        self._on_change = on_change
+
+        self._version: int | None = None
+        self._connection: Connection | None = None
+        self._connection_lost = asyncio.Event()
+        self._pending_publishes: list[asyncio.TimerHandle] = []
+        self._reconnect_task: asyncio.Task[None] | None = None
+
+    @property
+    def version(self) -> int | None:
+        """Version of the catalog the searches see, None when it is unknown."""
+        return self._version
+
+    async def start(self) -> None:
+        try:
+            await self.listen()
+        except Exception as any_error:
+            self._logger.warning('Catalog version is unknown, listening failed: %s', any_error)
+            self._connection_lost.set()
+
+        self._reconnect_task = asyncio.create_task(self._reconnect_when_lost())
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        self._cancel_pending_publishes()
+        if self._connection is not None:
+            self._connection.remove_termination_listener(self._on_connection_lost)
+            await self._connection.close()
+
+    async def listen(self) -> None:
+        """Connect, start listening and read the current version, which notifications only move forward."""
+        connection = await self._connect()
+        try:
+            # Listening first, so that no change committed after the read is missed
+            await connection.add_listener(CATALOG_VERSION_CHANNEL, self._on_notification)
+            rows = await DatabaseSession(connection=connection).fetch(CATALOG_VERSION_STATEMENT)
+        except Exception:
+            await connection.close()
+            raise
+
+        connection.add_termination_listener(self._on_connection_lost)
+        self._connection = connection
+        self._schedule_publish(rows[0]['version'])
+
+    def _on_notification(self, connection: Connection, pid: int, channel: str, payload: Any) -> None:
+        self._notify_change()
+        self._schedule_publish(int(payload))
+
+    def _on_connection_lost(self, connection: Connection) -> None:
+        self._logger.warning('Catalog version is unknown, connection is lost')
+        self._version = None
+        self._connection = None
+        self._cancel_pending_publishes()
+        self._connection_lost.set()
+
+    def _schedule_publish(self, version: int) -> None:
+        if not self._publish_delay:
+            self._publish(version)
+            return
+
+        loop = asyncio.get_running_loop()
+        self._pending_publishes = [handle for handle in self._pending_publishes if handle.when() > loop.time()]
+        self._pending_publishes.append(loop.call_later(self._publish_delay, self._publish, version))
+
+    def _publish(self, version: int) -> None:
+        self._notify_change()
+        # Notifications that arrived before the version was read carry older versions
+        self._version = version if self._version is None else max(self._version, version)
+
+    def _notify_change(self) -> None:
+        for callback in self._on_change:
+            callback()
+
+    def _cancel_pending_publishes(self) -> None:
+        for handle in self._pending_publishes:
+            handle.cancel()
+        self._pending_publishes = []
+
+    async def _reconnect_when_lost(self) -> None:
+        while True:
+            await self._connection_lost.wait()
+            await asyncio.sleep(self._reconnect_interval)
+            self._connection_lost.clear()
+            try:
+                await self.listen()
+            except Exception as any_error:
+                self._logger.warning('Catalog version is unknown, listening failed: %s', any_error)
+                self._connection_lost.set()
+                continue
+
+            self._logger.info('Listening to catalog version changes again')
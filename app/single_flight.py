@@ -0,0 +1,50 @@
+import asyncio
+from functools import partial
+from typing import Any, Callable, Coroutine, Generic, Hashable, TypeVar
+
+KeyT = TypeVar('KeyT', bound=Hashable)
+ValueT = TypeVar('ValueT')
+
+
+class SingleFlight(Generic[KeyT, ValueT]):
+    """Runs at most one call per key at a time, callers that come while it runs share its result.
+
+    The call runs in its own task, so a cancelled caller stops waiting without cancelling the call
+    for the others.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[KeyT, asyncio.Task[ValueT]] = {}
+        self._coalesced = 0
+
+    @property
+    def coalesced(self) -> int:
+        """Number of callers that got the result of a call started by another caller."""
+        return self._coalesced
+
+    async def run(self, key: KeyT, function: Callable[[], Coroutine[Any, Any, ValueT]]) -> ValueT:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(function())
+            self._calls[key] = task
+            task.add_done_callback(partial(self._forget, key))
+        else:
+            self._coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def forget(self, key: KeyT) -> None:
+        """Make callers of the key that come from now on start a new call, a running one finishes for its callers."""
+        self._calls.pop(key, None)
+
+    def forget_all(self) -> None:
+        """Make callers that come from now on start new calls, running ones finish for their callers."""
+        self._calls.clear()
+
+    def _forget(self, key: KeyT, task: asyncio.Task[ValueT]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+        # The result may have no callers left to retrieve the exception, which would be reported as lost
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,344 @@
+"""Bulk import of trademarks from JSONL/CSV files.
+
+Usage::
+
+    python -m app.tools.load [SOURCE] [--batch-size N] [--workers N]
+
+SOURCE is a file or a directory with `*.jsonl` and `*.csv` files, `LOAD_DATA_FROM` by default.
+Files are read as a stream and written in bounded batches, the position of the last committed
+row of every file is stored in a checkpoint file, so an interrupted load resumes where it stopped.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, NamedTuple
+
+from pydantic import ValidationError
+
+from app.configuration import AppConfig
+from app.repositories.base_repository import BaseRepository
+from app.repositories.database_session import create_connection_pool, DatabaseSessionFactory
+from app.repositories.trademark import TrademarkRepository
+from app.services.register_trademark import RegisterTrademarkServiceRequest
+from app.services.register_trademark_batch import RegisterTrademarkBatchService, RegisterTrademarkBatchServiceRequest
+
+SOURCE_SUFFIXES = ('.jsonl', '.csv')
+CHECKPOINT_FILE_NAME = '.load_checkpoint.json'
+
+logger = logging.getLogger('app.tools.load')
+
+
+class SourceRow(NamedTuple):
+    end_offset: int
+    data: Any
+
+
+class Batch(NamedTuple):
+    sequence: int
+    end_offset: int
+    items: list[RegisterTrademarkServiceRequest]
+
+
+class LoadStats:
+    def __init__(self) -> None:
+        self.created = 0
+        self.already_registered = 0
+        self.invalid = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.already_registered + self.invalid
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0
+
+    def __str__(self) -> str:
+        return (
+            f'processed={self.processed} created={self.created} already_registered={self.already_registered} '
+            f'invalid={self.invalid} rows/s={self.rows_per_second:.0f}'
+        )
+
+
+class Checkpoint:
+    """Byte offsets of the last committed row of every source file, persisted as JSON."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._offsets: dict[str, int] = {}
+        if path.exists():
+            self._offsets = json.loads(path.read_text())
+
+    def get(self, source: Path) -> int:
+        return self._offsets.get(str(source.resolve()), 0)
+
+    def set(self, source: Path, offset: int) -> None:
+        self._offsets[str(source.resolve())] = offset
+        tmp_path = self._path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self._offsets, indent=2))
+        os.replace(tmp_path, self._path)
+
+
+class _OffsetLineReader:
+    """Iterates over decoded lines of a binary file, keeping the offset of the end of the last line.
+
+    A line that is not valid UTF-8 is decoded with replacement characters and sets `malformed`,
+    which the reader of rows resets once it has marked the row as invalid.
+    """
+
+    def __init__(self, source_file: BinaryIO) -> None:
+        self._source_file = source_file
+        self.offset = source_file.tell()
+        self.malformed = False
+
+    def __iter__(self) -> Iterator[str]:
+        for line in iter(self._source_file.readline, b''):
+            self.offset += len(line)
+            try:
+                yield line.decode('utf-8')
+            except UnicodeDecodeError:
+                self.malformed = True
+                yield line.decode('utf-8', errors='replace')
+
+
+def _read_jsonl(source_file: BinaryIO) -> Iterator[SourceRow]:
+    lines = _OffsetLineReader(source_file)
+    for line in lines:
+        if not line.strip():
+            continue
+
+        try:
+            data = None if lines.malformed else json.loads(line)
+        except ValueError:
+            data = None
+        lines.malformed = False
+        yield SourceRow(end_offset=lines.offset, data=data)
+
+
+def _read_csv(source_file: BinaryIO, offset: int) -> Iterator[SourceRow]:
+    source_file.seek(0)
+    header_lines = _OffsetLineReader(source_file)
+    header = next(csv.reader(header_lines), None)
+    if header is None:
+        return
+
+    source_file.seek(max(offset, header_lines.offset))
+    lines = _OffsetLineReader(source_file)
+    for values in csv.reader(lines):
+        data = None if lines.malformed else {column: value or None for column, value in zip(header, values)}
+        lines.malformed = False
+        yield SourceRow(end_offset=lines.offset, data=data)
+
+
+def read_source(source: Path, offset: int = 0) -> Iterator[SourceRow]:
+    """Stream rows of a JSONL or CSV file starting from the given byte offset."""
+    with source.open('rb') as source_file:
+        if source.suffix == '.csv':
+            yield from _read_csv(source_file, offset=offset)
+        else:
+            source_file.seek(offset)
+            yield from _read_jsonl(source_file)
+
+
+def list_sources(source: Path) -> list[Path]:
+    if source.is_file():
+        return [source]
+
+    return sorted(path for path in source.iterdir() if path.suffix in SOURCE_SUFFIXES)
+
+
+def validate_row(row: SourceRow) -> RegisterTrademarkServiceRequest | None:
+    try:
+        return RegisterTrademarkServiceRequest.model_validate(row.data)
+    except ValidationError:
+        return None
+
+
+class _CommitTracker:
+    """Advances the checkpoint only past batches that are committed together with all preceding ones."""
+
+    def __init__(self, source: Path, offset: int, checkpoint: Checkpoint) -> None:
+        self._source = source
+        self._offset = offset
+        self._checkpoint = checkpoint
+        self._next_sequence = 0
+        self._completed: dict[int, int] = {}
+
+    def complete(self, batch: Batch) -> None:
+        self._completed[batch.sequence] = batch.end_offset
+
+        advanced = False
+        while self._next_sequence in self._completed:
+            self._offset = self._completed.pop(self._next_sequence)
+            self._next_sequence += 1
+            advanced = True
+
+        if advanced:
+            self._checkpoint.set(self._source, self._offset)
+
+
+class SourceLoader:
+    """Loads one source file: a reader fills a bounded queue of batches, workers write them concurrently."""
+
+    def __init__(
+            self,
+            service: RegisterTrademarkBatchService,
+            checkpoint: Checkpoint,
+            stats: LoadStats,
+            batch_size: int,
+            workers: int,
+    ) -> None:
+        self._service = service
+        self._checkpoint = checkpoint
+        self._stats = stats
+        self._batch_size = batch_size
+        self._workers = workers
+
+    async def load(self, source: Path) -> None:
+        offset = self._checkpoint.get(source)
+        logger.info('Loading %s from offset %s', source, offset)
+
+        queue: asyncio.Queue[Batch | None] = asyncio.Queue(maxsize=self._workers)
+        committed = _CommitTracker(source=source, offset=offset, checkpoint=self._checkpoint)
+        tasks = [asyncio.create_task(self._read_batches(source, offset=offset, queue=queue))]
+        tasks.extend(asyncio.create_task(self._write_batches(queue, committed)) for _ in range(self._workers))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _read_batches(self, source: Path, offset: int, queue: 'asyncio.Queue[Batch | None]') -> None:
+        sequence = 0
+        items: list[RegisterTrademarkServiceRequest] = []
+        end_offset = offset
+        for row in read_source(source, offset=offset):
+            end_offset = row.end_offset
+            item = validate_row(row)
+            if item is None:
+                self._stats.invalid += 1
+                logger.warning('Invalid row in %s ending at offset %s', source, row.end_offset)
+            else:
+                items.append(item)
+
+            if len(items) >= self._batch_size:
+                await queue.put(Batch(sequence=sequence, end_offset=end_offset, items=items))
+                sequence += 1
+                items = []
+
+        await queue.put(Batch(sequence=sequence, end_offset=end_offset, items=items))
+        for _ in range(self._workers):
+            await queue.put(None)
+
+    async def _write_batches(self, queue: 'asyncio.Queue[Batch | None]', committed: _CommitTracker) -> None:
+        while (batch := await queue.get()) is not None:
+            if batch.items:
+                await self._write_batch(batch)
+            committed.complete(batch)
+
+    async def _write_batch(self, batch: Batch) -> None:
+        response = await self._service.invoke(RegisterTrademarkBatchServiceRequest(items=batch.items))
+        if response.is_error():
+            raise RuntimeError(f'Failed to write batch ending at offset {batch.end_offset}')
+
+        for item_response in response.result:
+            if item_response.is_success():
+                self._stats.created += 1
+            else:
+                self._stats.already_registered += 1
+
+
+async def _report_progress(stats: LoadStats, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        logger.info('Progress: %s', stats)
+
+
+async def load(
+        config: AppConfig,
+        source: Path,
+        checkpoint_path: Path,
+        batch_size: int,
+        workers: int,
+        report_interval: float,
+) -> LoadStats:
+    stats = LoadStats()
+    checkpoint = Checkpoint(checkpoint_path)
+
+    connection_pool = create_connection_pool(
+        dsn=str(config.postgres_dsn),
+        statements=BaseRepository.collect_statements(),
+        min_size=workers,
+        max_size=workers,
+        prepared_statements=config.postgres_prepared_statements,
+    )
+    async with connection_pool as pool:
+        service = RegisterTrademarkBatchService(
+            logger=logger,
+            db_session_factory=DatabaseSessionFactory(connection_pool=pool),
+            trademark_repository=TrademarkRepository(),
+        )
+        source_loader = SourceLoader(
+            service=service,
+            checkpoint=checkpoint,
+            stats=stats,
+            batch_size=batch_size,
+            workers=workers,
+        )
+
+        reporter = asyncio.create_task(_report_progress(stats, interval=report_interval))
+        try:
+            for source_path in list_sources(source):
+                await source_loader.load(source_path)
+        finally:
+            reporter.cancel()
+
+    logger.info('Done: %s', stats)
+    return stats
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.tools.load', description='Bulk import of trademarks')
+    parser.add_argument('source', nargs='?', type=Path, default=os.getenv('LOAD_DATA_FROM'))
+    parser.add_argument('--checkpoint', type=Path, default=None)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--report-interval', type=float, default=5)
+
+    args = parser.parse_args(argv)
+    if args.source is None:
+        parser.error('source is required when LOAD_DATA_FROM is not set')
+
+    if args.checkpoint is None:
+        checkpoint_dir = args.source if args.source.is_dir() else args.source.parent
+        args.checkpoint = checkpoint_dir / CHECKPOINT_FILE_NAME
+
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    config = AppConfig()
+
+    logging.basicConfig(stream=sys.stdout, level=config.logging_level)
+    asyncio.run(load(
+        config=config,
+        source=args.source,
+        checkpoint_path=args.checkpoint,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        report_interval=args.report_interval,
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,414 @@
+"""Reproducible load test: a synthetic catalog generator and a replay of search and register traffic.
+
+Usage::
+
+    python -m app.tools.load_test generate trademark_data/synthetic.jsonl [--size 1000000] [--seed 1]
+        [--reference-date YYYY-MM-DD] [--load]
+    python -m app.tools.load_test run [--url URL] [--size 1000000] [--seed 1] [--rps 200] [--duration 60]
+        [--mix exact=6,fuzzy=3,register=1] [--output report.json]
+
+The catalog is a pure function of `--seed`, `--size` and `--reference-date` (today by default), which expiry
+dates are relative to: `generate` writes it as JSONL (and bulk-loads it with `app.tools.load` with `--load`),
+`run` derives the titles it searches for from the same seed without reading the database. Requests are sent
+on a fixed schedule (open loop), latency is measured from the moment a request was due, so a server that falls
+behind shows up in the percentiles instead of slowing the client down.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from enum import Enum
+from itertools import accumulate, count
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple
+
+import aiohttp
+
+from app.configuration import AppConfig
+from app.tools.load import CHECKPOINT_FILE_NAME, load
+
+logger = logging.getLogger('app.tools.load_test')
+
+_ONSETS = ('', 'b', 'br', 'c', 'ch', 'd', 'f', 'g', 'gr', 'k', 'l', 'm', 'n', 'p', 'pr', 'r', 's', 'st', 't', 'tr', 'v')
+_NUCLEI = ('a', 'e', 'i', 'o', 'u', 'ai', 'ea', 'io', 'y')
+_CODAS = ('', 'n', 'r', 's', 'x', 'l', 'm')
+SYLLABLES = tuple(sorted({onset + nucleus + coda for onset in _ONSETS for nucleus in _NUCLEI for coda in _CODAS}))
+# Coined words are spelled with syllables of the same length, so different positions never spell the same word
+CODE_SYLLABLES = tuple(consonant + vowel for consonant in 'BDFGKLMNPRSTVZ' for vowel in 'AEIOU')
+
+VOCABULARY_SIZE = 5000
+# Number of words in a title and how often it occurs
+TITLE_WORDS = (1, 2, 3, 4)
+TITLE_WORDS_WEIGHTS = (30, 40, 20, 10)
+ZIPF_EXPONENT = 1.1
+# Trademarks were applied for up to about 25 years before the reference date and are renewed for terms of 10 years,
+# except for a share of them that lapsed at the end of their last term
+APPLICATION_DAYS = 9000
+TERM_DAYS = 3652
+LAPSED_RATIO = 0.1
+
+
+class SyntheticCatalog:
+    """Deterministic catalog of trademarks, the trademark at a position does not depend on the others.
+
+    A title is a few words drawn from a shared vocabulary with a Zipf distribution, so popular words start
+    many titles, followed by a word coined from the position, which keeps titles unique.
+    """
+
+    def __init__(self, size: int, seed: int = 1, reference_date: date | None = None) -> None:
+        self.size = size
+        self.seed = seed
+        # Expiry dates are relative to it, so the share of active trademarks does not shrink as time goes by
+        self.reference_date = reference_date or date.today()
+        vocabulary_rng = random.Random(seed)
+        self._vocabulary = [
+            ''.join(vocabulary_rng.choices(SYLLABLES, k=vocabulary_rng.randint(1, 3)))
+            for _ in range(VOCABULARY_SIZE)
+        ]
+        self._vocabulary_weights = list(accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, VOCABULARY_SIZE + 1)))
+
+    def title(self, position: int) -> str:
+        rng = random.Random(f'{self.seed}:{position}')
+        return self._title(rng, position)
+
+    def trademark(self, position: int) -> dict[str, Any]:
+        rng = random.Random(f'{self.seed}:{position}')
+        # The title is drawn first, so it is the same as the one returned by `title`
+        title = self._title(rng, position)
+        application_date = self.reference_date - timedelta(days=rng.randint(400, APPLICATION_DAYS))
+        registration_date = application_date + timedelta(days=rng.randint(90, 400))
+        terms = (self.reference_date - application_date).days // TERM_DAYS + 1
+        if terms > 1 and rng.random() < LAPSED_RATIO:
+            terms -= 1
+        return {
+            'title': title,
+            'description': f'Goods and services of class {rng.randint(1, 45)}' if rng.random() < 0.7 else None,
+            'application_number': f'{position:09d}',
+            'application_date': application_date.isoformat(),
+            'registration_date': registration_date.isoformat(),
+            'expiry_date': (application_date + timedelta(days=terms * TERM_DAYS)).isoformat(),
+        }
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return (self.trademark(position) for position in range(self.size))
+
+    def _title(self, rng: random.Random, position: int) -> str:
+        words_count = rng.choices(TITLE_WORDS, weights=TITLE_WORDS_WEIGHTS)[0]
+        words = rng.choices(self._vocabulary, cum_weights=self._vocabulary_weights, k=words_count - 1)
+        words.append(self._coined_word(position))
+        return ' '.join(words).upper()
+
+    def _coined_word(self, position: int) -> str:
+        syllables: list[str] = []
+        remainder = position
+        while remainder or len(syllables) < 2:
+            remainder, syllable = divmod(remainder, len(CODE_SYLLABLES))
+            syllables.append(CODE_SYLLABLES[syllable])
+
+        return ''.join(syllables)
+
+
+def write_catalog(catalog: SyntheticCatalog, path: Path) -> None:
+    with path.open('w') as catalog_file:
+        for trademark in catalog:
+            catalog_file.write(json.dumps(trademark))
+            catalog_file.write('\n')
+
+
+class RequestKind(str, Enum):
+    exact = 'exact'
+    fuzzy = 'fuzzy'
+    register = 'register'
+
+
+class PlannedRequest(NamedTuple):
+    kind: RequestKind
+    method: str
+    path: str
+    params: dict[str, str] | None = None
+    body: dict[str, Any] | None = None
+
+
+def parse_mix(mix: str) -> dict[RequestKind, int]:
+    """Parse request kinds and their weights, e.g. `exact=6,fuzzy=3,register=1`."""
+    weights = {}
+    for part in mix.split(','):
+        kind, _, weight = part.partition('=')
+        weights[RequestKind(kind.strip())] = int(weight)
+
+    if sum(weights.values()) <= 0:
+        raise ValueError(f'Request mix {mix!r} has no requests')
+
+    return weights
+
+
+def _misspell(title: str, rng: random.Random) -> str:
+    position = rng.randrange(len(title))
+    letter = rng.choice('AEIOURSTLN')
+    edit = rng.randrange(3)
+    if edit == 0:
+        return title[:position] + letter + title[position + 1:]
+    if edit == 1 and len(title) > 1:
+        return title[:position] + title[position + 1:]
+    return title[:position] + letter + title[position:]
+
+
+class TrafficPlan:
+    """Endless deterministic sequence of requests with the given mix of kinds.
+
+    Exact searches look up catalog titles, `exact_miss_ratio` of them titles that are not in the catalog.
+    Fuzzy searches look up misspelled catalog titles. Registered titles get the run's `run_token`, so
+    repeated runs register new trademarks instead of hitting the unique title.
+    """
+
+    def __init__(
+            self,
+            catalog: SyntheticCatalog,
+            mix: dict[RequestKind, int],
+            run_token: str,
+            exact_miss_ratio: float = 0.1,
+    ) -> None:
+        self._catalog = catalog
+        self._kinds = list(mix)
+        self._weights = list(mix.values())
+        self._run_token = run_token
+        self._exact_miss_ratio = exact_miss_ratio
+
+    def __iter__(self) -> Iterator[PlannedRequest]:
+        rng = random.Random(self._catalog.seed)
+        for sequence in count():
+            kind = rng.choices(self._kinds, weights=self._weights)[0]
+            yield self._plan(kind, rng, sequence)
+
+    def _plan(self, kind: RequestKind, rng: random.Random, sequence: int) -> PlannedRequest:
+        if kind is RequestKind.register:
+            trademark = self._catalog.trademark(rng.randrange(self._catalog.size))
+            trademark['title'] = f'{trademark["title"]} {self._run_token}-{sequence}'
+            return PlannedRequest(kind=kind, method='POST', path='/trademark', body=trademark)
+
+        if kind is RequestKind.fuzzy:
+            title = _misspell(self._catalog.title(rng.randrange(self._catalog.size)), rng)
+            return PlannedRequest(kind=kind, method='GET', path='/trademark', params={
+                'title': title,
+                'exact_match': 'false',
+            })
+
+        position = rng.randrange(self._catalog.size)
+        if rng.random() < self._exact_miss_ratio:
+            position += self._catalog.size
+        return PlannedRequest(kind=kind, method='GET', path='/trademark', params={
+            'title': self._catalog.title(position),
+        })
+
+
+def percentile(sorted_values: list[float], rank: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0
+
+    position = max(math.ceil(rank / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[position]
+
+
+class LatencyStats:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    def record(self, latency: float, failed: bool) -> None:
+        self.latencies.append(latency)
+        if failed:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict[str, float]:
+        """Request counts and latency percentiles in milliseconds."""
+        latencies = sorted(self.latencies)
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'throughput': round(len(latencies) / elapsed, 2) if elapsed > 0 else 0,
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3) if latencies else 0,
+        }
+
+
+class LoadTestResult(NamedTuple):
+    stats: dict[RequestKind, LatencyStats]
+    # Seconds from the end of the warm-up to the completion of the last request
+    elapsed: float
+
+
+class LoadTestRunner:
+    """Sends planned requests at a fixed rate and records latencies of those sent after the warm-up."""
+
+    def __init__(
+            self,
+            session: aiohttp.ClientSession,
+            base_url: str,
+            rps: float,
+            max_in_flight: int,
+    ) -> None:
+        self._session = session
+        self._base_url = base_url.rstrip('/')
+        self._rps = rps
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def run(
+            self,
+            plan: TrafficPlan,
+            duration: float,
+            warmup: float = 0,
+    ) -> LoadTestResult:
+        stats: dict[RequestKind, LatencyStats] = {kind: LatencyStats() for kind in RequestKind}
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        tasks = []
+        for sequence, planned_request in enumerate(plan):
+            due_offset = sequence / self._rps
+            if due_offset >= warmup + duration:
+                break
+
+            due_at = started_at + due_offset
+            await asyncio.sleep(max(due_at - loop.time(), 0))
+            kind_stats = stats[planned_request.kind] if due_offset >= warmup else None
+            tasks.append(asyncio.create_task(self._send(planned_request, due_at=due_at, stats=kind_stats)))
+
+        await asyncio.gather(*tasks)
+        return LoadTestResult(stats=stats, elapsed=loop.time() - started_at - warmup)
+
+    async def _send(self, planned_request: PlannedRequest, due_at: float, stats: LatencyStats | None) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._in_flight:
+            try:
+                async with self._session.request(
+                    planned_request.method,
+                    f'{self._base_url}{planned_request.path}',
+                    params=planned_request.params,
+                    json=planned_request.body,
+                ) as response:
+                    await response.read()
+                    failed = response.status >= 500
+            except (aiohttp.ClientError, asyncio.TimeoutError) as request_error:
+                logger.debug('Request failed: %s', request_error)
+                failed = True
+
+        if stats is not None:
+            stats.record(loop.time() - due_at, failed=failed)
+
+
+def build_report(result: LoadTestResult, settings: dict[str, Any]) -> dict[str, Any]:
+    overall = LatencyStats()
+    for kind_stats in result.stats.values():
+        overall.latencies.extend(kind_stats.latencies)
+        overall.errors += kind_stats.errors
+
+    return {
+        'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'settings': settings,
+        'elapsed': round(result.elapsed, 3),
+        'overall': overall.summary(result.elapsed),
+        'by_kind': {kind.value: kind_stats.summary(result.elapsed) for kind, kind_stats in result.stats.items()},
+    }
+
+
+async def run_load_test(args: argparse.Namespace) -> dict[str, Any]:
+    catalog = SyntheticCatalog(size=args.size, seed=args.seed, reference_date=args.reference_date)
+    mix = parse_mix(args.mix)
+    plan = TrafficPlan(catalog, mix=mix, run_token=f'R{time.time_ns():x}', exact_miss_ratio=args.exact_miss_ratio)
+
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.max_in_flight)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        runner = LoadTestRunner(session, base_url=args.url, rps=args.rps, max_in_flight=args.max_in_flight)
+        result = await runner.run(plan, duration=args.duration, warmup=args.warmup)
+
+    settings = {
+        'url': args.url,
+        'size': args.size,
+        'seed': args.seed,
+        'reference_date': catalog.reference_date.isoformat(),
+        'rps': args.rps,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'mix': {kind.value: weight for kind, weight in mix.items()},
+        'exact_miss_ratio': args.exact_miss_ratio,
+    }
+    return build_report(result, settings=settings)
+
+
+async def generate(args: argparse.Namespace) -> None:
+    catalog = SyntheticCatalog(size=args.size, seed=args.seed, reference_date=args.reference_date)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    logger.info('Writing %s trademarks to %s', catalog.size, args.output)
+    write_catalog(catalog, args.output)
+
+    if args.load:
+        await load(
+            config=AppConfig(),
+            source=args.output,
+            checkpoint_path=args.output.parent / CHECKPOINT_FILE_NAME,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            report_interval=5,
+        )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.tools.load_test', description='Reproducible load test')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help='Write a synthetic catalog as JSONL')
+    generate_parser.add_argument('output', type=Path)
+    generate_parser.add_argument('--load', action='store_true', help='Bulk-load the catalog after writing it')
+    generate_parser.add_argument('--batch-size', type=int, default=5000)
+    generate_parser.add_argument('--workers', type=int, default=4)
+
+    run_parser = commands.add_parser('run', help='Replay traffic against a running application')
+    run_parser.add_argument('--url', default='http://localhost:8080')
+    run_parser.add_argument('--rps', type=float, default=200)
+    run_parser.add_argument('--duration', type=float, default=60, help='Seconds of measured traffic')
+    run_parser.add_argument('--warmup', type=float, default=5, help='Seconds of traffic before measuring')
+    run_parser.add_argument('--mix', default='exact=6,fuzzy=3,register=1')
+    run_parser.add_argument('--exact-miss-ratio', type=float, default=0.1)
+    run_parser.add_argument('--max-in-flight', type=int, default=256)
+    run_parser.add_argument('--timeout', type=float, default=30)
+    run_parser.add_argument('--output', type=Path, default=None, help='Report file, printed when not set')
+
+    for command_parser in (generate_parser, run_parser):
+        command_parser.add_argument('--size', type=int, default=1000000, help='Number of trademarks in the catalog')
+        command_parser.add_argument('--seed', type=int, default=1)
+        command_parser.add_argument(
+            '--reference-date',
+            type=date.fromisoformat,
+            default=None,
+            help='Date the expiry dates of the catalog are relative to, today when not set',
+        )
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+    if args.command == 'generate':
+        asyncio.run(generate(args))
+        return
+
+    report = asyncio.run(run_load_test(args))
+    report_json = json.dumps(report, indent=2)
+    if args.output is None:
+        print(report_json)  # noqa: WPS421
+    else:
+        args.output.write_text(report_json + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Compare encoding of similar search responses through pydantic models and from raw rows.
+
+Usage::
+
+    python -m app.tools.serialization_benchmark [--sizes 10 1000 50000] [--repeat N]
+
+Both paths start from database rows and end with the body of the HTTP response, the times are
+the best of `--repeat` runs.
+"""
+import argparse
+import time
+from datetime import date
+from typing import Any, Callable
+
+from app.api.handlers.search_trademark import SearchTrademarkHandlerResponse
+from app.models.id import generate_id
+from app.models.trademark import SearchCursor, SimilarTrademark, Trademark
+from app.repositories.trademark import TrademarkRepository
+
+
+def make_rows(count: int) -> list[dict[str, Any]]:
+    return [
+        {
+            'id': generate_id(),
+            'title': f'Trademark title {position}',
+            'description': f'Description of the trademark number {position}' if position % 3 else None,
+            'application_number': f'2021{position:06d}',
+            'application_date': date(2021, 1, 1),
+            'registration_date': date(2022, 1, 1),
+            'expiry_date': date(2032, 1, 1),
+            'score': 0.6153846383094788,
+            'distance': 0.3846153616905212,
+        }
+        for position in range(count)
+    ]
+
+
+def encode_models(records: list[dict[str, Any]], next_cursor: SearchCursor) -> bytes:
+    result: list[Trademark] = [SimilarTrademark(**record) for record in records]
+    response = SearchTrademarkHandlerResponse.ok_response(result=result, next_cursor=next_cursor)
+    return response.as_web_response().body  # type: ignore[return-value]
+
+
+def encode_rows(rows: list[tuple[Any, ...]], next_cursor: SearchCursor) -> bytes:
+    response = SearchTrademarkHandlerResponse.rows_web_response(rows=rows, next_cursor=next_cursor)
+    return response.body  # type: ignore[return-value]
+
+
+def _best_time(run: Callable[[], bytes], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started_at)
+
+    return min(timings)
+
+
+def benchmark(size: int, repeat: int) -> tuple[float, float]:
+    records = make_rows(size)
+    rows = [tuple(record[field] for field in TrademarkRepository.similar_fields) for record in records]
+    next_cursor = SearchCursor(distance=records[-1]['distance'], id=records[-1]['id'])
+
+    if encode_models(records, next_cursor) != encode_rows(rows, next_cursor):
+        raise AssertionError('Responses differ')
+
+    return (
+        _best_time(lambda: encode_models(records, next_cursor), repeat=repeat),
+        _best_time(lambda: encode_rows(rows, next_cursor), repeat=repeat),
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m app.tools.serialization_benchmark',
+        description='Benchmark of search response encoding',
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    print(f'{"rows":>8} {"models, ms":>12} {"raw rows, ms":>14} {"speedup":>8}')  # noqa: WPS421
+    for size in args.sizes:
+        models_time, rows_time = benchmark(size, repeat=args.repeat)
+        print(  # noqa: WPS421
+            f'{size:>8} {models_time * 1000:>12.3f} {rows_time * 1000:>14.3f} {models_time / rows_time:>7.1f}x',
+        )
+
+
+if __name__ == '__main__':
+    main()
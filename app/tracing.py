@@ -0,0 +1,100 @@
+"""Request-scoped tracing: a request id and timed spans of the work done for the request.
+
+A trace lives in a context variable set by the tracing middleware, so code down the call stack records
+spans without it being passed around. Outside of a request, e.g. in background index updates, there is
+no trace and a span costs one context variable lookup. Tasks copy the context they are created in, so
+the work of a single-flight call is recorded in the trace of the request that started it.
+"""
+import time
+from contextvars import ContextVar, Token
+from types import TracebackType
+from typing import Any, NamedTuple
+
+# Spans recorded beyond this are counted but not kept, e.g. for long streamed responses
+MAX_SPANS = 200
+
+
+class Span(NamedTuple):
+    name: str
+    # What the span worked on, e.g. a statement name
+    detail: str | None
+    # Seconds since the start of the trace
+    offset: float
+    duration: float
+
+
+class Trace:
+    __slots__ = ('request_id', 'started_at', 'spans', 'dropped_spans')
+
+    def __init__(self, request_id: str) -> None:
+        self.request_id = request_id
+        self.started_at = time.perf_counter()
+        self.spans: list[Span] = []
+        self.dropped_spans = 0
+
+    def add_span(self, name: str, detail: str | None, started_at: float, finished_at: float) -> None:
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped_spans += 1
+            return
+
+        self.spans.append(Span(name, detail, started_at - self.started_at, finished_at - started_at))
+
+    def as_log_record(self) -> dict[str, Any]:
+        """Span breakdown for a structured log line, times in milliseconds."""
+        spans = []
+        for recorded_span in self.spans:
+            span_record: dict[str, Any] = {
+                'name': recorded_span.name,
+                'offset_ms': round(recorded_span.offset * 1000, 3),
+                'duration_ms': round(recorded_span.duration * 1000, 3),
+            }
+            if recorded_span.detail is not None:
+                span_record['detail'] = recorded_span.detail
+            spans.append(span_record)
+
+        return {'request_id': self.request_id, 'spans': spans, 'dropped_spans': self.dropped_spans}
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar('current_trace', default=None)
+
+
+def set_current_trace(trace: Trace) -> Token[Trace | None]:
+    """Make the trace current, the token restores the previous one with `reset_current_trace`."""
+    return _current_trace.set(trace)
+
+
+def reset_current_trace(token: Token[Trace | None]) -> None:
+    _current_trace.reset(token)
+
+
+def get_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+class span:  # noqa: N801
+    """Context manager that records its duration as a span of the current trace, if there is one.
+
+    A class rather than a generator based context manager, which costs several times more per use.
+    """
+
+    __slots__ = ('_name', '_detail', '_trace', '_started_at')
+
+    def __init__(self, name: str, detail: str | None = None) -> None:
+        self._name = name
+        self._detail = detail
+        self._trace: Trace | None = None
+        self._started_at = 0.0
+
+    def __enter__(self) -> None:
+        self._trace = _current_trace.get()
+        if self._trace is not None:
+            self._started_at = time.perf_counter()
+
+    def __exit__(
+            self,
+            exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None,
+    ) -> None:
+        if self._trace is not None:
+            self._trace.add_span(self._name, self._detail, self._started_at, time.perf_counter())
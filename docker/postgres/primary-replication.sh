@@ -0,0 +1,4 @@
+#!/bin/bash
+# Runs on the first start of the primary: allows streaming replication connections.
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,16 @@
+#!/bin/bash
+# Clones the primary into an empty data directory and runs it as a streaming replica.
+set -e
+
+mkdir -p "$PGDATA"
+chown postgres:postgres "$PGDATA"
+chmod 0700 "$PGDATA"
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until gosu postgres pg_basebackup --host="$PRIMARY_HOST" --pgdata="$PGDATA" --write-recovery-conf --wal-method=stream; do
+        echo "Waiting for the primary at $PRIMARY_HOST"
+        sleep 1
+    done
+fi
+
+exec gosu postgres postgres
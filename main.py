@@ -1,9 +1,5 @@
-from aiohttp import web
-
-from app.application import create_application
 from app.configuration import AppConfig
+from app.server import run_server
 
 if __name__ == '__main__':
-    config = AppConfig()
-    application = create_application(config)
-    web.run_app(application, port=config.port)
+    run_server(AppConfig())
@@ -0,0 +1,4 @@
+--liquibase formatted sql
+
+--changeset r.chushkin:create-unique-index-by-title
+CREATE UNIQUE INDEX IF NOT EXISTS trademark_title_uniq_idx ON data.trademark (title);
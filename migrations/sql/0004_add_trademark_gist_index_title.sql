@@ -0,0 +1,4 @@
+--liquibase formatted sql
+
+--changeset r.chushkin:create-gist-index-by-title
+CREATE INDEX IF NOT EXISTS trademark_trgm_gist_idx ON data.trademark USING GIST (title gist_trgm_ops);
@@ -0,0 +1,24 @@
+--liquibase formatted sql
+
+--changeset r.chushkin:create-function-normalize-title
+-- Mirrored by `app.models.trademark.normalize_title()`, both must be changed together.
+-- lower() follows LC_CTYPE of the database, it must be a UTF-8 locale (the default of the postgres image).
+CREATE OR REPLACE FUNCTION data.normalize_title(title TEXT) RETURNS TEXT
+    LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    RETURN btrim(regexp_replace(
+        regexp_replace(lower(normalize(title, NFKD)), '[\u0300-\u036f]', '', 'g'),
+        '\s+', ' ', 'g'
+    ));
+
+--changeset r.chushkin:add-column-title-normalized
+ALTER TABLE data.trademark
+    ADD COLUMN IF NOT EXISTS title_normalized TEXT GENERATED ALWAYS AS (data.normalize_title(title)) STORED;
+
+--changeset r.chushkin:create-unique-index-by-title-normalized
+-- Fails if registered titles differ only in case, accents or whitespace, such duplicates are listed by
+-- SELECT data.normalize_title(title), array_agg(id) FROM data.trademark GROUP BY 1 HAVING count(*) > 1
+CREATE UNIQUE INDEX IF NOT EXISTS trademark_title_normalized_uniq_idx ON data.trademark (title_normalized);
+
+--changeset r.chushkin:drop-unique-index-by-title
+-- Uniqueness of normalized titles implies uniqueness of titles
+DROP INDEX IF EXISTS data.trademark_title_uniq_idx;
@@ -0,0 +1,6 @@
+--liquibase formatted sql
+
+--changeset r.chushkin:create-prefix-index-by-title-normalized
+-- Prefix search over normalized titles, `id` and `title` are included for index-only scans
+CREATE INDEX IF NOT EXISTS trademark_title_normalized_prefix_idx
+    ON data.trademark (title_normalized text_pattern_ops) INCLUDE (id, title);
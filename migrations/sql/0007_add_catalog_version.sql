@@ -0,0 +1,40 @@
+--liquibase formatted sql
+
+--changeset r.chushkin:create-catalog-version-table
+-- A single row with the number of statements that changed the catalog, for conditional requests
+CREATE TABLE IF NOT EXISTS data.catalog_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL
+);
+
+--changeset r.chushkin:create-bump-catalog-version-function splitStatements:false
+-- Bumped in the transaction of the change, so versions are committed in order and readers see the version
+-- of the catalog in their snapshot. Listeners of the `catalog_version` channel get the new version on commit.
+CREATE OR REPLACE FUNCTION data.bump_catalog_version() RETURNS TRIGGER
+    LANGUAGE plpgsql AS
+$$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    IF EXISTS (SELECT FROM changed_rows) THEN
+        INSERT INTO data.catalog_version (version) VALUES (1)
+        ON CONFLICT (id) DO UPDATE SET version = catalog_version.version + 1
+        RETURNING version INTO new_version;
+
+        PERFORM pg_notify('catalog_version', new_version::text);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+--changeset r.chushkin:create-trademark-catalog-version-triggers
+-- Statement level, a batch registration bumps the version once
+CREATE OR REPLACE TRIGGER trademark_insert_catalog_version
+    AFTER INSERT ON data.trademark REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data.bump_catalog_version();
+CREATE OR REPLACE TRIGGER trademark_update_catalog_version
+    AFTER UPDATE ON data.trademark REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data.bump_catalog_version();
+CREATE OR REPLACE TRIGGER trademark_delete_catalog_version
+    AFTER DELETE ON data.trademark REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data.bump_catalog_version();
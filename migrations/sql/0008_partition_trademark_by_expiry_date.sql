@@ -0,0 +1,153 @@
+--liquibase formatted sql
+
+--changeset r.chushkin:create-trademark-title-table
+-- Normalized titles of all trademarks, unique across partitions: a unique index of a partitioned table
+-- must include the partition key, so the catalog table cannot enforce it by itself.
+CREATE TABLE IF NOT EXISTS data.trademark_title (
+    title_normalized TEXT PRIMARY KEY,
+    id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trademark_title_id_idx ON data.trademark_title (id);
+
+--changeset r.chushkin:create-claim-trademark-title-function splitStatements:false
+-- A row whose title is registered by another trademark is skipped, like a conflicting row of
+-- ON CONFLICT DO NOTHING, so that it is not returned by RETURNING. The claim of the same trademark
+-- is kept, e.g. for a row moved to another partition. A title change to a registered one fails.
+CREATE OR REPLACE FUNCTION data.claim_trademark_title() RETURNS TRIGGER
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    INSERT INTO data.trademark_title (title_normalized, id) VALUES (data.normalize_title(NEW.title), NEW.id)
+    ON CONFLICT (title_normalized) DO UPDATE SET id = excluded.id WHERE trademark_title.id = excluded.id;
+
+    IF NOT FOUND THEN
+        IF TG_OP = 'UPDATE' THEN
+            RAISE unique_violation USING MESSAGE = format('Title %L is already registered', NEW.title);
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND data.normalize_title(OLD.title) <> data.normalize_title(NEW.title) THEN
+        DELETE FROM data.trademark_title WHERE title_normalized = data.normalize_title(OLD.title) AND id = OLD.id;
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+--changeset r.chushkin:create-release-trademark-title-function splitStatements:false
+CREATE OR REPLACE FUNCTION data.release_trademark_title() RETURNS TRIGGER
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    DELETE FROM data.trademark_title AS claim
+    USING changed_rows
+    WHERE claim.title_normalized = changed_rows.title_normalized AND claim.id = changed_rows.id;
+    RETURN NULL;
+END
+$$;
+
+--changeset r.chushkin:create-trademark-partitions-function splitStatements:false
+-- Creates missing yearly partitions, rows of those years are moved out of the default partition.
+-- Run ahead of time, e.g. yearly: searches of active trademarks always read the default partition.
+CREATE OR REPLACE FUNCTION data.create_trademark_partitions(from_year INT, to_year INT) RETURNS VOID
+    LANGUAGE plpgsql AS
+$$
+DECLARE
+    partition_year INT;
+    partition_name TEXT;
+    lower_bound DATE;
+    upper_bound DATE;
+    has_default_rows BOOLEAN;
+BEGIN
+    FOR partition_year IN from_year..to_year LOOP
+        partition_name := format('trademark_y%s', partition_year);
+        CONTINUE WHEN to_regclass(format('data.%I', partition_name)) IS NOT NULL;
+
+        lower_bound := make_date(partition_year, 1, 1);
+        upper_bound := make_date(partition_year + 1, 1, 1);
+        SELECT EXISTS (
+            SELECT FROM data.trademark_default WHERE expiry_date >= lower_bound AND expiry_date < upper_bound
+        ) INTO has_default_rows;
+
+        IF has_default_rows THEN
+            ALTER TABLE data.trademark DETACH PARTITION data.trademark_default;
+        END IF;
+
+        EXECUTE format(
+            'CREATE TABLE data.%I PARTITION OF data.trademark FOR VALUES FROM (%L) TO (%L)',
+            partition_name, lower_bound, upper_bound
+        );
+
+        IF has_default_rows THEN
+            INSERT INTO data.trademark (
+                id, title, description, application_number, application_date, registration_date, expiry_date
+            )
+            SELECT id, title, description, application_number, application_date, registration_date, expiry_date
+            FROM data.trademark_default
+            WHERE expiry_date >= lower_bound AND expiry_date < upper_bound;
+            DELETE FROM data.trademark_default WHERE expiry_date >= lower_bound AND expiry_date < upper_bound;
+            ALTER TABLE data.trademark ATTACH PARTITION data.trademark_default DEFAULT;
+        END IF;
+    END LOOP;
+END
+$$;
+
+--changeset r.chushkin:partition-trademark-by-expiry-date
+-- Trademarks that expired more than 10 years ago share the archive partition, later ones are split by year
+-- of expiry for 15 years ahead. Searches of active trademarks skip the partitions of past years.
+ALTER TABLE data.trademark RENAME TO trademark_unpartitioned;
+ALTER TABLE data.trademark_unpartitioned RENAME CONSTRAINT trademark_pkey TO trademark_unpartitioned_pkey;
+DROP TRIGGER IF EXISTS trademark_insert_catalog_version ON data.trademark_unpartitioned;
+DROP TRIGGER IF EXISTS trademark_update_catalog_version ON data.trademark_unpartitioned;
+DROP TRIGGER IF EXISTS trademark_delete_catalog_version ON data.trademark_unpartitioned;
+
+CREATE TABLE data.trademark (
+    id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    application_number TEXT NOT NULL,
+    application_date DATE NOT NULL,
+    registration_date DATE NOT NULL,
+    expiry_date DATE NOT NULL,
+    title_normalized TEXT GENERATED ALWAYS AS (data.normalize_title(title)) STORED,
+    CONSTRAINT trademark_pkey PRIMARY KEY (id, expiry_date)
+) PARTITION BY RANGE (expiry_date);
+
+CREATE TABLE data.trademark_archive PARTITION OF data.trademark
+    FOR VALUES FROM (MINVALUE) TO (make_date(extract(YEAR FROM current_date)::INT - 10, 1, 1));
+CREATE TABLE data.trademark_default PARTITION OF data.trademark DEFAULT;
+SELECT data.create_trademark_partitions(
+    extract(YEAR FROM current_date)::INT - 10,
+    extract(YEAR FROM current_date)::INT + 15
+);
+
+CREATE TRIGGER trademark_claim_title
+    BEFORE INSERT OR UPDATE OF title ON data.trademark
+    FOR EACH ROW EXECUTE FUNCTION data.claim_trademark_title();
+CREATE TRIGGER trademark_release_title
+    AFTER DELETE ON data.trademark REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data.release_trademark_title();
+
+INSERT INTO data.trademark (
+    id, title, description, application_number, application_date, registration_date, expiry_date
+)
+SELECT id, title, description, application_number, application_date, registration_date, expiry_date
+FROM data.trademark_unpartitioned;
+DROP TABLE data.trademark_unpartitioned;
+
+-- Created after the copy, which is faster than maintaining them row by row
+CREATE INDEX trademark_title_normalized_idx ON data.trademark (title_normalized);
+CREATE INDEX trademark_title_normalized_prefix_idx
+    ON data.trademark (title_normalized text_pattern_ops) INCLUDE (id, title);
+CREATE INDEX trademark_trgm_idx ON data.trademark USING GIN (title gin_trgm_ops);
+CREATE INDEX trademark_trgm_gist_idx ON data.trademark USING GIST (title gist_trgm_ops);
+
+CREATE TRIGGER trademark_insert_catalog_version
+    AFTER INSERT ON data.trademark REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data.bump_catalog_version();
+CREATE TRIGGER trademark_update_catalog_version
+    AFTER UPDATE ON data.trademark REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data.bump_catalog_version();
+CREATE TRIGGER trademark_delete_catalog_version
+    AFTER DELETE ON data.trademark REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data.bump_catalog_version();
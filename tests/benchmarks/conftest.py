@@ -0,0 +1,78 @@
+import logging
+from contextlib import nullcontext
+from typing import Any, cast, Sequence
+
+import pytest
+from asyncpg import Pool
+
+from app.repositories.database_session import DatabaseSessionFactory
+from app.repositories.trademark import TrademarkRepository
+from app.tools.serialization_benchmark import make_rows
+
+
+class FakeRecord(tuple[Any, ...]):
+    """Row that, like `asyncpg.Record`, is a sequence of values and a mapping of column names."""
+
+    positions = {name: position for position, name in enumerate(TrademarkRepository.similar_fields)}
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, str):
+            return super().__getitem__(self.positions[key])
+        return super().__getitem__(key)
+
+    def keys(self) -> Sequence[str]:
+        return TrademarkRepository.similar_fields
+
+
+class FakeConnection:
+    """Connection that returns the same rows for every query."""
+
+    def __init__(self) -> None:
+        self.rows: list[Any] = []
+
+    async def fetch(self, sql: str, *args: Any) -> list[Any]:
+        return self.rows
+
+    async def execute(self, sql: str, *args: Any) -> None:
+        """Statements without results, e.g. settings, do nothing."""
+
+    def transaction(self) -> nullcontext[None]:
+        return nullcontext()
+
+
+class FakeConnectionPool:
+    def __init__(self, connection: FakeConnection) -> None:
+        self._connection = connection
+
+    async def acquire(self, timeout: float | None = None) -> FakeConnection:
+        return self._connection
+
+    async def release(self, connection: FakeConnection) -> None:
+        """Connections are never closed."""
+
+
+@pytest.fixture(scope='session')
+def logger() -> logging.Logger:
+    return logging.getLogger('benchmark')
+
+
+@pytest.fixture(params=[1, 50, 500], ids=lambda size: f'{size}_rows')
+def result_size(request: pytest.FixtureRequest) -> int:
+    return cast(int, request.param)
+
+
+@pytest.fixture
+def similar_records(result_size: int) -> list[FakeRecord]:
+    return [FakeRecord(row.values()) for row in make_rows(result_size)]
+
+
+@pytest.fixture
+def fake_connection(similar_records: list[FakeRecord]) -> FakeConnection:
+    connection = FakeConnection()
+    connection.rows = similar_records
+    return connection
+
+
+@pytest.fixture
+def db_session_factory(fake_connection: FakeConnection) -> DatabaseSessionFactory:
+    return DatabaseSessionFactory(connection_pool=cast(Pool, FakeConnectionPool(fake_connection)), name='benchmark')
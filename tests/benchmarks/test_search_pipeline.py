@@ -0,0 +1,120 @@
+"""Stages of `GET /trademark` timed in isolation, on results of different sizes, without a database."""
+from logging import Logger
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+from multidict import MultiDict, MultiDictProxy
+
+from app.api.handlers.search_trademark import (
+    search_trademark,
+    SearchTrademarkHandlerRequest,
+    SearchTrademarkHandlerResponse,
+)
+from app.api.middlewares import create_tracing_middleware
+from app.models.trademark import SimilarTrademark, Trademark
+from app.repositories.database_session import DatabaseSessionFactory
+from app.repositories.trademark import TrademarkRepository
+from app.services.search_trademark import SearchTrademarkService, SearchTrademarkServiceRequest
+from tests.benchmarks.conftest import FakeRecord
+from tests.plugins.benchmark import Benchmark
+
+SEARCH_QUERY = MultiDictProxy(MultiDict({'title': 'trademark', 'exact_match': 'false', 'limit': '500'}))
+
+
+@pytest.fixture
+def similar_trademarks(similar_records: list[FakeRecord]) -> list[Trademark]:
+    return [SimilarTrademark(**record) for record in similar_records]
+
+
+@pytest.fixture(params=[False, True], ids=['models', 'raw_rows'])
+def search_tm_service(
+        request: pytest.FixtureRequest,
+        logger: Logger,
+        db_session_factory: DatabaseSessionFactory,
+) -> SearchTrademarkService:
+    return SearchTrademarkService(
+        logger=logger,
+        db_session_factory=db_session_factory,
+        trademark_repository=TrademarkRepository(),
+        raw_rows=request.param,
+    )
+
+
+def test_validate_handler_request(benchmark: Benchmark) -> None:
+    handler_request = benchmark(SearchTrademarkHandlerRequest.model_validate, SEARCH_QUERY)
+
+    assert handler_request.title == 'trademark'
+
+
+def test_build_service_request(benchmark: Benchmark) -> None:
+    handler_request = SearchTrademarkHandlerRequest.model_validate(SEARCH_QUERY)
+
+    service_request = benchmark(lambda: SearchTrademarkServiceRequest.model_validate(handler_request.model_dump()))
+
+    assert not service_request.exact_match
+
+
+def test_build_models(benchmark: Benchmark, similar_records: list[FakeRecord]) -> None:
+    trademarks = benchmark(lambda: [SimilarTrademark(**record) for record in similar_records])
+
+    assert len(trademarks) == len(similar_records)
+
+
+def test_encode_models_response(benchmark: Benchmark, similar_trademarks: list[Trademark]) -> None:
+    def _encode() -> web.Response:
+        return SearchTrademarkHandlerResponse.ok_response(result=similar_trademarks).as_web_response()
+
+    response = benchmark(_encode)
+
+    assert response.status == 200
+
+
+def test_encode_rows_response(benchmark: Benchmark, similar_records: list[FakeRecord]) -> None:
+    response = benchmark(SearchTrademarkHandlerResponse.rows_web_response, rows=similar_records)
+
+    assert response.status == 200
+
+
+async def test_service_find_similar(benchmark: Benchmark, search_tm_service: SearchTrademarkService) -> None:
+    service_request = SearchTrademarkServiceRequest(title='trademark', exact_match=False, limit=500)
+
+    service_response = await benchmark.run_async(search_tm_service.invoke, request=service_request)
+
+    assert service_response.is_success()
+
+
+@pytest.mark.filterwarnings('ignore::aiohttp.web.NotAppKeyWarning')
+async def test_handler_search_similar(benchmark: Benchmark, search_tm_service: SearchTrademarkService) -> None:
+    application = web.Application()
+    application['composition_container'] = SimpleNamespace(
+        search_tm_service=search_tm_service,
+        catalog_version_watcher=None,
+    )
+    # Building a mocked request costs more than handling it, the handler does not change it so it is reused
+    request = make_mocked_request('GET', '/trademark?title=trademark&exact_match=false&limit=500', app=application)
+
+    response = await benchmark.run_async(search_trademark, request)
+
+    assert response.status == 200
+
+
+@pytest.mark.filterwarnings('ignore::aiohttp.web.NotAppKeyWarning')
+async def test_handler_search_similar_traced(
+        benchmark: Benchmark,
+        search_tm_service: SearchTrademarkService,
+        logger: Logger,
+) -> None:
+    """Same as `test_handler_search_similar` behind the tracing middleware, the difference is its overhead."""
+    application = web.Application()
+    application['composition_container'] = SimpleNamespace(
+        search_tm_service=search_tm_service,
+        catalog_version_watcher=None,
+    )
+    request = make_mocked_request('GET', '/trademark?title=trademark&exact_match=false&limit=500', app=application)
+    tracing_middleware = create_tracing_middleware(logger, slow_request_threshold=None)
+
+    response = await benchmark.run_async(tracing_middleware, request, search_trademark)
+
+    assert response.status == 200
@@ -1,3 +1,5 @@
 pytest_plugins = (
+    'tests.plugins.benchmark',
     'tests.plugins.postgresql',
+    'tests.plugins.query_plans',
 )
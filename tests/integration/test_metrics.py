@@ -0,0 +1,23 @@
+from typing import Any
+
+from aiohttp.test_utils import TestClient
+
+
+async def test_metrics(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    response = await app_client.post('/trademark', json=sample_trademark_data)
+    assert response.status == 201
+
+    response = await app_client.get('/trademark', params={'title': sample_trademark_data['title']})
+    assert response.status == 200
+
+    response = await app_client.get('/metrics')
+    assert response.status == 200
+    assert response.content_type == 'text/plain'
+
+    metrics = await response.text()
+    assert 'http_request_duration_seconds_count{method="POST",route="/trademark",status="201"}' in metrics
+    assert 'trademark_repository_query_duration_seconds_count{method="find_exact"}' in metrics
+    assert 'db_pool_connections{pool="write",state="idle"}' in metrics
@@ -0,0 +1,20 @@
+from typing import Any
+
+from aiohttp.test_utils import TestClient
+
+
+async def test_pool_stats(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    response = await app_client.post('/trademark', json=sample_trademark_data)
+    assert response.status == 201
+
+    response = await app_client.get('/pools')
+    assert response.status == 200
+
+    pools = {pool['name']: pool for pool in (await response.json())['result']}
+    assert set(pools) == {'search_exact', 'search_fuzzy', 'write'}
+    assert pools['write']['acquired'] == 1
+    assert pools['write']['in_use'] == 0
+    assert pools['search_fuzzy']['acquired'] == 0
@@ -1,6 +1,19 @@
-from typing import Any
+import asyncio
+from typing import Any, AsyncGenerator
 
-from aiohttp.test_utils import TestClient
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.application import create_application
+from app.configuration import AppConfig
+
+
+@pytest.fixture
+async def batching_app_client(app_config: AppConfig, db: None) -> AsyncGenerator[TestClient, None]:
+    config = app_config.model_copy(update={'register_batch_max_size': 10})
+    app_server = TestServer(await create_application(config))
+    async with app_server, TestClient(app_server) as client:
+        yield client
 
 
 async def test_register_success(
@@ -16,3 +29,34 @@ async def test_register_success(
 
     response_body = await response.json()
     assert response_body['result'][0]['title'] == title
+
+
+async def test_register_already_registered(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    responses = await asyncio.gather(
+        app_client.post('/trademark', json=sample_trademark_data),
+        app_client.post('/trademark', json=sample_trademark_data),
+    )
+    assert sorted(response.status for response in responses) == [201, 409]
+
+    response = await app_client.post('/trademark', json=sample_trademark_data)
+    assert response.status == 409
+
+
+async def test_register_in_batch(
+        batching_app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    other_trademark_data = {**sample_trademark_data, 'title': 'titleb'}
+    responses = await asyncio.gather(
+        batching_app_client.post('/trademark', json=sample_trademark_data),
+        batching_app_client.post('/trademark', json=sample_trademark_data),
+        batching_app_client.post('/trademark', json=other_trademark_data),
+    )
+    assert sorted(response.status for response in responses) == [201, 201, 409]
+
+    for title in ('titlea', 'titleb'):
+        response = await batching_app_client.get(f'/trademark?title={title}')
+        assert response.status == 200
@@ -0,0 +1,32 @@
+from typing import Any
+
+from aiohttp.test_utils import TestClient
+
+
+async def test_register_batch_success(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    other_trademark_data = {**sample_trademark_data, 'title': 'titlez'}
+    invalid_trademark_data = {**sample_trademark_data, 'title': ''}
+    items = [sample_trademark_data, other_trademark_data, sample_trademark_data, invalid_trademark_data]
+
+    response = await app_client.post('/trademark/batch', json={'items': items})
+    assert response.status == 200
+
+    response_body = await response.json()
+    statuses = [item['status'] for item in response_body['result']]
+    assert statuses == ['created', 'created', 'already_registered', 'invalid']
+
+    response = await app_client.post('/trademark/batch', json={'items': [sample_trademark_data]})
+    response_body = await response.json()
+    assert response_body['result'][0]['status'] == 'already_registered'
+
+    title = sample_trademark_data['title']
+    response = await app_client.get(f'/trademark?title={title}')
+    assert response.status == 200
+
+
+async def test_register_batch_empty(app_client: TestClient) -> None:
+    response = await app_client.post('/trademark/batch', json={'items': []})
+    assert response.status == 400
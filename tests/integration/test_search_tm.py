@@ -1,7 +1,15 @@
+import asyncio
+import json
+from datetime import date, timedelta
 from typing import Any
 
+import asyncpg
 import pytest
-from aiohttp.test_utils import TestClient
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.application import create_application
+from app.configuration import AppConfig
+from app.models.trademark import normalize_title
 
 
 @pytest.fixture
@@ -35,3 +43,198 @@ async def test_search_similar_success(
 
     response_body = await response.json()
     assert response_body['result'][0]['title'] == sample_trademark_data['title']
+
+
+async def test_search_similar_threshold(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    for title in ('titlea', 'titleb'):
+        await app_client.post('/trademark', json={**sample_trademark_data, 'title': title})
+
+    response = await app_client.get('/trademark?title=titlea&exact_match=false&similarity=0.9')
+    response_body = await response.json()
+    assert [item['title'] for item in response_body['result']] == ['titlea']
+
+    response = await app_client.get('/trademark?title=titlea&exact_match=false&similarity=1')
+    assert response.status == 400
+
+
+async def test_search_word_similar(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    await app_client.post('/trademark', json={**sample_trademark_data, 'title': 'Blue Wave Surfboards'})
+
+    response = await app_client.get('/trademark?title=wave&exact_match=false')
+    assert response.status == 404
+
+    for mode in ('word_similarity', 'strict_word_similarity'):
+        response = await app_client.get(f'/trademark?title=wave&exact_match=false&mode={mode}')
+        assert response.status == 200
+
+        response_body = await response.json()
+        assert response_body['result'][0]['title'] == 'Blue Wave Surfboards'
+        assert response_body['result'][0]['score'] == 1
+
+
+async def test_search_similar_pages(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    for title in ('titlea', 'titleb', 'titlec'):
+        await app_client.post('/trademark', json={**sample_trademark_data, 'title': title})
+
+    response = await app_client.get('/trademark?title=titlea&exact_match=false&limit=2')
+    assert response.status == 200
+
+    response_body = await response.json()
+    assert [item['title'] for item in response_body['result']][0] == 'titlea'
+    assert response_body['result'][0]['score'] == 1
+    assert response_body['next_cursor'] is not None
+
+    next_cursor = response_body['next_cursor']
+    response = await app_client.get(f'/trademark?title=titlea&exact_match=false&limit=2&cursor={next_cursor}')
+    response_body = await response.json()
+    assert len(response_body['result']) == 1
+    assert response_body['next_cursor'] is None
+
+
+async def test_search_similar_stream(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    for title in ('titlea', 'titleb', 'titlec'):
+        await app_client.post('/trademark', json={**sample_trademark_data, 'title': title})
+
+    response = await app_client.get(
+        '/trademark?title=titlea&exact_match=false',
+        headers={'Accept': 'application/x-ndjson'},
+    )
+    assert response.status == 200
+    assert response.content_type == 'application/x-ndjson'
+
+    lines = (await response.text()).splitlines()
+    assert [json.loads(line)['title'] for line in lines][0] == 'titlea'
+    assert len(lines) == 3
+
+
+async def test_search_exact_normalized(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    await app_client.post('/trademark', json={**sample_trademark_data, 'title': 'Café Wave'})
+
+    response = await app_client.get('/trademark', params={'title': '  CAFE   wave '})
+    assert response.status == 200
+
+    response_body = await response.json()
+    assert response_body['result'][0]['title'] == 'Café Wave'
+
+    response = await app_client.post('/trademark', json={**sample_trademark_data, 'title': 'cafe wave'})
+    assert response.status == 409
+
+
+@pytest.mark.parametrize('title', ['  Wave \t Surf\n', 'Café Crème', 'ＷＡＶＥ', 'ﬁne line', 'Straße'])
+async def test_normalize_title_same_as_database(postgres_dsn: str, db: None, title: str) -> None:
+    connection = await asyncpg.connect(postgres_dsn)
+    try:
+        normalized = await connection.fetchval('SELECT data.normalize_title($1)', title)
+    finally:
+        await connection.close()
+
+    assert normalized == normalize_title(title)
+
+
+async def test_search_not_modified_until_catalog_changes(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    url = f'/trademark?title={sample_trademark_data["title"]}'
+    response = await app_client.get(url)
+    assert response.status == 404
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = await app_client.get(url, headers={'If-None-Match': etag})
+    assert response.status == 304
+    assert response.headers['ETag'] == etag
+
+    await app_client.post('/trademark', json=sample_trademark_data)
+    # The version changes when the notification of the registration arrives
+    for _ in range(50):
+        response = await app_client.get(url, headers={'If-None-Match': etag})
+        if response.status != 304:
+            break
+        await asyncio.sleep(0.1)
+
+    assert response.status == 200
+    assert response.headers['ETag'] != etag
+
+
+class _Tomorrow(date):
+    @classmethod
+    def today(cls) -> '_Tomorrow':
+        tomorrow = date.today() + timedelta(days=1)
+        return cls(tomorrow.year, tomorrow.month, tomorrow.day)
+
+
+async def test_search_not_modified_until_midnight(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+        sample_trademark: None,
+        monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    url = f'/trademark?title={sample_trademark_data["title"]}'
+    response = await app_client.get(url)
+    assert response.status == 200
+    etag = response.headers['ETag']
+
+    # The sample trademark expires today
+    monkeypatch.setattr('app.repositories.trademark.date', _Tomorrow)
+    response = await app_client.get(url, headers={'If-None-Match': etag})
+    assert response.status == 404
+    assert response.headers['ETag'] != etag
+
+
+async def test_search_in_trigram_index_skips_expired_since_indexed(
+        app_config: AppConfig,
+        db: None,
+        sample_trademark_data: dict[str, Any],
+        monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    config = app_config.model_copy(update={'trigram_index_enabled': True})
+    app_server = TestServer(await create_application(config))
+    async with app_server, TestClient(app_server) as app_client:
+        # Indexed when registered, the sample trademark expires today
+        response = await app_client.post('/trademark', json=sample_trademark_data)
+        assert response.status == 201
+        response = await app_client.get('/trademark?title=titleb&exact_match=false')
+        assert [item['title'] for item in (await response.json())['result']] == ['titlea']
+
+        monkeypatch.setattr('app.repositories.trademark.date', _Tomorrow)
+        response = await app_client.get('/trademark?title=titleb&exact_match=false')
+        assert (await response.json())['result'] == []
+
+
+async def test_search_expired_on_request(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    expiry_date = (date.today() - timedelta(days=365)).isoformat()
+    response = await app_client.post('/trademark', json={**sample_trademark_data, 'expiry_date': expiry_date})
+    assert response.status == 201
+
+    response = await app_client.get('/trademark?title=titlea')
+    assert response.status == 404
+    response = await app_client.get('/trademark?title=titlea&include_expired=true')
+    assert response.status == 200
+
+    response = await app_client.get('/trademark?title=titleb&exact_match=false')
+    assert (await response.json())['result'] == []
+    response = await app_client.get('/trademark?title=titleb&exact_match=false&include_expired=true')
+    assert [item['title'] for item in (await response.json())['result']] == ['titlea']
+
+    # Titles are registered once across partitions
+    response = await app_client.post('/trademark', json={**sample_trademark_data, 'title': ' TITLEA'})
+    assert response.status == 409
@@ -0,0 +1,33 @@
+from typing import Any
+
+from aiohttp.test_utils import TestClient
+
+
+async def test_search_batch_success(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    await app_client.post('/trademark', json=sample_trademark_data)
+    title = sample_trademark_data['title']
+    items = [
+        {'title': title},
+        {'title': 'titleb', 'exact_match': False},
+        {'title': 'missing'},
+    ]
+
+    response = await app_client.post('/trademark/search', json={'items': items})
+    assert response.status == 200
+
+    response_body = await response.json()
+    assert [item['title'] for item in response_body['result']] == [title, 'titleb', 'missing']
+    assert response_body['result'][0]['result'][0]['title'] == title
+    assert response_body['result'][1]['result'][0]['title'] == title
+    assert response_body['result'][2]['result'] == []
+
+
+async def test_search_batch_invalid(app_client: TestClient) -> None:
+    response = await app_client.post('/trademark/search', json={'items': []})
+    assert response.status == 400
+
+    response = await app_client.post('/trademark/search', json={'items': [{'title': 'abc', 'similarity': 2}]})
+    assert response.status == 400
@@ -0,0 +1,33 @@
+from typing import Any
+
+from aiohttp.test_utils import TestClient
+
+
+async def test_suggest_success(
+        app_client: TestClient,
+        sample_trademark_data: dict[str, Any],
+) -> None:
+    for title in ('Wave Surf', 'WAVE', 'Waves', 'Café Wave'):
+        await app_client.post('/trademark', json={**sample_trademark_data, 'title': title})
+
+    response = await app_client.get('/trademark/suggest', params={'prefix': 'wav', 'limit': 2})
+    assert response.status == 200
+
+    response_body = await response.json()
+    assert [item['title'] for item in response_body['result']] == ['WAVE', 'Wave Surf']
+
+    response = await app_client.get('/trademark/suggest', params={'prefix': 'CAFÉ'})
+    response_body = await response.json()
+    assert [item['title'] for item in response_body['result']] == ['Café Wave']
+
+    response = await app_client.get('/trademark/suggest', params={'prefix': 'xyz'})
+    assert response.status == 200
+    assert (await response.json())['result'] == []
+
+
+async def test_suggest_invalid(app_client: TestClient) -> None:
+    response = await app_client.get('/trademark/suggest', params={'prefix': ''})
+    assert response.status == 400
+
+    response = await app_client.get('/trademark/suggest', params={'prefix': 'wa', 'limit': 1000})
+    assert response.status == 400
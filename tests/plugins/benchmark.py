@@ -0,0 +1,177 @@
+"""Microbenchmarks: the `benchmark` fixture times a function and compares it with a stored baseline.
+
+Tests that use the fixture are skipped unless pytest runs with `--benchmark`. Every benchmark reports
+the best time per call over several rounds. With `--benchmark-save` the times are written to the
+baseline file, otherwise a benchmark that is slower than its baseline by more than
+`--benchmark-tolerance` fails. Baselines depend on the machine, so they are not committed.
+"""
+import gc
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, TypeVar
+
+import pytest
+
+DEFAULT_BASELINE_PATH = Path(__file__).parent.parent / 'benchmarks' / '.baseline.json'
+
+ResultT = TypeVar('ResultT')
+
+_results_key = pytest.StashKey[dict[str, float]]()
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup('benchmark')
+    group.addoption('--benchmark', action='store_true', help='Run benchmarks')
+    group.addoption('--benchmark-save', action='store_true', help='Save benchmark times as the new baseline')
+    group.addoption('--benchmark-baseline', type=Path, default=DEFAULT_BASELINE_PATH, help='Baseline file')
+    group.addoption(
+        '--benchmark-tolerance',
+        type=float,
+        default=0.25,
+        help='Allowed slowdown against the baseline, 0.25 is 25%%',
+    )
+    group.addoption('--benchmark-min-time', type=float, default=0.25, help='Seconds to time every benchmark for')
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.stash[_results_key] = {}
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    if config.getoption('--benchmark'):
+        return
+
+    skip_benchmark = pytest.mark.skip(reason='benchmarks run with --benchmark')
+    for item in items:
+        if 'benchmark' in getattr(item, 'fixturenames', ()):
+            item.add_marker(skip_benchmark)
+
+
+def _load_baseline(path: Path) -> dict[str, float]:
+    if not path.exists():
+        return {}
+
+    return json.loads(path.read_text())['results']  # type: ignore[no-any-return]
+
+
+class Benchmark:
+    rounds = 5
+
+    def __init__(self, name: str, config: pytest.Config) -> None:
+        self._name = name
+        self._results = config.stash[_results_key]
+        self._min_time: float = config.getoption('--benchmark-min-time')
+        self._tolerance: float = config.getoption('--benchmark-tolerance')
+        self._compare = not config.getoption('--benchmark-save')
+        self._baseline = _load_baseline(config.getoption('--benchmark-baseline'))
+
+    def __call__(self, function: Callable[..., ResultT], *args: Any, **kwargs: Any) -> ResultT:
+        """Time a function and return its result."""
+        result = function(*args, **kwargs)
+        number = self._calibrate(lambda loops: self._time_loops(function, loops, args, kwargs))
+        self._record(min(self._time_loops(function, number, args, kwargs) for _ in range(self.rounds)) / number)
+        return result
+
+    async def run_async(self, function: Callable[..., Awaitable[ResultT]], *args: Any, **kwargs: Any) -> ResultT:
+        """Time an async function and return its result, every call is awaited in the running event loop."""
+        result = await function(*args, **kwargs)
+        loops = 1
+        while (elapsed := await self._time_async_loops(function, loops, args, kwargs)) < self._round_time:
+            loops = self._next_loops(loops, elapsed)
+
+        timings = [await self._time_async_loops(function, loops, args, kwargs) for _ in range(self.rounds)]
+        self._record(min(timings) / loops)
+        return result
+
+    @property
+    def _round_time(self) -> float:
+        return self._min_time / self.rounds
+
+    def _calibrate(self, time_loops: Callable[[int], float]) -> int:
+        loops = 1
+        while (elapsed := time_loops(loops)) < self._round_time:
+            loops = self._next_loops(loops, elapsed)
+
+        return loops
+
+    def _next_loops(self, loops: int, elapsed: float) -> int:
+        if elapsed <= 0:
+            return loops * 10
+
+        return max(loops * 2, int(loops * self._round_time / elapsed * 1.2))
+
+    def _time_loops(self, function: Callable[..., Any], loops: int, args: Any, kwargs: Any) -> float:
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started_at = time.perf_counter()
+            for _ in range(loops):
+                function(*args, **kwargs)
+            return time.perf_counter() - started_at
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    async def _time_async_loops(
+            self,
+            function: Callable[..., Awaitable[Any]],
+            loops: int,
+            args: Any,
+            kwargs: Any,
+    ) -> float:
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started_at = time.perf_counter()
+            for _ in range(loops):
+                await function(*args, **kwargs)
+            return time.perf_counter() - started_at
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _record(self, time_per_call: float) -> None:
+        self._results[self._name] = time_per_call
+        baseline = self._baseline.get(self._name)
+        if not self._compare or baseline is None:
+            return
+
+        if time_per_call > baseline * (1 + self._tolerance):
+            pytest.fail(
+                f'{self._name} takes {time_per_call * 1e6:.2f} us per call, '
+                f'{time_per_call / baseline - 1:.0%} slower than the baseline {baseline * 1e6:.2f} us',
+            )
+
+
+@pytest.fixture
+def benchmark(request: pytest.FixtureRequest) -> Benchmark:
+    return Benchmark(name=request.node.nodeid.split('::', 1)[-1], config=request.config)
+
+
+def pytest_terminal_summary(terminalreporter: Any, config: pytest.Config) -> None:
+    results = config.stash[_results_key]
+    if not results:
+        return
+
+    baseline = _load_baseline(config.getoption('--benchmark-baseline'))
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(f'{"name":<60} {"us/call":>12} {"baseline":>12} {"change":>8}')
+    for name, time_per_call in sorted(results.items()):
+        baseline_time = baseline.get(name)
+        baseline_column = f'{baseline_time * 1e6:12.2f}' if baseline_time else f'{"-":>12}'
+        change_column = f'{time_per_call / baseline_time - 1:+8.0%}' if baseline_time else f'{"-":>8}'
+        terminalreporter.write_line(f'{name:<60} {time_per_call * 1e6:12.2f} {baseline_column} {change_column}')
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    config = session.config
+    results = config.stash[_results_key]
+    if not results or not config.getoption('--benchmark-save'):
+        return
+
+    baseline_path: Path = config.getoption('--benchmark-baseline')
+    baseline = {**_load_baseline(baseline_path), **results}
+    machine = {'python': platform.python_version(), 'machine': platform.machine(), 'processor': platform.processor()}
+    baseline_path.write_text(json.dumps({'machine': machine, 'results': baseline}, indent=2, sort_keys=True) + '\n')
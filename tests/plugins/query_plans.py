@@ -0,0 +1,248 @@
+"""Query plan checks: the `query_plan` fixture summarizes `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` output.
+
+Tests that use the fixture are skipped unless pytest runs with `--query-plans`. A summary is the shape
+of the plan (node types with their relations and indexes), the rows of the catalog table the query
+touched and the shared buffers it used. Every check asserts the expectations of the test, and compares
+the summary with the one stored in the baseline file: a different plan shape fails, and so do rows or
+buffers above the stored ones by more than `--query-plans-tolerance`. Stored summaries are only compared
+on a catalog of the size they were saved with. With `--query-plans-save` the summaries are written to
+the baseline file instead, which is committed with the change that legitimately changed them.
+
+The catalog table is partitioned, plans name its partitions and their indexes, which the summary
+replaces with the names of their parents. Partitions scanned the same way show up once, so that the
+shape of a plan does not depend on the number of partitions it reads.
+"""
+import json
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, NamedTuple
+
+import pytest
+
+DEFAULT_BASELINE_PATH = Path(__file__).parent.parent / 'query_plans' / 'plans.json'
+CATALOG_RELATION = 'trademark'
+# Node types whose children are the partitions of one table
+APPEND_NODE_TYPES = frozenset(('Append', 'Merge Append'))
+# Rows and buffers may exceed the stored ones by this much whatever the tolerance, small numbers jitter
+ABSOLUTE_SLACK = 10
+
+_summaries_key = pytest.StashKey[dict[str, 'PlanSummary']]()
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup('query plans')
+    group.addoption('--query-plans', action='store_true', help='Run query plan checks')
+    group.addoption('--query-plans-save', action='store_true', help='Save plan summaries as the new baseline')
+    group.addoption('--query-plans-baseline', type=Path, default=DEFAULT_BASELINE_PATH, help='Baseline file')
+    group.addoption(
+        '--query-plans-tolerance',
+        type=float,
+        default=0.5,
+        help='Allowed growth of rows and buffers against the baseline, 0.5 is 50%%',
+    )
+    group.addoption(
+        '--query-plans-rows',
+        type=int,
+        default=2_000_000,
+        help='Number of trademarks in the synthetic catalog',
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.stash[_summaries_key] = {}
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    if config.getoption('--query-plans'):
+        return
+
+    skip_query_plan = pytest.mark.skip(reason='query plan checks run with --query-plans')
+    for item in items:
+        if 'query_plan' in getattr(item, 'fixturenames', ()):
+            item.add_marker(skip_query_plan)
+
+
+class PlanSummary(NamedTuple):
+    # Plan nodes in depth-first order, indented by depth
+    nodes: list[str]
+    indexes: frozenset[str]
+    # Relations of which sequential scans read rows
+    seq_scans: frozenset[str]
+    # Rows of the catalog table returned, filtered out or written by all plan nodes
+    rows: int
+    shared_buffers: int
+
+    def as_json(self) -> dict[str, Any]:
+        return {'nodes': self.nodes, 'rows': self.rows, 'shared_buffers': self.shared_buffers}
+
+
+def _iter_nodes(node: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _iter_nodes(child)
+
+
+def _describe_node(node: dict[str, Any], parents: Mapping[str, str]) -> str:
+    description: str = node['Node Type']
+    if 'Index Name' in node:
+        description = f'{description} using {parents.get(node["Index Name"], node["Index Name"])}'
+    if 'Relation Name' in node:
+        description = f'{description} on {parents.get(node["Relation Name"], node["Relation Name"])}'
+    return description
+
+
+def _describe_subtree(node: dict[str, Any], parents: Mapping[str, str], depth: int = 0) -> list[str]:
+    lines = [f'{"  " * depth}{_describe_node(node, parents)}']
+    children = [_describe_subtree(child, parents, depth + 1) for child in node.get('Plans', ())]
+    if node['Node Type'] in APPEND_NODE_TYPES:
+        # Partitions scanned the same way are described once
+        children = list({tuple(child): child for child in children}.values())
+
+    for child_lines in children:
+        lines.extend(child_lines)
+    return lines
+
+
+def _count_rows(node: dict[str, Any]) -> int:
+    # Rows of a node are averages over its loops
+    rows: float = node['Actual Rows']
+    rows += node.get('Rows Removed by Filter', 0) + node.get('Rows Removed by Index Recheck', 0)
+    loops: float = node['Actual Loops']
+    return round(rows * loops)
+
+
+def _count_catalog_rows(node: dict[str, Any], parents: Mapping[str, str]) -> int:
+    relation = node.get('Relation Name')
+    if relation is None or parents.get(relation, relation) != CATALOG_RELATION:
+        return 0
+
+    return _count_rows(node)
+
+
+def summarize_plan(
+        explain_output: Iterable[dict[str, Any]],
+        parents: Mapping[str, str] | None = None,
+) -> PlanSummary:
+    """Summarize the JSON output of `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` of one statement.
+
+    `parents` maps names of partitions and of their indexes to the names of the partitioned ones.
+    """
+    parents = parents or {}
+    root = next(iter(explain_output))['Plan']
+    nodes = list(_iter_nodes(root))
+    indexes = {node['Index Name'] for node in nodes if 'Index Name' in node}
+    for node in nodes:
+        indexes.update(node.get('Conflict Arbiter Indexes', ()))
+
+    # An empty partition may be read sequentially, it costs nothing
+    seq_scans = {
+        node['Relation Name']
+        for node in nodes
+        if node['Node Type'] == 'Seq Scan' and _count_rows(node)
+    }
+
+    return PlanSummary(
+        nodes=_describe_subtree(root, parents),
+        indexes=frozenset(parents.get(index, index) for index in indexes),
+        seq_scans=frozenset(parents.get(relation, relation) for relation in seq_scans),
+        rows=sum(_count_catalog_rows(node, parents) for node in nodes),
+        shared_buffers=root['Shared Hit Blocks'] + root['Shared Read Blocks'],
+    )
+
+
+class PlanExpectation(NamedTuple):
+    # The plan must use at least one of the indexes
+    any_index: frozenset[str] = frozenset()
+    seq_scan_allowed: bool = False
+    max_rows: int | None = None
+    max_shared_buffers: int | None = None
+
+
+def _load_baseline(path: Path, catalog_rows: int) -> dict[str, dict[str, Any]]:
+    if not path.exists():
+        return {}
+
+    baseline = json.loads(path.read_text())
+    if baseline['catalog_rows'] != catalog_rows:
+        return {}
+
+    return baseline['plans']  # type: ignore[no-any-return]
+
+
+class QueryPlan:
+    def __init__(self, name: str, config: pytest.Config) -> None:
+        self._name = name
+        self._summaries = config.stash[_summaries_key]
+        self._tolerance: float = config.getoption('--query-plans-tolerance')
+        self._compare = not config.getoption('--query-plans-save')
+        baseline = _load_baseline(config.getoption('--query-plans-baseline'), config.getoption('--query-plans-rows'))
+        self._baseline = baseline.get(name)
+
+    def check(
+            self,
+            explain_output: Iterable[dict[str, Any]],
+            expectation: PlanExpectation,
+            parents: Mapping[str, str] | None = None,
+    ) -> PlanSummary:
+        """Assert the expectation and the baseline of the statement on its EXPLAIN output, return its summary."""
+        summary = summarize_plan(explain_output, parents=parents)
+        self._summaries[self._name] = summary
+        plan = '\n'.join(summary.nodes)
+
+        if expectation.any_index and not expectation.any_index & summary.indexes:
+            pytest.fail(f'{self._name} uses none of {sorted(expectation.any_index)}:\n{plan}')
+        if CATALOG_RELATION in summary.seq_scans and not expectation.seq_scan_allowed:
+            pytest.fail(f'{self._name} reads {CATALOG_RELATION} with a sequential scan:\n{plan}')
+        if expectation.max_rows is not None and summary.rows > expectation.max_rows:
+            pytest.fail(f'{self._name} touches {summary.rows} rows, more than {expectation.max_rows}:\n{plan}')
+        if expectation.max_shared_buffers is not None and summary.shared_buffers > expectation.max_shared_buffers:
+            pytest.fail(
+                f'{self._name} uses {summary.shared_buffers} buffers, '
+                f'more than {expectation.max_shared_buffers}:\n{plan}',
+            )
+
+        if self._compare and self._baseline is not None:
+            self._compare_with_baseline(summary, self._baseline)
+
+        return summary
+
+    def _compare_with_baseline(self, summary: PlanSummary, baseline: dict[str, Any]) -> None:
+        if summary.nodes != baseline['nodes']:
+            stored_plan = '\n'.join(baseline['nodes'])
+            current_plan = '\n'.join(summary.nodes)
+            pytest.fail(f'{self._name} plan changed, stored:\n{stored_plan}\ncurrent:\n{current_plan}')
+
+        for metric in ('rows', 'shared_buffers'):
+            value, stored = getattr(summary, metric), baseline[metric]
+            if value > max(stored * (1 + self._tolerance), stored + ABSOLUTE_SLACK):
+                pytest.fail(f'{self._name} {metric} grew from {stored} to {value}')
+
+
+@pytest.fixture
+def query_plan(request: pytest.FixtureRequest) -> QueryPlan:
+    return QueryPlan(name=request.node.nodeid.split('::', 1)[-1], config=request.config)
+
+
+def pytest_terminal_summary(terminalreporter: Any, config: pytest.Config) -> None:
+    summaries = config.stash[_summaries_key]
+    if not summaries:
+        return
+
+    terminalreporter.section('query plans')
+    terminalreporter.write_line(f'{"name":<50} {"rows":>10} {"buffers":>10}  indexes')
+    for name, summary in sorted(summaries.items()):
+        indexes = ', '.join(sorted(summary.indexes)) or '-'
+        terminalreporter.write_line(f'{name:<50} {summary.rows:>10} {summary.shared_buffers:>10}  {indexes}')
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    config = session.config
+    summaries = config.stash[_summaries_key]
+    if not summaries or not config.getoption('--query-plans-save'):
+        return
+
+    baseline_path: Path = config.getoption('--query-plans-baseline')
+    catalog_rows: int = config.getoption('--query-plans-rows')
+    plans = _load_baseline(baseline_path, catalog_rows=catalog_rows)
+    plans.update({name: summary.as_json() for name, summary in summaries.items()})
+    baseline = {'catalog_rows': catalog_rows, 'plans': plans}
+    baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
@@ -0,0 +1,108 @@
+import csv
+import io
+from typing import Any, AsyncGenerator
+from uuid import NAMESPACE_OID, uuid5
+
+import asyncpg
+import pytest
+from psycopg2 import connect
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from app.models.trademark import Trademark
+from app.repositories.trademark import TrademarkRepository
+from app.tools.load_test import SyntheticCatalog
+
+LOAD_CHUNK_SIZE = 100_000
+
+
+def synthetic_id(catalog: SyntheticCatalog, position: int) -> str:
+    """Id of the trademark at a position, fixed so that repeated loads build the same indexes."""
+    return str(uuid5(NAMESPACE_OID, f'{catalog.seed}:{position}'))
+
+
+def synthetic_trademark(catalog: SyntheticCatalog, position: int) -> Trademark:
+    return Trademark(id=synthetic_id(catalog, position), **catalog.trademark(position))
+
+
+def _write_csv_chunk(catalog: SyntheticCatalog, start: int, stop: int) -> io.StringIO:
+    chunk = io.StringIO()
+    writer = csv.writer(chunk)
+    for position in range(start, stop):
+        trademark: dict[str, Any] = {'id': synthetic_id(catalog, position), **catalog.trademark(position)}
+        writer.writerow(trademark[field] for field in TrademarkRepository.fields)
+
+    chunk.seek(0)
+    return chunk
+
+
+def load_catalog(postgres_dsn: str, catalog: SyntheticCatalog) -> None:
+    """Fill the migrated catalog table with the synthetic catalog and refresh its statistics.
+
+    Secondary indexes are dropped for the load and created again from their own definitions,
+    which is several times faster than maintaining them row by row.
+    """
+    connection = connect(postgres_dsn)
+    connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    cursor = connection.cursor()
+
+    cursor.execute("""
+    SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+    FROM pg_index
+    WHERE indrelid = 'data.trademark'::regclass AND NOT indisprimary
+    """)
+    indexes = cursor.fetchall()
+    for index_name, _ in indexes:
+        cursor.execute(f'DROP INDEX {index_name}')
+
+    columns = ', '.join(TrademarkRepository.fields)
+    cursor.execute('TRUNCATE data.trademark, data.trademark_title')
+    for start in range(0, catalog.size, LOAD_CHUNK_SIZE):
+        chunk = _write_csv_chunk(catalog, start=start, stop=min(start + LOAD_CHUNK_SIZE, catalog.size))
+        cursor.copy_expert(f'COPY data.trademark ({columns}) FROM STDIN WITH (FORMAT csv)', chunk)
+
+    cursor.execute("SET maintenance_work_mem = '1GB'")
+    for _, index_definition in indexes:
+        # Definitions of indexes of a partitioned table are of the table alone, the partitions are indexed too
+        cursor.execute(index_definition.replace(' ON ONLY ', ' ON ', 1))
+
+    # Sets the visibility map too, which index-only scans depend on
+    cursor.execute('VACUUM ANALYZE data.trademark, data.trademark_title')
+    connection.close()
+
+
+def load_partition_parents(postgres_dsn: str) -> dict[str, str]:
+    """Names of partitions of the catalog tables and of their indexes, mapped to the names of their parents."""
+    connection = connect(postgres_dsn)
+    cursor = connection.cursor()
+    cursor.execute("""
+    SELECT child.relname, parent.relname
+    FROM pg_inherits
+    JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+    JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+    WHERE parent.relnamespace = 'data'::regnamespace
+    """)
+    parents = dict(cursor.fetchall())
+    connection.close()
+    return parents
+
+
+@pytest.fixture(scope='session')
+def plan_catalog(clean_db: None, postgres_dsn: str, request: pytest.FixtureRequest) -> SyntheticCatalog:
+    """Migrated database with a synthetic catalog of `--query-plans-rows` trademarks, loaded once per session."""
+    catalog = SyntheticCatalog(size=request.config.getoption('--query-plans-rows'))
+    load_catalog(postgres_dsn, catalog=catalog)
+    return catalog
+
+
+@pytest.fixture(scope='session')
+def partition_parents(plan_catalog: SyntheticCatalog, postgres_dsn: str) -> dict[str, str]:
+    return load_partition_parents(postgres_dsn)
+
+
+@pytest.fixture
+async def plan_connection(postgres_dsn: str) -> AsyncGenerator[asyncpg.Connection, None]:
+    connection = await asyncpg.connect(postgres_dsn)
+    try:
+        yield connection
+    finally:
+        await connection.close()
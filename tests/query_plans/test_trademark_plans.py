@@ -0,0 +1,232 @@
+"""Plans of every `TrademarkRepository` statement on a catalog of production size.
+
+Run with `pytest tests/query_plans --query-plans`, the catalog is generated and loaded first, which
+takes a few minutes. Limits are set for the default catalog of 2M trademarks. Searches skip expired
+trademarks, as they do by default.
+"""
+import json
+from functools import partial
+from typing import Any, Awaitable, Callable, NamedTuple
+
+import asyncpg
+import pytest
+
+from app.models.trademark import normalize_title, SimilarityMode
+from app.repositories.trademark import (
+    get_expiry_bound,
+    PREFIX_UPPER_BOUND_CHAR,
+    SIMILARITY_OPERATORS,
+    TrademarkRepository,
+)
+from app.tools.load_test import SyntheticCatalog
+from tests.plugins.query_plans import PlanExpectation, QueryPlan
+from tests.query_plans.conftest import synthetic_id, synthetic_trademark
+
+EXACT_INDEX = 'trademark_title_normalized_idx'
+PREFIX_INDEX = 'trademark_title_normalized_prefix_idx'
+PRIMARY_KEY_INDEX = 'trademark_pkey'
+TRIGRAM_INDEXES = frozenset(('trademark_trgm_idx', 'trademark_trgm_gist_idx'))
+
+# Statements that do not read the catalog table
+NOT_PLANNED = frozenset(('create_staging', 'set_similarity_threshold'))
+
+SAMPLE_SIZE = 100
+SIMILAR_LIMIT = 51
+SIMILAR_THRESHOLD = 0.7
+
+
+def _sample_positions(catalog: SyntheticCatalog, count: int = SAMPLE_SIZE) -> range:
+    return range(0, catalog.size, max(catalog.size // count, 1))
+
+
+def _misspell(title: str) -> str:
+    middle = len(title) // 2
+    return f'{title[:middle]}E{title[middle + 1:]}'
+
+
+def _new_trademark_args(catalog: SyntheticCatalog, position: int) -> list[Any]:
+    """Arguments of `create` for a trademark past the end of the catalog, so its title is not registered."""
+    trademark = synthetic_trademark(catalog, catalog.size + position)
+    return [getattr(trademark, field) for field in TrademarkRepository.fields]
+
+
+def _new_trademark_columns(catalog: SyntheticCatalog) -> tuple[Any, ...]:
+    """Arguments of `create_batch`, a list of values per field."""
+    records = [_new_trademark_args(catalog, position) for position in range(SAMPLE_SIZE)]
+    return tuple(list(column) for column in zip(*records))
+
+
+async def _fill_staging(connection: asyncpg.Connection, catalog: SyntheticCatalog) -> None:
+    await connection.execute(TrademarkRepository.statements['create_staging'].sql)
+    await connection.copy_records_to_table(
+        TrademarkRepository.staging_table_name,
+        records=[_new_trademark_args(catalog, position) for position in range(SAMPLE_SIZE)],
+        columns=TrademarkRepository.fields,
+    )
+
+
+class PlanCase(NamedTuple):
+    statement_name: str
+    make_args: Callable[[SyntheticCatalog], tuple[Any, ...]]
+    expectation: PlanExpectation
+    # Settings of the transaction, as the repository sets them before the statement
+    settings: tuple[tuple[str, str], ...] = ()
+    prepare: Callable[[asyncpg.Connection, SyntheticCatalog], Awaitable[None]] | None = None
+
+
+def _prefix_args(catalog: SyntheticCatalog) -> tuple[Any, ...]:
+    prefix = normalize_title(catalog.title(catalog.size // 3))[:3]
+    return prefix, f'{prefix}{PREFIX_UPPER_BOUND_CHAR}', 10
+
+
+def _coined_word(title: str) -> str:
+    """The last word of a synthetic title, unique in the catalog."""
+    return title.split()[-1].lower()
+
+
+def _similar_args(catalog: SyntheticCatalog, make_query: Callable[[str], str]) -> tuple[Any, ...]:
+    query = make_query(catalog.title(catalog.size // 2))
+    return query, SIMILAR_THRESHOLD, -1.0, '', SIMILAR_LIMIT, get_expiry_bound(include_expired=False)
+
+
+_SIMILAR_QUERIES = {
+    SimilarityMode.similarity: _misspell,
+    SimilarityMode.word_similarity: _coined_word,
+    SimilarityMode.strict_word_similarity: _coined_word,
+}
+
+
+def _similar_cases() -> list[PlanCase]:
+    return [
+        PlanCase(
+            statement_name=operators.statement_name,
+            make_args=partial(_similar_args, make_query=_SIMILAR_QUERIES[mode]),
+            expectation=PlanExpectation(any_index=TRIGRAM_INDEXES, max_rows=1000, max_shared_buffers=20_000),
+            settings=((operators.threshold_setting, str(SIMILAR_THRESHOLD)),),
+        )
+        for mode, operators in SIMILARITY_OPERATORS.items()
+    ]
+
+
+PLAN_CASES = (
+    PlanCase(
+        statement_name='find_exact',
+        make_args=lambda catalog: (
+            normalize_title(catalog.title(catalog.size // 2)),
+            get_expiry_bound(include_expired=False),
+        ),
+        expectation=PlanExpectation(any_index=frozenset((EXACT_INDEX,)), max_rows=1, max_shared_buffers=10),
+    ),
+    PlanCase(
+        statement_name='find_exact_many',
+        # Titles of the catalog and as many titles past its end, which are not registered
+        make_args=lambda catalog: (
+            [
+                normalize_title(catalog.title(position + offset))
+                for position in _sample_positions(catalog)
+                for offset in (0, catalog.size)
+            ],
+            get_expiry_bound(include_expired=False),
+        ),
+        expectation=PlanExpectation(
+            any_index=frozenset((EXACT_INDEX,)),
+            max_rows=SAMPLE_SIZE,
+            max_shared_buffers=2 * SAMPLE_SIZE * 5,
+        ),
+    ),
+    PlanCase(
+        statement_name='find_by_prefix',
+        make_args=_prefix_args,
+        expectation=PlanExpectation(any_index=frozenset((PREFIX_INDEX,)), max_rows=10, max_shared_buffers=50),
+    ),
+    PlanCase(
+        statement_name='find_by_ids',
+        make_args=lambda catalog: (
+            [synthetic_id(catalog, position) for position in _sample_positions(catalog)],
+            get_expiry_bound(include_expired=False),
+        ),
+        expectation=PlanExpectation(
+            any_index=frozenset((PRIMARY_KEY_INDEX,)),
+            max_rows=SAMPLE_SIZE,
+            max_shared_buffers=SAMPLE_SIZE * 6,
+        ),
+    ),
+    PlanCase(
+        statement_name='find_titles',
+        make_args=lambda catalog: (get_expiry_bound(include_expired=False),),
+        # Reads the whole catalog to build the in-process indexes
+        expectation=PlanExpectation(seq_scan_allowed=True),
+    ),
+    *_similar_cases(),
+    PlanCase(
+        statement_name='find_similar_many',
+        make_args=lambda catalog: (
+            [_misspell(catalog.title(position)) for position in _sample_positions(catalog, count=10)],
+            [SIMILAR_THRESHOLD] * 10,
+            [SIMILAR_LIMIT] * 10,
+            get_expiry_bound(include_expired=False),
+        ),
+        expectation=PlanExpectation(any_index=TRIGRAM_INDEXES, max_rows=10_000, max_shared_buffers=200_000),
+        settings=(('pg_trgm.similarity_threshold', str(SIMILAR_THRESHOLD)),),
+    ),
+    PlanCase(
+        statement_name='create',
+        make_args=lambda catalog: tuple(_new_trademark_args(catalog, SAMPLE_SIZE)),
+        # Titles are claimed by a trigger, the only arbiter of the partitioned table is its primary key
+        expectation=PlanExpectation(any_index=frozenset((PRIMARY_KEY_INDEX,)), max_rows=1, max_shared_buffers=200),
+    ),
+    PlanCase(
+        statement_name='create_batch',
+        make_args=_new_trademark_columns,
+        expectation=PlanExpectation(
+            any_index=frozenset((PRIMARY_KEY_INDEX,)),
+            max_rows=SAMPLE_SIZE,
+            max_shared_buffers=SAMPLE_SIZE * 50,
+        ),
+    ),
+    PlanCase(
+        statement_name='merge_staging',
+        make_args=lambda catalog: (),
+        expectation=PlanExpectation(
+            any_index=frozenset((PRIMARY_KEY_INDEX,)),
+            max_rows=SAMPLE_SIZE,
+            max_shared_buffers=SAMPLE_SIZE * 50,
+        ),
+        prepare=_fill_staging,
+    ),
+)
+
+
+def test_every_statement_has_a_plan_case() -> None:
+    planned = {case.statement_name for case in PLAN_CASES}
+    assert planned | NOT_PLANNED == set(TrademarkRepository.statements)
+
+
+@pytest.mark.parametrize('case', PLAN_CASES, ids=lambda case: case.statement_name)
+async def test_statement_plan(
+        case: PlanCase,
+        plan_catalog: SyntheticCatalog,
+        plan_connection: asyncpg.Connection,
+        partition_parents: dict[str, str],
+        query_plan: QueryPlan,
+) -> None:
+    statement = TrademarkRepository.statements[case.statement_name]
+    set_setting = TrademarkRepository.statements['set_similarity_threshold']
+
+    # Statements that write are rolled back, so every case sees the same catalog
+    transaction = plan_connection.transaction()
+    await transaction.start()
+    try:
+        for setting, setting_value in case.settings:
+            await plan_connection.execute(set_setting.sql, setting, setting_value)
+        if case.prepare is not None:
+            await case.prepare(plan_connection, plan_catalog)
+
+        explain_output = await plan_connection.fetchval(
+            f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement.sql}',
+            *case.make_args(plan_catalog),
+        )
+    finally:
+        await transaction.rollback()
+
+    query_plan.check(json.loads(explain_output), case.expectation, parents=partition_parents)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.batcher import Batcher
+
+
+async def test_concurrent_items_share_call() -> None:
+    batches: list[list[int]] = []
+
+    async def _handle_batch(items: list[int]) -> list[int]:
+        batches.append(items)
+        return [item * 10 for item in items]
+
+    batcher: Batcher[int, int] = Batcher(_handle_batch, max_size=10, max_delay=0.01)
+
+    results = await asyncio.gather(*(batcher.submit(item) for item in range(3)))
+
+    assert results == [0, 10, 20]
+    assert batches == [[0, 1, 2]]
+
+
+async def test_full_batch_is_handled_without_delay() -> None:
+    batches: list[list[int]] = []
+
+    async def _handle_batch(items: list[int]) -> list[int]:
+        batches.append(items)
+        return items
+
+    batcher: Batcher[int, int] = Batcher(_handle_batch, max_size=2, max_delay=10)
+
+    results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(item) for item in range(4))), timeout=1)
+
+    assert results == [0, 1, 2, 3]
+    assert batches == [[0, 1], [2, 3]]
+
+
+async def test_error_is_shared_by_batch() -> None:
+    async def _handle_batch(items: list[int]) -> list[int]:
+        raise RuntimeError
+
+    batcher: Batcher[int, int] = Batcher(_handle_batch, max_size=10, max_delay=0.01)
+
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+
+
+async def test_cancelled_call_cancels_submitters() -> None:
+    async def _handle_batch(items: list[int]) -> list[int]:
+        raise asyncio.CancelledError
+
+    batcher: Batcher[int, int] = Batcher(_handle_batch, max_size=10, max_delay=0.01)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True),
+        timeout=1,
+    )
+
+    assert [type(result) for result in results] == [asyncio.CancelledError, asyncio.CancelledError]
+
+
+async def test_cancelled_submitter_does_not_break_batch() -> None:
+    async def _handle_batch(items: list[int]) -> list[int]:
+        return items
+
+    batcher: Batcher[int, int] = Batcher(_handle_batch, max_size=10, max_delay=0.01)
+
+    cancelled = asyncio.create_task(batcher.submit(1))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await batcher.submit(2) == 2
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
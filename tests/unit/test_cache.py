@@ -0,0 +1,57 @@
+from app.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_eviction() -> None:
+    cache: LRUCache[str, int] = LRUCache(max_size=2, ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a').found
+
+    cache.set('c', 3)
+
+    assert not cache.get('b').found
+    assert cache.get('a').value == 1
+    assert cache.get('c').value == 3
+    assert cache.stats.evictions == 1
+
+
+def test_ttl_expiration() -> None:
+    clock = FakeClock()
+    cache: LRUCache[str, int | None] = LRUCache(max_size=2, ttl=10, clock=clock)
+    cache.set('a', None)
+    assert cache.get('a').found
+
+    clock.now = 10
+    assert not cache.get('a').found
+    assert cache.stats.expirations == 1
+    assert cache.stats.hit_ratio == 0.5
+
+
+def test_invalidation_drops_stale_value() -> None:
+    cache: LRUCache[str, int | None] = LRUCache(max_size=2, ttl=10)
+    version = cache.version
+
+    cache.invalidate('a')
+    cache.set('a', None, version=version)
+
+    assert not cache.get('a').found
+
+
+def test_clear_drops_all_values() -> None:
+    cache: LRUCache[str, int | None] = LRUCache(max_size=2, ttl=10)
+    cache.set('a', 1)
+    version = cache.version
+
+    cache.clear()
+    cache.set('b', 2, version=version)
+
+    assert not cache.get('a').found
+    assert not cache.get('b').found
@@ -0,0 +1,48 @@
+from contextlib import asynccontextmanager
+from logging import Logger
+from typing import Any, AsyncIterator
+from unittest.mock import AsyncMock, MagicMock
+
+from app.repositories.database_session import ReplicaHealth, ReplicaPool
+from app.services.check_replicas import ReplicaHealthChecker
+
+
+def _make_replica_pool(lag: float | None, failing: bool = False) -> ReplicaPool:
+    connection = MagicMock(spec=['fetch'])
+    if failing:
+        connection.fetch = AsyncMock(side_effect=ConnectionError)
+    else:
+        connection.fetch = AsyncMock(return_value=[{'lag': lag}])
+
+    @asynccontextmanager
+    async def _acquire(**kwargs: Any) -> AsyncIterator[MagicMock]:
+        yield connection
+
+    connection_pool = MagicMock()
+    connection_pool.acquire = _acquire
+    return ReplicaPool(health=ReplicaHealth(name='replica'), connection_pool=connection_pool)
+
+
+async def test_check_replicas(logger: Logger) -> None:
+    caught_up, lagging = _make_replica_pool(lag=0.5), _make_replica_pool(lag=30)
+    # Not streaming, the lag is unknown
+    disconnected = _make_replica_pool(lag=None)
+    failing = _make_replica_pool(lag=None, failing=True)
+    disconnected.health.available = True
+    failing.health.available = True
+    checker = ReplicaHealthChecker(
+        logger=logger,
+        replica_pools=[caught_up, lagging, disconnected, failing],
+        max_lag=10,
+        check_interval=5,
+    )
+
+    await checker.check()
+
+    assert caught_up.health.available
+    assert caught_up.health.lag == 0.5
+    assert not lagging.health.available
+    assert lagging.health.lag == 30
+    assert not disconnected.health.available
+    assert disconnected.health.lag is None
+    assert not failing.health.available
@@ -0,0 +1,130 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.repositories.base_repository import BaseRepository
+from app.repositories.database_session import (
+    DatabaseSession,
+    DatabaseSessionFactory,
+    ReplicaHealth,
+    ReplicaPool,
+    Statement,
+)
+from app.repositories.trademark import TrademarkRepository
+
+statement = Statement(name='data.trademark.find_exact', sql='SELECT 1')
+
+
+def test_statements_catalogue() -> None:
+    find_exact = TrademarkRepository.statements['find_exact']
+    assert find_exact.name == 'data.trademark.find_exact'
+    assert find_exact in BaseRepository.collect_statements()
+    assert not TrademarkRepository.statements['merge_staging'].prepare
+
+
+async def test_fetch_prepared_statement() -> None:
+    prepared_statement = AsyncMock()
+    prepared_statement.fetch = AsyncMock(return_value=[])
+    connection = MagicMock(prepared_statements={statement.name: prepared_statement})
+
+    await DatabaseSession(connection=connection).fetch(statement, 'abc')
+
+    prepared_statement.fetch.assert_awaited_once_with('abc')
+    connection.fetch.assert_not_called()
+
+
+async def test_fetch_text_statement() -> None:
+    connection = MagicMock(spec=['fetch'])
+    connection.fetch = AsyncMock(return_value=[])
+
+    await DatabaseSession(connection=connection).fetch(statement, 'abc')
+
+    connection.fetch.assert_awaited_once_with(statement.sql, 'abc')
+
+
+async def test_session_factory_stats() -> None:
+    connection_pool = MagicMock()
+    connection_pool.acquire = AsyncMock(return_value=MagicMock())
+    connection_pool.release = AsyncMock()
+    connection_pool.get_max_size.return_value = 4
+    db_session_factory = DatabaseSessionFactory(connection_pool=connection_pool, acquire_timeout=1, name='write')
+
+    async with db_session_factory.create_session():
+        assert db_session_factory.stats.in_use == 1
+        assert db_session_factory.stats.saturation == 0.25
+
+    stats = db_session_factory.stats
+    assert stats.name == 'write'
+    assert stats.in_use == 0
+    assert stats.acquired == 1
+    connection_pool.acquire.assert_awaited_once_with(timeout=1)
+    connection_pool.release.assert_awaited_once()
+
+
+async def test_session_factory_acquire_timeout() -> None:
+    connection_pool = MagicMock()
+    connection_pool.acquire = AsyncMock(side_effect=asyncio.TimeoutError)
+    db_session_factory = DatabaseSessionFactory(connection_pool=connection_pool, acquire_timeout=1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        async with db_session_factory.create_session():
+            pass  # noqa: WPS420
+
+    stats = db_session_factory.stats
+    assert stats.acquire_timeouts == 1
+    assert stats.acquired == 0
+    assert stats.waiting == 0
+
+
+def _make_connection_pool(busy: int = 0) -> MagicMock:
+    connection_pool = MagicMock()
+    connection_pool.acquire = AsyncMock(return_value=MagicMock())
+    connection_pool.release = AsyncMock()
+    connection_pool.get_size.return_value = busy
+    connection_pool.get_idle_size.return_value = 0
+    return connection_pool
+
+
+async def test_session_factory_routes_to_replicas() -> None:
+    primary_pool = _make_connection_pool()
+    replica_pools = [
+        ReplicaPool(health=ReplicaHealth(name=f'replica-{position}'), connection_pool=_make_connection_pool())
+        for position in range(3)
+    ]
+    db_session_factory = DatabaseSessionFactory(connection_pool=primary_pool, replica_pools=replica_pools)
+
+    async with db_session_factory.create_session():
+        pass  # noqa: WPS420
+    primary_pool.acquire.assert_awaited_once()
+
+    for replica_pool in replica_pools:
+        replica_pool.health.available = True
+    replica_pools[2].health.available = False
+    replica_pools[0].connection_pool.get_size.return_value = 1
+
+    for _ in range(4):
+        async with db_session_factory.create_session():
+            pass  # noqa: WPS420
+
+    assert replica_pools[0].connection_pool.acquire.await_count == 0
+    assert replica_pools[1].connection_pool.acquire.await_count == 4
+    assert replica_pools[2].connection_pool.acquire.await_count == 0
+    assert primary_pool.acquire.await_count == 1
+    assert db_session_factory.stats.available_replicas == 2
+
+
+async def test_session_factory_round_robin() -> None:
+    replica_pools = [
+        ReplicaPool(health=ReplicaHealth(name=f'replica-{position}'), connection_pool=_make_connection_pool())
+        for position in range(2)
+    ]
+    for replica_pool in replica_pools:
+        replica_pool.health.available = True
+    db_session_factory = DatabaseSessionFactory(connection_pool=_make_connection_pool(), replica_pools=replica_pools)
+
+    for _ in range(4):
+        async with db_session_factory.create_session():
+            pass  # noqa: WPS420
+
+    assert [replica_pool.connection_pool.acquire.await_count for replica_pool in replica_pools] == [2, 2]
@@ -0,0 +1,93 @@
+from datetime import date
+from itertools import islice
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.tools.load_test import (
+    build_report,
+    LoadTestRunner,
+    parse_mix,
+    percentile,
+    RequestKind,
+    SyntheticCatalog,
+    TrafficPlan,
+)
+
+
+def test_catalog_is_reproducible_and_unique() -> None:
+    catalog = SyntheticCatalog(size=2000, seed=7)
+    titles = [trademark['title'] for trademark in catalog]
+
+    assert titles == [trademark['title'] for trademark in SyntheticCatalog(size=2000, seed=7)]
+    assert titles[42] == catalog.title(42)
+    assert len(set(titles)) == len(titles)
+    assert titles != [trademark['title'] for trademark in SyntheticCatalog(size=2000, seed=8)]
+
+
+def test_catalog_mostly_active_on_reference_date() -> None:
+    reference_date = date(2040, 6, 1)
+    catalog = SyntheticCatalog(size=2000, reference_date=reference_date)
+    trademarks = list(catalog)
+
+    assert trademarks == list(SyntheticCatalog(size=2000, reference_date=reference_date))
+    active = [
+        trademark for trademark in trademarks
+        if date.fromisoformat(trademark['expiry_date']) >= reference_date
+    ]
+    assert len(trademarks) > len(active) > 0.9 * len(trademarks)
+    assert all(date.fromisoformat(trademark['registration_date']) <= reference_date for trademark in trademarks)
+
+
+def test_catalog_titles_share_prefixes() -> None:
+    catalog = SyntheticCatalog(size=2000)
+    first_words = [title.split()[0] for title in map(catalog.title, range(catalog.size)) if ' ' in title]
+
+    most_common_count = max(first_words.count(word) for word in set(first_words))
+    assert most_common_count > len(first_words) // 20
+
+
+def test_traffic_plan_mix() -> None:
+    catalog = SyntheticCatalog(size=100)
+    plan = TrafficPlan(catalog, mix=parse_mix('exact=1,register=1'), run_token='R1', exact_miss_ratio=0)
+    requests = list(islice(plan, 200))
+
+    assert requests == list(islice(plan, 200))
+    assert {request.kind for request in requests} == {RequestKind.exact, RequestKind.register}
+    catalog_titles = {catalog.title(position) for position in range(catalog.size)}
+    for request in requests:
+        if request.kind is RequestKind.exact:
+            assert request.params is not None and request.params['title'] in catalog_titles
+        else:
+            assert request.body is not None and request.body['title'] not in catalog_titles
+
+
+def test_percentile() -> None:
+    latencies = [float(value) for value in range(1, 101)]
+
+    assert percentile(latencies, 50) == 50
+    assert percentile(latencies, 99) == 99
+    assert percentile([], 99) == 0
+
+
+async def test_runner_reports_latencies() -> None:
+    async def handler(request: web.Request) -> web.Response:
+        if request.method == 'POST':
+            return web.Response(status=500)
+        return web.Response(status=404)
+
+    application = web.Application()
+    application.router.add_route('*', '/trademark', handler)
+    catalog = SyntheticCatalog(size=100)
+    plan = TrafficPlan(catalog, mix=parse_mix('exact=3,fuzzy=1,register=1'), run_token='R1')
+
+    async with TestServer(application) as server, aiohttp.ClientSession() as session:
+        runner = LoadTestRunner(session, base_url=str(server.make_url('/')), rps=200, max_in_flight=8)
+        result = await runner.run(plan, duration=0.2, warmup=0.05)
+
+    report = build_report(result, settings={})
+    assert report['overall']['requests'] == 40
+    assert report['by_kind']['exact']['errors'] == 0
+    assert report['by_kind']['register']['errors'] == report['by_kind']['register']['requests']
+    assert report['overall']['p50'] <= report['overall']['p99']
@@ -0,0 +1,115 @@
+import json
+from logging import Logger
+from pathlib import Path
+from typing import Any, Sequence
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.trademark import Trademark
+from app.services.register_trademark_batch import RegisterTrademarkBatchService
+from app.tools.load import Checkpoint, LoadStats, read_source, SourceLoader
+
+
+def _make_row(title: str) -> dict[str, Any]:
+    return {
+        'title': title,
+        'description': 'desc',
+        'application_number': 'appnum',
+        'application_date': '2020-01-01',
+        'registration_date': '2020-01-01',
+        'expiry_date': '2030-01-01',
+    }
+
+
+@pytest.fixture
+def jsonl_source(tmp_path: Path) -> Path:
+    source = tmp_path / 'trademarks.jsonl'
+    lines = [json.dumps(_make_row(f'title{index}')) for index in range(5)]
+    lines.insert(2, '{"title": ""}')
+    source.write_text('\n'.join(lines) + '\n')
+    return source
+
+
+@pytest.fixture
+def csv_source(tmp_path: Path) -> Path:
+    source = tmp_path / 'trademarks.csv'
+    header = ','.join(_make_row('').keys())
+    rows = [','.join(_make_row(f'title{index}').values()) for index in range(3)]
+    source.write_text('\n'.join([header, *rows]) + '\n')
+    return source
+
+
+@pytest.fixture
+def trademark_repository() -> AsyncMock:
+    async def _create_all(trademarks: Sequence[Trademark], session: object) -> set[str]:
+        return {trademark.id for trademark in trademarks}
+
+    return AsyncMock(create_many=AsyncMock(side_effect=_create_all))
+
+
+@pytest.fixture
+def register_tm_batch_service(logger: Logger, trademark_repository: AsyncMock) -> RegisterTrademarkBatchService:
+    return RegisterTrademarkBatchService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+    )
+
+
+def test_read_source_resumes_from_offset(jsonl_source: Path) -> None:
+    rows = list(read_source(jsonl_source))
+    assert len(rows) == 6
+
+    resumed_rows = list(read_source(jsonl_source, offset=rows[2].end_offset))
+    assert [row.data for row in resumed_rows] == [row.data for row in rows[3:]]
+
+
+def test_read_csv_source_resumes_from_offset(csv_source: Path) -> None:
+    rows = list(read_source(csv_source))
+    assert [row.data['title'] for row in rows] == ['title0', 'title1', 'title2']
+
+    resumed_rows = list(read_source(csv_source, offset=rows[0].end_offset))
+    assert [row.data['title'] for row in resumed_rows] == ['title1', 'title2']
+
+
+def test_read_source_badly_encoded_row_is_invalid(jsonl_source: Path, csv_source: Path) -> None:
+    for source in (jsonl_source, csv_source):
+        source.write_bytes(source.read_bytes().replace(b'title1', b'title\xff'))
+
+        rows = list(read_source(source))
+        assert [index for index, row in enumerate(rows) if row.data is None] == [1]
+        assert rows[-1].end_offset == source.stat().st_size
+
+
+def test_checkpoint_persisted(tmp_path: Path, jsonl_source: Path) -> None:
+    checkpoint_path = tmp_path / 'checkpoint.json'
+    Checkpoint(checkpoint_path).set(jsonl_source, 42)
+
+    assert Checkpoint(checkpoint_path).get(jsonl_source) == 42
+
+
+async def test_source_loader(
+        tmp_path: Path,
+        jsonl_source: Path,
+        trademark_repository: AsyncMock,
+        register_tm_batch_service: RegisterTrademarkBatchService,
+) -> None:
+    checkpoint = Checkpoint(tmp_path / 'checkpoint.json')
+    stats = LoadStats()
+    source_loader = SourceLoader(
+        service=register_tm_batch_service,
+        checkpoint=checkpoint,
+        stats=stats,
+        batch_size=2,
+        workers=2,
+    )
+
+    await source_loader.load(jsonl_source)
+
+    assert (stats.created, stats.invalid) == (5, 1)
+    assert trademark_repository.create_many.await_count == 3
+    assert checkpoint.get(jsonl_source) == jsonl_source.stat().st_size
+
+    await source_loader.load(jsonl_source)
+    assert trademark_repository.create_many.await_count == 3
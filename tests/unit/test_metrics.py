@@ -0,0 +1,63 @@
+import pytest
+
+from app.metrics import MetricsRegistry, timed
+
+
+def test_render_counter_and_gauge() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter('requests_total', 'Requests', label_names=('route',))
+    gauge = registry.gauge('connections', 'Connections')
+
+    counter.labels('/a"b\\').inc()
+    counter.labels('/a"b\\').inc(2)
+    gauge.labels().set(0.5)
+
+    assert registry.render() == (
+        '# HELP requests_total Requests\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{route="/a\\"b\\\\"} 3\n'
+        '# HELP connections Connections\n'
+        '# TYPE connections gauge\n'
+        'connections 0.5\n'
+    )
+
+
+def test_render_histogram() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram('duration_seconds', 'Duration', label_names=('method',), buckets=(0.1, 1))
+
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.labels('find').observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'duration_seconds_bucket{method="find",le="0.1"} 2',
+        'duration_seconds_bucket{method="find",le="1"} 3',
+        'duration_seconds_bucket{method="find",le="+Inf"} 4',
+        'duration_seconds_sum{method="find"} 3.65',
+        'duration_seconds_count{method="find"} 4',
+    ]
+
+
+def test_labels_mismatch() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter('requests_total', 'Requests', label_names=('route',))
+
+    with pytest.raises(ValueError):
+        counter.labels('/a', '200')
+
+    with pytest.raises(ValueError):
+        registry.counter('requests_total', 'Requests')
+
+
+async def test_timed() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram('duration_seconds', 'Duration')
+
+    @timed(histogram.labels())
+    async def _fail() -> None:
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        await _fail()
+
+    assert histogram.labels().count == 1
@@ -0,0 +1,36 @@
+from app.repositories.prefix_index import PrefixIndex
+
+
+async def _build_index(rows: list[tuple[str, str]]) -> PrefixIndex:
+    async def _load_rows() -> list[tuple[str, str]]:
+        return rows
+
+    prefix_index = PrefixIndex()
+    await prefix_index.rebuild(_load_rows)
+    return prefix_index
+
+
+async def test_find() -> None:
+    prefix_index = await _build_index([('1', 'Wave Surf'), ('2', 'WAVE'), ('3', 'Café Wave'), ('4', 'Waves')])
+
+    assert [match.title for match in prefix_index.find('wave', limit=10)] == ['WAVE', 'Wave Surf', 'Waves']
+    assert [match.title for match in prefix_index.find('wave ', limit=10)] == ['Wave Surf']
+    assert [match.title for match in prefix_index.find('wave', limit=2)] == ['WAVE', 'Wave Surf']
+    assert [match.id for match in prefix_index.find('cafe', limit=10)] == ['3']
+    assert prefix_index.find('x', limit=10) == []
+
+
+async def test_find_in_delta() -> None:
+    prefix_index = await _build_index([('1', 'Wave Surf')])
+    prefix_index.add('2', 'Wave')
+    prefix_index.add('3', 'Waves')
+
+    assert [match.id for match in prefix_index.find('wave', limit=2)] == ['2', '1']
+
+    await prefix_index.rebuild(_rows_with_delta)
+    assert [match.id for match in prefix_index.find('wave', limit=10)] == ['2', '1', '3']
+    assert len(prefix_index) == 3
+
+
+async def _rows_with_delta() -> list[tuple[str, str]]:
+    return [('1', 'Wave Surf'), ('2', 'Wave'), ('3', 'Waves')]
@@ -0,0 +1,93 @@
+from datetime import date
+from logging import Logger
+from typing import Sequence
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.trademark import Trademark
+from app.repositories.trademark import TrademarkRepository
+from app.services.register_trademark import RegisterTrademarkServiceRequest
+from app.services.register_trademark_batch import RegisterTrademarkBatchService, RegisterTrademarkBatchServiceRequest
+
+
+def _make_request(title: str) -> RegisterTrademarkServiceRequest:
+    return RegisterTrademarkServiceRequest(
+        title=title,
+        description='desc',
+        application_number='appnum',
+        application_date=date.today(),
+        registration_date=date.today(),
+        expiry_date=date.today(),
+    )
+
+
+async def _create_all(trademarks: Sequence[Trademark], session: object) -> set[str]:
+    return {trademark.id for trademark in trademarks}
+
+
+@pytest.fixture
+def register_tm_batch_service(
+        logger: Logger,
+        trademark_repository: TrademarkRepository,
+) -> RegisterTrademarkBatchService:
+    return RegisterTrademarkBatchService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+    )
+
+
+async def test_register_batch_success(
+        trademark_repository: AsyncMock,
+        register_tm_batch_service: RegisterTrademarkBatchService,
+) -> None:
+    trademark_repository.create_many = AsyncMock(side_effect=_create_all)
+
+    request = RegisterTrademarkBatchServiceRequest(items=[_make_request('abc'), _make_request('abd')])
+    response = await register_tm_batch_service.invoke(request)
+
+    assert response.is_success()
+    assert [item.is_success() for item in response.result] == [True, True]
+
+
+async def test_register_batch_duplicates(
+        trademark_repository: AsyncMock,
+        register_tm_batch_service: RegisterTrademarkBatchService,
+) -> None:
+    trademark_repository.create_many = AsyncMock(side_effect=_create_all)
+
+    items = [_make_request('abc'), _make_request('abc'), _make_request(' ABC ')]
+    request = RegisterTrademarkBatchServiceRequest(items=items)
+    response = await register_tm_batch_service.invoke(request)
+
+    assert response.is_success()
+    assert response.result[0].is_success()
+    assert response.result[1].is_already_registered()
+    assert response.result[2].is_already_registered()
+    assert len(trademark_repository.create_many.call_args.kwargs['trademarks']) == 1
+
+
+async def test_register_batch_already_registered(
+        trademark_repository: AsyncMock,
+        register_tm_batch_service: RegisterTrademarkBatchService,
+) -> None:
+    trademark_repository.create_many = AsyncMock(return_value=set())
+
+    request = RegisterTrademarkBatchServiceRequest(items=[_make_request('abc')])
+    response = await register_tm_batch_service.invoke(request)
+
+    assert response.is_success()
+    assert response.result[0].is_already_registered()
+
+
+async def test_register_batch_error(
+        trademark_repository: AsyncMock,
+        register_tm_batch_service: RegisterTrademarkBatchService,
+) -> None:
+    trademark_repository.create_many = AsyncMock(side_effect=Exception)
+
+    request = RegisterTrademarkBatchServiceRequest(items=[_make_request('abc')])
+    response = await register_tm_batch_service.invoke(request)
+
+    assert response.is_error()
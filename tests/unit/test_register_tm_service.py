@@ -1,12 +1,19 @@
+import asyncio
 from datetime import date
 from logging import Logger
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+from app.cache import LRUCache
 from app.models.trademark import Trademark
 from app.repositories.trademark import TrademarkRepository
-from app.services.register_trademark import RegisterTrademarkService, RegisterTrademarkServiceRequest
+from app.services.register_trademark import (
+    RegisterTrademarkService,
+    RegisterTrademarkServiceRequest,
+    RegisterTrademarkServiceResponseCode,
+)
+from app.services.search_trademark import SearchTrademarkService, SearchTrademarkServiceRequest
 
 
 @pytest.fixture
@@ -35,8 +42,7 @@ async def test_register_success(
         register_tm_service: RegisterTrademarkService,
         register_tm_request: RegisterTrademarkServiceRequest,
 ) -> None:
-    trademark_repository.find_exact = AsyncMock(return_value=None)
-    trademark_repository.create = AsyncMock()
+    trademark_repository.create = AsyncMock(return_value=True)
     response = await register_tm_service.invoke(register_tm_request)
     assert response.is_success()
 
@@ -45,9 +51,8 @@ async def test_register_already_registered(
         trademark_repository: AsyncMock,
         register_tm_service: RegisterTrademarkService,
         register_tm_request: RegisterTrademarkServiceRequest,
-        sample_trademark: Trademark,
 ) -> None:
-    trademark_repository.find_exact = AsyncMock(return_value=sample_trademark)
+    trademark_repository.create = AsyncMock(return_value=False)
     response = await register_tm_service.invoke(register_tm_request)
     assert response.is_already_registered()
 
@@ -57,6 +62,133 @@ async def test_register_error(
         register_tm_service: RegisterTrademarkService,
         register_tm_request: RegisterTrademarkServiceRequest,
 ) -> None:
-    trademark_repository.find_exact = AsyncMock(side_effect=Exception)
+    trademark_repository.create = AsyncMock(side_effect=Exception)
     response = await register_tm_service.invoke(register_tm_request)
     assert response.is_error()
+
+
+async def test_register_invalidates_exact_match_cache(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        register_tm_request: RegisterTrademarkServiceRequest,
+) -> None:
+    trademark_repository.create = AsyncMock(return_value=True)
+    exact_match_cache: LRUCache[str, Trademark | None] = LRUCache(max_size=10, ttl=10)
+    exact_match_cache.set(register_tm_request.title, None)
+    register_tm_service = RegisterTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        exact_match_cache=exact_match_cache,
+    )
+
+    response = await register_tm_service.invoke(register_tm_request)
+
+    assert response.is_success()
+    assert not exact_match_cache.get(register_tm_request.title).found
+
+
+async def test_register_during_exact_search(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        register_tm_request: RegisterTrademarkServiceRequest,
+) -> None:
+    registered: list[Trademark] = []
+    search_started = asyncio.Event()
+    release_search = asyncio.Event()
+
+    async def _create(trademark: Trademark, session: object) -> bool:
+        registered.append(trademark)
+        return True
+
+    async def _find_exact(**kwargs: object) -> Trademark | None:
+        if registered:
+            return registered[0]
+        search_started.set()
+        await release_search.wait()
+        return None
+
+    trademark_repository.create = AsyncMock(side_effect=_create)
+    trademark_repository.find_exact = AsyncMock(side_effect=_find_exact)
+    exact_match_cache: LRUCache[str, Trademark | None] = LRUCache(max_size=10, ttl=10)
+    search_tm_service = SearchTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        exact_match_cache=exact_match_cache,
+    )
+    register_tm_service = RegisterTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        exact_match_cache=exact_match_cache,
+        on_title_registered=[search_tm_service.forget_exact_in_flight],
+    )
+    search_request = SearchTrademarkServiceRequest(title=register_tm_request.title, exact_match=True)
+
+    stale_search = asyncio.create_task(search_tm_service.invoke(search_request))
+    await search_started.wait()
+    response = await register_tm_service.invoke(register_tm_request)
+
+    # A search made after the registration does not share the lookup that started before it
+    assert (await search_tm_service.invoke(search_request)).result == [response.result]
+    release_search.set()
+    assert (await stale_search).result == []
+    # Nor is the result of that lookup cached
+    assert exact_match_cache.get(register_tm_request.title).value == response.result
+    assert (await search_tm_service.invoke(search_request)).result == [response.result]
+
+
+@pytest.fixture
+def batching_register_tm_service(logger: Logger, trademark_repository: TrademarkRepository) -> RegisterTrademarkService:
+    return RegisterTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        batch_max_size=10,
+        batch_max_delay=0.01,
+    )
+
+
+async def test_register_in_batch(
+        trademark_repository: AsyncMock,
+        batching_register_tm_service: RegisterTrademarkService,
+        register_tm_request: RegisterTrademarkServiceRequest,
+) -> None:
+    async def _create_batch(trademarks: list[Trademark], session: object) -> set[str]:
+        return {trademark.id for trademark in trademarks}
+
+    trademark_repository.create_batch = AsyncMock(side_effect=_create_batch)
+    requests = [
+        register_tm_request,
+        register_tm_request.model_copy(update={'title': ' ABC'}),
+        register_tm_request.model_copy(update={'title': 'xyz'}),
+    ]
+
+    responses = await asyncio.gather(*(batching_register_tm_service.invoke(request) for request in requests))
+
+    assert [response.code for response in responses] == [
+        RegisterTrademarkServiceResponseCode.success,
+        RegisterTrademarkServiceResponseCode.already_registered,
+        RegisterTrademarkServiceResponseCode.success,
+    ]
+    trademark_repository.create_batch.assert_awaited_once()
+    created_titles = [trademark.title for trademark in trademark_repository.create_batch.call_args.kwargs['trademarks']]
+    assert created_titles == ['abc', 'xyz']
+    trademark_repository.create.assert_not_called()
+
+
+async def test_register_in_batch_error(
+        trademark_repository: AsyncMock,
+        batching_register_tm_service: RegisterTrademarkService,
+        register_tm_request: RegisterTrademarkServiceRequest,
+) -> None:
+    trademark_repository.create_batch = AsyncMock(side_effect=Exception)
+    other_request = register_tm_request.model_copy(update={'title': 'xyz'})
+
+    responses = await asyncio.gather(
+        batching_register_tm_service.invoke(register_tm_request),
+        batching_register_tm_service.invoke(other_request),
+    )
+
+    assert all(response.is_error() for response in responses)
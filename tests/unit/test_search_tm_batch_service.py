@@ -0,0 +1,123 @@
+from logging import Logger
+from unittest.mock import AsyncMock, MagicMock
+
+from app.cache import LRUCache
+from app.models.trademark import SimilarTrademark, Trademark
+from app.repositories.trademark import SimilarQuery
+from app.repositories.trigram_index import TrigramIndex
+from app.services.search_trademark_batch import (
+    SearchTrademarkBatchItem,
+    SearchTrademarkBatchService,
+    SearchTrademarkBatchServiceRequest,
+)
+
+
+async def test_search_batch_success(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    similar_trademark = SimilarTrademark(**sample_trademark.model_dump(), score=0.5, distance=0.5)
+    trademark_repository.find_exact_many = AsyncMock(return_value={'abc': sample_trademark})
+    trademark_repository.find_similar_many = AsyncMock(return_value=[[similar_trademark], []])
+    search_tm_batch_service = SearchTrademarkBatchService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+    )
+
+    request = SearchTrademarkBatchServiceRequest(items=[
+        SearchTrademarkBatchItem(title='abc'),
+        SearchTrademarkBatchItem(title='abd', exact_match=False, limit=5),
+        SearchTrademarkBatchItem(title='missing'),
+        SearchTrademarkBatchItem(title='xyz', exact_match=False, similarity=0.7),
+        SearchTrademarkBatchItem(title='abc'),
+    ])
+    response = await search_tm_batch_service.invoke(request)
+
+    assert response.is_success()
+    assert response.result == [[sample_trademark], [similar_trademark], [], [], [sample_trademark]]
+    assert sorted(trademark_repository.find_exact_many.call_args.kwargs['titles']) == ['abc', 'missing']
+    assert trademark_repository.find_similar_many.call_args.kwargs['queries'] == [
+        SimilarQuery(title='abd', similarity=0.5, limit=5),
+        SimilarQuery(title='xyz', similarity=0.7, limit=50),
+    ]
+
+
+async def test_search_batch_error(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+) -> None:
+    trademark_repository.find_exact_many = AsyncMock(side_effect=Exception)
+    search_tm_batch_service = SearchTrademarkBatchService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+    )
+
+    request = SearchTrademarkBatchServiceRequest(items=[SearchTrademarkBatchItem(title='abc')])
+    response = await search_tm_batch_service.invoke(request)
+
+    assert response.is_error()
+
+
+async def test_search_batch_cached_and_indexed(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    trigram_index = TrigramIndex()
+    trigram_index.add(sample_trademark.id, sample_trademark.title)
+    exact_match_cache: LRUCache[str, Trademark | None] = LRUCache(max_size=10, ttl=10)
+    exact_match_cache.set('abc', sample_trademark)
+    trademark_repository.find_by_ids = AsyncMock(return_value=[sample_trademark])
+    search_tm_batch_service = SearchTrademarkBatchService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+        exact_match_cache=exact_match_cache,
+    )
+
+    request = SearchTrademarkBatchServiceRequest(items=[
+        SearchTrademarkBatchItem(title='abc'),
+        SearchTrademarkBatchItem(title='abc', exact_match=False),
+    ])
+    response = await search_tm_batch_service.invoke(request)
+
+    assert response.is_success()
+    assert response.result[0] == [sample_trademark]
+    assert [trademark.id for trademark in response.result[1]] == [sample_trademark.id]
+    trademark_repository.find_exact_many.assert_not_called()
+    trademark_repository.find_similar_many.assert_not_called()
+
+
+async def test_search_batch_including_expired_in_database(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    trigram_index = TrigramIndex()
+    exact_match_cache: LRUCache[str, Trademark | None] = LRUCache(max_size=10, ttl=10)
+    exact_match_cache.set('abc', None)
+    trademark_repository.find_exact_many = AsyncMock(return_value={'abc': sample_trademark})
+    trademark_repository.find_similar_many = AsyncMock(return_value=[[]])
+    search_tm_batch_service = SearchTrademarkBatchService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+        exact_match_cache=exact_match_cache,
+    )
+
+    request = SearchTrademarkBatchServiceRequest(
+        items=[SearchTrademarkBatchItem(title='abc'), SearchTrademarkBatchItem(title='abc', exact_match=False)],
+        include_expired=True,
+    )
+    response = await search_tm_batch_service.invoke(request)
+
+    assert response.result == [[sample_trademark], []]
+    assert trademark_repository.find_exact_many.call_args.kwargs['include_expired'] is True
+    assert trademark_repository.find_similar_many.call_args.kwargs['include_expired'] is True
+    # The cache holds active trademarks only
+    assert exact_match_cache.get('abc').value is None
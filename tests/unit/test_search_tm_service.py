@@ -1,11 +1,21 @@
+import asyncio
+from datetime import date, timedelta
 from logging import Logger
+from typing import Any, AsyncIterator
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from app.models.trademark import Trademark
+from app.cache import LRUCache
+from app.models.trademark import SearchCursor, SimilarityMode, SimilarTrademark, Trademark
 from app.repositories.trademark import TrademarkRepository
-from app.services.search_trademark import SearchTrademarkService, SearchTrademarkServiceRequest
+from app.repositories.trigram_index import TrigramIndex
+from app.services.search_trademark import (
+    SearchTrademarkService,
+    SearchTrademarkServiceError,
+    SearchTrademarkServiceRequest,
+    StreamSearchTrademarkServiceRequest,
+)
 
 
 @pytest.fixture
@@ -57,3 +67,250 @@ async def test_error(
     request = SearchTrademarkServiceRequest(title='abc', exact_match=False)
     response = await search_tm_service.invoke(request)
     assert response.is_error()
+
+
+async def test_find_similar_in_trigram_index(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    trigram_index = TrigramIndex()
+    trigram_index.add(sample_trademark.id, sample_trademark.title)
+    trademark_repository.find_by_ids = AsyncMock(return_value=[sample_trademark])
+    search_tm_service = SearchTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+    )
+
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=False)
+    response = await search_tm_service.invoke(request)
+
+    assert response.is_success()
+    assert [trademark.id for trademark in response.result] == [sample_trademark.id]
+    trademark_repository.find_similar.assert_not_called()
+
+
+async def test_find_word_similar_in_database(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    trigram_index = TrigramIndex()
+    trigram_index.add(sample_trademark.id, sample_trademark.title)
+    trademark_repository.find_similar = AsyncMock(return_value=[sample_trademark])
+    search_tm_service = SearchTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+    )
+
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=False, mode=SimilarityMode.word_similarity)
+    response = await search_tm_service.invoke(request)
+
+    assert response.result == [sample_trademark]
+    assert trademark_repository.find_similar.call_args.kwargs['mode'] is SimilarityMode.word_similarity
+    trademark_repository.find_by_ids.assert_not_called()
+
+
+async def test_find_exact_cached(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    trademark_repository.find_exact = AsyncMock(return_value=None)
+    exact_match_cache: LRUCache[str, Trademark | None] = LRUCache(max_size=10, ttl=10)
+    search_tm_service = SearchTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        exact_match_cache=exact_match_cache,
+    )
+
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=True)
+    assert (await search_tm_service.invoke(request)).result == []
+    assert (await search_tm_service.invoke(request)).result == []
+    # Titles that are the same after normalization share the cache entry
+    assert (await search_tm_service.invoke(SearchTrademarkServiceRequest(title=' ABC', exact_match=True))).result == []
+    assert trademark_repository.find_exact.await_count == 1
+
+    exact_match_cache.invalidate('abc')
+    trademark_repository.find_exact = AsyncMock(return_value=sample_trademark)
+    assert (await search_tm_service.invoke(request)).result == [sample_trademark]
+
+
+async def test_find_exact_cached_until_expired(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    trademark_repository.find_exact = AsyncMock(return_value=None)
+    exact_match_cache: LRUCache[str, Trademark | None] = LRUCache(max_size=10, ttl=10)
+    search_tm_service = SearchTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        exact_match_cache=exact_match_cache,
+    )
+
+    exact_match_cache.set('abc', sample_trademark)
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=True)
+    assert (await search_tm_service.invoke(request)).result == [sample_trademark]
+    trademark_repository.find_exact.assert_not_called()
+
+    # Cached before midnight, expired since
+    exact_match_cache.set('abc', sample_trademark.model_copy(update={'expiry_date': date.today() - timedelta(days=1)}))
+    assert (await search_tm_service.invoke(request)).result == []
+    trademark_repository.find_exact.assert_awaited_once()
+
+
+async def test_search_including_expired_skips_cache_and_index(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    trigram_index = TrigramIndex()
+    exact_match_cache: LRUCache[str, Trademark | None] = LRUCache(max_size=10, ttl=10)
+    exact_match_cache.set('abc', None)
+    trademark_repository.find_exact = AsyncMock(return_value=sample_trademark)
+    trademark_repository.find_similar = AsyncMock(return_value=[sample_trademark])
+    search_tm_service = SearchTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        trigram_index=trigram_index,
+        exact_match_cache=exact_match_cache,
+    )
+
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=True, include_expired=True)
+    assert (await search_tm_service.invoke(request)).result == [sample_trademark]
+    assert trademark_repository.find_exact.call_args.kwargs['include_expired'] is True
+    assert exact_match_cache.get('abc').value is None
+
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=False, include_expired=True)
+    assert not search_tm_service.uses_trigram_index(request)
+    assert (await search_tm_service.invoke(request)).result == [sample_trademark]
+    assert trademark_repository.find_similar.call_args.kwargs['include_expired'] is True
+    trademark_repository.find_by_ids.assert_not_called()
+
+
+async def test_find_similar_next_page(
+        trademark_repository: AsyncMock,
+        search_tm_service: SearchTrademarkService,
+        sample_trademark: Trademark,
+) -> None:
+    similar_trademarks = [
+        SimilarTrademark(**sample_trademark.model_dump(exclude={'id'}), id=str(position), score=0.5, distance=0.5)
+        for position in range(3)
+    ]
+    trademark_repository.find_similar = AsyncMock(return_value=similar_trademarks)
+
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=False, limit=2)
+    response = await search_tm_service.invoke(request)
+
+    assert trademark_repository.find_similar.call_args.kwargs['limit'] == 3
+    assert response.result == similar_trademarks[:2]
+    assert response.next_cursor == SearchCursor(distance=0.5, id='1')
+
+
+async def test_stream_similar(
+        trademark_repository: AsyncMock,
+        search_tm_service: SearchTrademarkService,
+        sample_trademark: Trademark,
+) -> None:
+    async def _iter_similar(**kwargs: Any) -> AsyncIterator[list[Trademark]]:
+        yield [sample_trademark]
+        yield [sample_trademark]
+
+    trademark_repository.iter_similar = _iter_similar
+
+    request = StreamSearchTrademarkServiceRequest(title='abc', exact_match=False)
+    chunks = [chunk async for chunk in search_tm_service.stream(request)]
+
+    assert chunks == [[sample_trademark], [sample_trademark]]
+
+
+async def test_stream_error(
+        trademark_repository: AsyncMock,
+        search_tm_service: SearchTrademarkService,
+) -> None:
+    trademark_repository.find_exact = AsyncMock(side_effect=Exception)
+
+    request = StreamSearchTrademarkServiceRequest(title='abc', exact_match=True)
+    with pytest.raises(SearchTrademarkServiceError):
+        await anext(search_tm_service.stream(request))
+
+
+async def test_find_similar_raw_rows_next_page(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    rows = [
+        (str(position), *sample_trademark.model_dump(exclude={'id'}).values(), 0.5, 0.5)
+        for position in range(3)
+    ]
+    trademark_repository.find_similar_rows = AsyncMock(return_value=rows)
+    search_tm_service = SearchTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        raw_rows=True,
+    )
+
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=False, limit=2)
+    response = await search_tm_service.invoke(request)
+
+    trademark_repository.find_similar.assert_not_called()
+    assert response.result == []
+    assert response.rows == rows[:2]
+    assert response.next_cursor == SearchCursor(distance=0.5, id='1')
+
+
+async def test_find_similar_in_fuzzy_pool(
+        logger: Logger,
+        trademark_repository: AsyncMock,
+        sample_trademark: Trademark,
+) -> None:
+    trademark_repository.find_similar = AsyncMock(return_value=[])
+    trademark_repository.find_exact = AsyncMock(return_value=sample_trademark)
+    db_session_factory = MagicMock()
+    fuzzy_db_session_factory = MagicMock()
+    search_tm_service = SearchTrademarkService(
+        logger=logger,
+        db_session_factory=db_session_factory,
+        fuzzy_db_session_factory=fuzzy_db_session_factory,
+        trademark_repository=trademark_repository,
+    )
+
+    await search_tm_service.invoke(SearchTrademarkServiceRequest(title='abc', exact_match=False))
+    fuzzy_db_session_factory.create_session.assert_called_once()
+    db_session_factory.create_session.assert_not_called()
+
+    await search_tm_service.invoke(SearchTrademarkServiceRequest(title='abc', exact_match=True))
+    db_session_factory.create_session.assert_called_once()
+
+
+async def test_concurrent_identical_searches_coalesced(
+        trademark_repository: AsyncMock,
+        search_tm_service: SearchTrademarkService,
+        sample_trademark: Trademark,
+) -> None:
+    async def _find_similar(**kwargs: Any) -> list[Trademark]:
+        await asyncio.sleep(0.01)
+        return [sample_trademark]
+
+    trademark_repository.find_similar = AsyncMock(side_effect=_find_similar)
+
+    request = SearchTrademarkServiceRequest(title='abc', exact_match=False)
+    other_request = SearchTrademarkServiceRequest(title='abc', exact_match=False, limit=10)
+    responses = await asyncio.gather(
+        *(search_tm_service.invoke(request) for _ in range(3)),
+        search_tm_service.invoke(other_request),
+    )
+
+    assert all(response.is_success() for response in responses)
+    assert trademark_repository.find_similar.await_count == 2
+    assert search_tm_service.coalesced_requests == 2
@@ -0,0 +1,57 @@
+from datetime import date
+
+from aiohttp import hdrs
+
+from app.api.handlers.search_trademark import SearchTrademarkHandlerResponse
+from app.api.serialization import encode_similar_rows, similar_rows_as_dicts
+from app.models.trademark import SearchCursor, SimilarTrademark, Trademark
+from app.repositories.trademark import TrademarkRepository
+
+
+def _make_similar_trademark(title: str, description: str | None, score: float) -> SimilarTrademark:
+    return SimilarTrademark(
+        id='01HZ',
+        title=title,
+        description=description,
+        application_number='2021700001',
+        application_date=date(2021, 1, 2),
+        registration_date=date(999, 3, 4),
+        expiry_date=date(2031, 1, 2),
+        score=score,
+        distance=1 - score,
+    )
+
+
+def _as_row(trademark: Trademark) -> tuple[object, ...]:
+    return tuple(getattr(trademark, field) for field in TrademarkRepository.similar_fields)
+
+
+def test_encode_similar_rows_as_pydantic() -> None:
+    trademarks: list[Trademark] = [
+        _make_similar_trademark('plain', 'desc', 0.5555555820465088),
+        _make_similar_trademark('"quoted" \\ back\nslash\t\x01\x7f', None, 1.0),
+        _make_similar_trademark('Кириллица ✓   😀', 'é', 0.30000001192092896),
+    ]
+    expected = SearchTrademarkHandlerResponse.ok_response(result=trademarks).model_dump_json(exclude={'http_code'})
+
+    rows = [_as_row(trademark) for trademark in trademarks]
+    assert encode_similar_rows(rows) == expected.encode()
+    assert encode_similar_rows([]) == b'{"result":[],"next_cursor":null}'
+
+
+def test_similar_rows_as_dicts() -> None:
+    trademark = _make_similar_trademark('abc', 'desc', 0.75)
+
+    assert similar_rows_as_dicts([_as_row(trademark)]) == [trademark.model_dump()]
+
+
+def test_rows_web_response_as_pydantic() -> None:
+    trademark = _make_similar_trademark('abc', 'desc', 0.75)
+    next_cursor = SearchCursor(distance=0.25, id=trademark.id)
+
+    expected = SearchTrademarkHandlerResponse.ok_response(result=[trademark], next_cursor=next_cursor).as_web_response()
+    response = SearchTrademarkHandlerResponse.rows_web_response(rows=[_as_row(trademark)], next_cursor=next_cursor)
+
+    assert response.status == expected.status
+    assert response.body == expected.body
+    assert response.headers[hdrs.CONTENT_TYPE] == expected.headers[hdrs.CONTENT_TYPE]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+async def test_concurrent_calls_share_result() -> None:
+    single_flight: SingleFlight[str, int] = SingleFlight()
+    calls = 0
+
+    async def _call() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(single_flight.run('key', _call) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert single_flight.coalesced == 4
+
+    assert await single_flight.run('key', _call) == 2
+    assert single_flight.coalesced == 4
+
+
+async def test_cancelled_caller_does_not_cancel_call() -> None:
+    single_flight: SingleFlight[str, str] = SingleFlight()
+    release = asyncio.Event()
+
+    async def _call() -> str:
+        await release.wait()
+        return 'result'
+
+    first = asyncio.create_task(single_flight.run('key', _call))
+    second = asyncio.create_task(single_flight.run('key', _call))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    release.set()
+
+    assert await second == 'result'
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_error_shared() -> None:
+    single_flight: SingleFlight[str, None] = SingleFlight()
+
+    async def _call() -> None:
+        await asyncio.sleep(0)
+        raise RuntimeError
+
+    results = await asyncio.gather(
+        single_flight.run('key', _call),
+        single_flight.run('key', _call),
+        return_exceptions=True,
+    )
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+
+
+async def test_forget_all_starts_new_call() -> None:
+    single_flight: SingleFlight[str, int] = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def _call() -> int:
+        nonlocal calls
+        calls += 1
+        call_number = calls
+        await release.wait()
+        return call_number
+
+    first = asyncio.create_task(single_flight.run('key', _call))
+    await asyncio.sleep(0)
+    single_flight.forget_all()
+    second = asyncio.create_task(single_flight.run('key', _call))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await first == 1
+    assert await second == 2
+    assert single_flight.coalesced == 0
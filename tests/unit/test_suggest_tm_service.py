@@ -0,0 +1,64 @@
+from logging import Logger
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.trademark import TrademarkSuggestion
+from app.repositories.prefix_index import PrefixIndex
+from app.services.suggest_trademark import normalize_prefix, SuggestTrademarkService, SuggestTrademarkServiceRequest
+
+
+@pytest.mark.parametrize(('prefix', 'normalized'), [
+    ('Wave', 'wave'),
+    ('  Café  Wa', 'cafe wa'),
+    ('wave ', 'wave '),
+    ('   ', ''),
+])
+def test_normalize_prefix(prefix: str, normalized: str) -> None:
+    assert normalize_prefix(prefix) == normalized
+
+
+async def test_suggest_from_database(logger: Logger, trademark_repository: AsyncMock) -> None:
+    suggestions = [TrademarkSuggestion(id='1', title='WAVE')]
+    trademark_repository.find_by_prefix = AsyncMock(return_value=suggestions)
+    suggest_tm_service = SuggestTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+    )
+
+    response = await suggest_tm_service.invoke(SuggestTrademarkServiceRequest(prefix='WA', limit=5))
+
+    assert response.is_success()
+    assert response.result == suggestions
+    assert trademark_repository.find_by_prefix.call_args.kwargs['prefix'] == 'wa'
+    assert trademark_repository.find_by_prefix.call_args.kwargs['limit'] == 5
+
+
+async def test_suggest_from_prefix_index(logger: Logger, trademark_repository: AsyncMock) -> None:
+    prefix_index = PrefixIndex()
+    prefix_index.add('1', 'WAVE')
+    suggest_tm_service = SuggestTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+        prefix_index=prefix_index,
+    )
+
+    response = await suggest_tm_service.invoke(SuggestTrademarkServiceRequest(prefix='wa'))
+
+    assert response.result == [TrademarkSuggestion(id='1', title='WAVE')]
+    trademark_repository.find_by_prefix.assert_not_called()
+
+
+async def test_suggest_error(logger: Logger, trademark_repository: AsyncMock) -> None:
+    trademark_repository.find_by_prefix = AsyncMock(side_effect=Exception)
+    suggest_tm_service = SuggestTrademarkService(
+        logger=logger,
+        db_session_factory=MagicMock(),
+        trademark_repository=trademark_repository,
+    )
+
+    response = await suggest_tm_service.invoke(SuggestTrademarkServiceRequest(prefix='wa'))
+
+    assert response.is_error()
@@ -0,0 +1,97 @@
+import json
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.api.middlewares import create_tracing_middleware, REQUEST_ID_HEADER
+from app.repositories.database_session import DatabaseSession, Statement
+from app.tracing import get_trace, MAX_SPANS, reset_current_trace, set_current_trace, span, Trace
+
+
+def test_span_without_trace() -> None:
+    with span('work'):
+        assert get_trace() is None
+
+
+async def test_spans_of_trace() -> None:
+    trace = Trace('abc')
+    token = set_current_trace(trace)
+    try:
+        with span('work', 'first'):
+            pass
+        with pytest.raises(RuntimeError), span('fail'):
+            raise RuntimeError
+        for _ in range(MAX_SPANS):
+            with span('more'):
+                pass
+    finally:
+        reset_current_trace(token)
+
+    assert get_trace() is None
+    assert [(recorded.name, recorded.detail) for recorded in trace.spans[:2]] == [('work', 'first'), ('fail', None)]
+    assert len(trace.spans) == MAX_SPANS
+    assert trace.dropped_spans == 2
+    assert trace.spans[0].offset <= trace.spans[1].offset
+
+    log_record = trace.as_log_record()
+    assert log_record['request_id'] == 'abc'
+    assert log_record['spans'][0]['name'] == 'work'
+    assert log_record['spans'][0]['detail'] == 'first'
+    assert 'detail' not in log_record['spans'][1]
+
+
+async def test_database_session_spans() -> None:
+    connection = MagicMock(spec=['fetch', 'execute'])
+    connection.fetch = AsyncMock(return_value=[])
+    connection.execute = AsyncMock()
+    statement = Statement(name='data.trademark.find_exact', sql='SELECT 1')
+    db_session = DatabaseSession(connection=connection)
+
+    trace = Trace('abc')
+    token = set_current_trace(trace)
+    try:
+        await db_session.fetch(statement)
+        await db_session.execute(statement)
+    finally:
+        reset_current_trace(token)
+
+    assert [(recorded.name, recorded.detail) for recorded in trace.spans] == [
+        ('db.fetch', statement.name),
+        ('db.execute', statement.name),
+    ]
+
+
+async def test_tracing_middleware(caplog: pytest.LogCaptureFixture) -> None:
+    logger = logging.getLogger('test_tracing')
+
+    async def handler(request: web.Request) -> web.Response:
+        with span('work'):
+            return web.Response(text='ok')
+
+    fast_application = web.Application(middlewares=[create_tracing_middleware(logger, slow_request_threshold=None)])
+    fast_application.router.add_get('/work', handler)
+    slow_application = web.Application(middlewares=[create_tracing_middleware(logger, slow_request_threshold=0)])
+    slow_application.router.add_get('/work', handler)
+
+    async with TestServer(fast_application) as server, aiohttp.ClientSession() as session:
+        async with session.get(server.make_url('/work')) as response:
+            generated_request_id = response.headers[REQUEST_ID_HEADER]
+
+    assert len(generated_request_id) == 32
+    assert not [record for record in caplog.records if record.name == 'test_tracing']
+
+    with caplog.at_level(logging.WARNING, logger='test_tracing'):
+        async with TestServer(slow_application) as server, aiohttp.ClientSession() as session:
+            async with session.get(server.make_url('/work'), headers={REQUEST_ID_HEADER: 'req-1'}) as response:
+                assert response.headers[REQUEST_ID_HEADER] == 'req-1'
+
+    slow_records = [record for record in caplog.records if record.name == 'test_tracing']
+    log_record = json.loads(slow_records[0].getMessage().removeprefix('Slow request: '))
+    assert log_record['request_id'] == 'req-1'
+    assert log_record['route'] == '/work'
+    assert log_record['status'] == 200
+    assert [recorded['name'] for recorded in log_record['spans']] == ['work']
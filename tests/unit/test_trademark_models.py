@@ -0,0 +1,16 @@
+import pytest
+
+from app.models.trademark import normalize_title
+
+
+@pytest.mark.parametrize(('title', 'normalized'), [
+    ('WAVE', 'wave'),
+    ('  Wave \t Surf\n', 'wave surf'),
+    ('Café Crème', 'cafe creme'),
+    ('ＷＡＶＥ', 'wave'),
+    ('ﬁne line', 'fine line'),
+    ('İstanbul', 'istanbul'),
+])
+def test_normalize_title(title: str, normalized: str) -> None:
+    assert normalize_title(title) == normalized
+    assert normalize_title(normalized) == normalized
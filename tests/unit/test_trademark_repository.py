@@ -0,0 +1,118 @@
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import AsyncGenerator
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.trademark import SimilarityMode, Trademark
+from app.repositories.trademark import SimilarQuery, TrademarkRepository
+
+
+@pytest.fixture
+def db_session() -> MagicMock:
+    db_session = MagicMock()
+    db_session.fetch = AsyncMock(return_value=[])
+    db_session.execute = AsyncMock()
+    db_session.in_transaction = False
+
+    @asynccontextmanager
+    async def _transaction() -> AsyncGenerator[None, None]:
+        db_session.in_transaction = True
+        yield
+        db_session.in_transaction = False
+
+    db_session.transaction = _transaction
+    return db_session
+
+
+@pytest.mark.parametrize(('mode', 'statement_name', 'setting'), [
+    (SimilarityMode.similarity, 'find_similar', 'pg_trgm.similarity_threshold'),
+    (SimilarityMode.word_similarity, 'find_word_similar', 'pg_trgm.word_similarity_threshold'),
+    (SimilarityMode.strict_word_similarity, 'find_strict_word_similar', 'pg_trgm.strict_word_similarity_threshold'),
+])
+async def test_find_similar_raises_threshold(
+        db_session: MagicMock,
+        mode: SimilarityMode,
+        statement_name: str,
+        setting: str,
+) -> None:
+    async def _fetch(*args: object) -> list[object]:
+        assert db_session.in_transaction
+        return []
+
+    db_session.fetch = AsyncMock(side_effect=_fetch)
+
+    await TrademarkRepository().find_similar('wave', similarity=0.8, limit=10, mode=mode, session=db_session)
+
+    set_threshold = TrademarkRepository.statements['set_similarity_threshold']
+    db_session.execute.assert_awaited_once_with(set_threshold, setting, '0.8')
+    assert db_session.fetch.call_args.args[0] == TrademarkRepository.statements[statement_name]
+
+
+async def test_find_similar_keeps_default_threshold(db_session: MagicMock) -> None:
+    await TrademarkRepository().find_similar('wave', similarity=0.3, limit=10, session=db_session)
+    await TrademarkRepository().find_similar(
+        'wave',
+        similarity=0.6,
+        limit=10,
+        mode=SimilarityMode.word_similarity,
+        session=db_session,
+    )
+
+    db_session.execute.assert_not_called()
+    assert db_session.fetch.await_count == 2
+
+
+async def test_find_similar_lowers_threshold(db_session: MagicMock) -> None:
+    await TrademarkRepository().find_similar(
+        'wave',
+        similarity=0.2,
+        limit=10,
+        mode=SimilarityMode.word_similarity,
+        session=db_session,
+    )
+
+    db_session.execute.assert_awaited_once_with(
+        TrademarkRepository.statements['set_similarity_threshold'],
+        'pg_trgm.word_similarity_threshold',
+        '0.2',
+    )
+
+
+async def test_find_similar_many_sets_threshold_to_lowest(db_session: MagicMock) -> None:
+    queries = [SimilarQuery(title='wave', similarity=0.9, limit=5), SimilarQuery(title='surf', similarity=0.7, limit=5)]
+
+    assert await TrademarkRepository().find_similar_many(queries, session=db_session) == [[], []]
+
+    db_session.execute.assert_awaited_once_with(
+        TrademarkRepository.statements['set_similarity_threshold'],
+        'pg_trgm.similarity_threshold',
+        '0.7',
+    )
+
+
+async def test_create_batch_passes_a_column_per_field(db_session: MagicMock, sample_trademark: Trademark) -> None:
+    other_trademark = sample_trademark.model_copy(update={'id': 'other', 'title': 'other'})
+    db_session.fetch = AsyncMock(return_value=[{'id': 'other'}])
+
+    created_ids = await TrademarkRepository().create_batch([sample_trademark, other_trademark], session=db_session)
+
+    assert created_ids == {'other'}
+    statement, *columns = db_session.fetch.call_args.args
+    assert statement == TrademarkRepository.statements['create_batch']
+    assert len(columns) == len(TrademarkRepository.field_types)
+    assert columns[0] == [sample_trademark.id, 'other']
+    assert columns[1] == [sample_trademark.title, 'other']
+
+
+async def test_searches_skip_expired_unless_included(db_session: MagicMock) -> None:
+    await TrademarkRepository().find_exact('wave', session=db_session)
+    assert db_session.fetch.call_args.args[-1] == date.today()
+
+    await TrademarkRepository().find_similar('wave', similarity=0.2, limit=10, include_expired=True, session=db_session)
+    assert db_session.fetch.call_args.args[-1] == date.min
+
+    # Matches of the trigram index, which may have expired since it was built
+    await TrademarkRepository().find_by_ids(['id'], session=db_session)
+    assert db_session.fetch.call_args.args[-1] == date.today()
@@ -0,0 +1,64 @@
+import pytest
+
+from app.repositories.trigram_index import extract_trigrams, similarity, TrigramIndex
+
+
+async def _build_index(rows: list[tuple[str, str]]) -> TrigramIndex:
+    async def _load_rows() -> list[tuple[str, str]]:
+        return rows
+
+    trigram_index = TrigramIndex()
+    await trigram_index.rebuild(_load_rows)
+    return trigram_index
+
+
+def test_extract_trigrams() -> None:
+    # SELECT show_trgm('Wave, 7');
+    assert extract_trigrams('Wave, 7') == {'  7', ' 7 ', '  w', ' wa', 'wav', 'ave', 've '}
+    assert extract_trigrams('!!!') == set()
+
+
+@pytest.mark.parametrize(('left', 'right', 'expected'), [
+    # SELECT similarity(left, right);
+    ('titlea', 'titleb', 0.5555555820465088),
+    ('WATA WAVE', 'wave', 0.625),
+    ('abc', 'xyz', 0),
+])
+def test_similarity(left: str, right: str, expected: float) -> None:
+    assert similarity(extract_trigrams(left), extract_trigrams(right)) == expected
+
+
+async def test_find_similar() -> None:
+    trigram_index = await _build_index([('1', 'titlea'), ('2', 'WATA WAVE'), ('3', 'something else')])
+
+    assert trigram_index.find_similar('titleb', threshold=0.5) == [('1', 0.5555555820465088, 0.4444444179534912)]
+    assert trigram_index.find_similar('titleb', threshold=0.6) == []
+    assert trigram_index.find_similar('wave', threshold=0.1) == [('2', 0.625, 0.375)]
+    # Below the default threshold of `%`, which searches in the database lower for the transaction
+    assert trigram_index.find_similar('some', threshold=0.1) == [('3', 0.25, 0.75)]
+    assert trigram_index.find_similar('some', threshold=0.3) == []
+
+
+async def test_find_similar_in_delta() -> None:
+    trigram_index = await _build_index([('1', 'titlea')])
+    trigram_index.add('2', 'titleb')
+
+    assert [match.id for match in trigram_index.find_similar('titleb', threshold=0.3)] == ['2', '1']
+
+    await trigram_index.rebuild(_rows_without_delta)
+    assert len(trigram_index) == 1
+
+
+async def _rows_without_delta() -> list[tuple[str, str]]:
+    return [('1', 'titlea')]
+
+
+async def test_find_similar_pages() -> None:
+    trigram_index = await _build_index([('1', 'titlea'), ('2', 'titleb'), ('3', 'titlec')])
+
+    first_page = trigram_index.find_similar('titled', threshold=0.3, limit=2)
+    assert [match.id for match in first_page] == ['1', '2']
+
+    last = first_page[-1]
+    second_page = trigram_index.find_similar('titled', threshold=0.3, limit=2, after=(last.distance, last.id))
+    assert [match.id for match in second_page] == ['3']
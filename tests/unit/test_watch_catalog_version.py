@@ -0,0 +1,90 @@
+import asyncio
+from logging import Logger
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.watch_catalog_version import CATALOG_VERSION_CHANNEL, CatalogVersionWatcher
+
+
+def _make_connection(version: int) -> MagicMock:
+    connection = MagicMock(
+        spec=['add_listener', 'fetch', 'add_termination_listener', 'remove_termination_listener', 'close'],
+    )
+    connection.add_listener = AsyncMock()
+    connection.fetch = AsyncMock(return_value=[{'version': version}])
+    connection.close = AsyncMock()
+    return connection
+
+
+def _notify(connection: MagicMock, version: int) -> None:
+    on_notification = connection.add_listener.call_args.args[1]
+    on_notification(connection, 1, CATALOG_VERSION_CHANNEL, str(version))
+
+
+async def test_version_follows_notifications(logger: Logger) -> None:
+    connection = _make_connection(version=3)
+    on_change = MagicMock()
+    watcher = CatalogVersionWatcher(
+        logger=logger,
+        connect=AsyncMock(return_value=connection),
+        reconnect_interval=5,
+        on_change=[on_change],
+    )
+
+    await watcher.start()
+    assert watcher.version == 3
+
+    _notify(connection, version=5)
+    assert watcher.version == 5
+    # Sent before the version was read
+    _notify(connection, version=2)
+    assert watcher.version == 5
+    assert on_change.call_count == 5
+
+    await watcher.stop()
+    connection.close.assert_awaited_once()
+
+
+async def test_version_is_published_after_delay(logger: Logger) -> None:
+    connection = _make_connection(version=0)
+    on_change = MagicMock()
+    watcher = CatalogVersionWatcher(
+        logger=logger,
+        connect=AsyncMock(return_value=connection),
+        reconnect_interval=5,
+        publish_delay=0.01,
+        on_change=[on_change],
+    )
+
+    await watcher.start()
+    assert watcher.version is None
+    await asyncio.sleep(0.02)
+    assert watcher.version == 0
+
+    _notify(connection, version=1)
+    assert watcher.version == 0
+    assert on_change.call_count == 2
+    await asyncio.sleep(0.02)
+    assert watcher.version == 1
+    assert on_change.call_count == 3
+
+    await watcher.stop()
+
+
+async def test_version_is_unknown_until_reconnected(logger: Logger) -> None:
+    lost_connection, new_connection = _make_connection(version=3), _make_connection(version=7)
+    watcher = CatalogVersionWatcher(
+        logger=logger,
+        connect=AsyncMock(side_effect=[lost_connection, ConnectionError, new_connection]),
+        reconnect_interval=0.01,
+    )
+
+    await watcher.start()
+    on_connection_lost = lost_connection.add_termination_listener.call_args.args[0]
+    on_connection_lost(lost_connection)
+    assert watcher.version is None
+
+    await asyncio.sleep(0.05)
+    assert watcher.version == 7
+
+    await watcher.stop()
+    new_connection.close.assert_awaited_once()